@@ -144,8 +144,19 @@ export const systemAPI = {
 }
 
 // WebSocket helper
-export const createWebSocket = (sessionId, onMessage, onError, onOpen, onClose) => {
-  const ws = new WebSocket(`${WS_BASE}/${sessionId}`)
+// options.protocol: 1 = base64 audio in JSON (default), 2 = binary audio frames
+// options.mode: 'batch' (default) or 'streaming' for partial transcripts
+export const createWebSocket = (sessionId, onMessage, onError, onOpen, onClose, options = {}) => {
+  const params = new URLSearchParams()
+  if (options.protocol) params.append('protocol', options.protocol)
+  if (options.mode) params.append('mode', options.mode)
+  if (options.since !== undefined) params.append('since', options.since)
+  if (options.resumable) params.append('resumable', 'true')
+  if (options.isNew) params.append('new', 'true')
+  const query = params.toString()
+
+  const ws = new WebSocket(`${WS_BASE}/${sessionId}${query ? `?${query}` : ''}`)
+  ws.binaryType = 'arraybuffer'
 
   ws.onopen = (event) => onOpen && onOpen(event)
   ws.onmessage = (event) => {
@@ -161,6 +172,7 @@ export const createWebSocket = (sessionId, onMessage, onError, onOpen, onClose)
 
   return {
     send: (data) => ws.readyState === WebSocket.OPEN && ws.send(JSON.stringify(data)),
+    sendBinary: (data) => ws.readyState === WebSocket.OPEN && ws.send(data),
     close: () => ws.close()
   }
 }
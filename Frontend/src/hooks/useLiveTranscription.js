@@ -1,7 +1,10 @@
 import { useState, useRef, useCallback, useEffect } from 'react'
 import { createWebSocket } from '../api/api'
 
-export const useLiveTranscription = () => {
+// binaryAudio: send recorder blobs as binary WebSocket frames (protocol 2)
+// streaming: receive partial transcripts while recording
+// resumable: after a reconnect, resend only the audio chunks the server has not acknowledged
+export const useLiveTranscription = ({ binaryAudio = false, streaming = false, resumable = false } = {}) => {
   const [isRecording, setIsRecording] = useState(false)
   const [transcript, setTranscript] = useState('')
   const [isConnected, setIsConnected] = useState(false)
@@ -10,18 +13,88 @@ export const useLiveTranscription = () => {
   const websocket = useRef(null)
   const mediaRecorder = useRef(null)
   const audioChunks = useRef([])
+  // Transcript from earlier recordings; streaming partials are appended to it
+  const baseTranscript = useRef('')
+  // Words of the current streamed recording; each partial carries only its new words
+  const streamedText = useRef('')
+  // Server-side segments received so far; reconnects only fetch newer ones
+  const segmentCount = useRef(0)
+  // Recording finished but not transcribed yet; audio_end is resent after a resume
+  const pendingEnd = useRef(false)
+  // Sessions connected before; only the first connection of a new one skips the server lookup
+  const connectedSessions = useRef(new Set())
+  // Chunks are sent one after another so sequence numbers arrive in order
+  const sendQueue = useRef(Promise.resolve())
+
+  const blobToBase64 = (blob) => new Promise((resolve, reject) => {
+    const reader = new FileReader()
+    reader.onload = () => resolve(reader.result.split(',')[1])
+    reader.onerror = reject
+    reader.readAsDataURL(blob)
+  })
+
+  const sendChunk = useCallback((blob, seq) => {
+    sendQueue.current = sendQueue.current.then(async () => {
+      if (binaryAudio) {
+        websocket.current?.sendBinary(blob)
+        return
+      }
+      const data = await blobToBase64(blob)
+      websocket.current?.send({ type: 'audio_chunk', seq, data })
+    }).catch(err => console.error('Audio chunk error:', err))
+  }, [binaryAudio])
+
+  const sendAudioEnd = useCallback(() => {
+    sendQueue.current = sendQueue.current.then(() => {
+      websocket.current?.send({ type: 'audio_end' })
+    })
+  }, [])
 
-  const connectWebSocket = useCallback((sessionId) => {
+  // isNew: the caller just generated sessionId, so there is no stored session to load
+  const connectWebSocket = useCallback((sessionId, { isNew = false } = {}) => {
     try {
+      const firstConnection = !connectedSessions.current.has(sessionId)
+      connectedSessions.current.add(sessionId)
       const wsHelper = createWebSocket(
         sessionId,
         (data) => {
-          if (data.type === 'transcript') {
+          if (data.segment !== undefined && data.segment !== null) {
+            segmentCount.current = data.segment + 1
+          }
+          if (data.type === 'transcript_delta') {
+            const text = data.segments.map(segment => segment.text).join(' ')
+            baseTranscript.current = data.reset ? text : `${baseTranscript.current} ${text}`.trim()
+            segmentCount.current = data.next_segment
+            setTranscript(baseTranscript.current)
+          } else if (data.type === 'upload_state') {
+            // Resend what the server is missing of the current recording
+            audioChunks.current.slice(data.seq).forEach((blob, i) => sendChunk(blob, data.seq + i))
+            if (pendingEnd.current) sendAudioEnd()
+          } else if (data.type === 'upload_gap') {
+            audioChunks.current.slice(data.expected).forEach((blob, i) => sendChunk(blob, data.expected + i))
+          } else if (data.type === 'transcript_cleared') {
+            segmentCount.current = 0
+          } else if (data.type === 'transcript') {
             if (data.is_historical) {
+              baseTranscript.current = data.text
               setTranscript(data.text)
             } else {
-              setTranscript(prev => prev + ' ' + data.text)
+              pendingEnd.current = false
+              audioChunks.current = []
+              setTranscript(prev => {
+                baseTranscript.current = prev + ' ' + data.text
+                return baseTranscript.current
+              })
             }
+          } else if (data.type === 'partial') {
+            streamedText.current = `${streamedText.current} ${data.text}`.trim()
+            setTranscript(`${baseTranscript.current} ${streamedText.current}`.trim())
+          } else if (data.type === 'final') {
+            streamedText.current = ''
+            baseTranscript.current = `${baseTranscript.current} ${data.text}`.trim()
+            setTranscript(baseTranscript.current)
+          } else if (data.type === 'busy') {
+            setError(`Transcription busy, retry in ${data.retry_after}s`)
           } else if (data.type === 'error') {
             setError(data.message)
           }
@@ -36,6 +109,13 @@ export const useLiveTranscription = () => {
         },
         () => {
           setIsConnected(false)
+        },
+        {
+          protocol: binaryAudio ? 2 : undefined,
+          mode: streaming ? 'streaming' : undefined,
+          since: segmentCount.current,
+          resumable: resumable && !streaming,
+          isNew: isNew && firstConnection,
         }
       )
 
@@ -44,7 +124,7 @@ export const useLiveTranscription = () => {
       setError('Failed to connect to transcription service')
       console.error('Connection error:', err)
     }
-  }, [])
+  }, [binaryAudio, streaming, resumable, sendChunk, sendAudioEnd])
 
   const isRecordingRef = useRef(isRecording)
   useEffect(() => {
@@ -71,28 +151,25 @@ export const useLiveTranscription = () => {
 
       const recorder = new MediaRecorder(stream, mimeType ? { mimeType } : {})
 
+      audioChunks.current = []
+      pendingEnd.current = false
+
       recorder.ondataavailable = (event) => {
         if (event.data.size > 0) {
           audioChunks.current.push(event.data)
-          const reader = new FileReader()
-          reader.onload = () => {
-            if (websocket.current) {
-              websocket.current.send({
-                type: 'audio_chunk',
-                data: reader.result.split(',')[1]
-              })
-            }
-          }
-          reader.readAsDataURL(event.data)
+          sendChunk(event.data, audioChunks.current.length - 1)
         }
       }
 
       recorder.onstop = () => {
-        if (websocket.current) {
-          websocket.current.send({ type: 'audio_end' })
-        }
+        sendAudioEnd()
         stream.getTracks().forEach(track => track.stop())
-        audioChunks.current = []
+        // Resumable uploads keep the chunks until the transcript arrives
+        if (resumable && !streaming) {
+          pendingEnd.current = true
+        } else {
+          audioChunks.current = []
+        }
       }
 
       mediaRecorder.current = recorder
@@ -103,7 +180,7 @@ export const useLiveTranscription = () => {
       setError('Microphone access denied or not available')
       console.error('Recording error:', err)
     }
-  }, [])
+  }, [resumable, streaming, sendChunk, sendAudioEnd])
 
   const disconnect = useCallback(() => {
     if (websocket.current) {
@@ -113,6 +190,10 @@ export const useLiveTranscription = () => {
       stopRecording()
     }
     setIsConnected(false)
+    baseTranscript.current = ''
+    segmentCount.current = 0
+    audioChunks.current = []
+    pendingEnd.current = false
     setTranscript('')
     setError(null)
   }, [stopRecording])
@@ -121,6 +202,8 @@ export const useLiveTranscription = () => {
     if (websocket.current) {
       websocket.current.send({ type: 'clear_transcript' })
     }
+    baseTranscript.current = ''
+    segmentCount.current = 0
     setTranscript('')
   }, [])
 
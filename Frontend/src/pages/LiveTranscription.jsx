@@ -38,10 +38,10 @@ const LiveTranscription = () => {
     stopRecording,
     disconnect,
     clearTranscript,
-  } = useLiveTranscription()
+  } = useLiveTranscription({ binaryAudio: true })
 
   useEffect(() => {
-    connectWebSocket(sessionId)
+    connectWebSocket(sessionId, { isNew: true })
     return () => disconnect()
   }, [sessionId, connectWebSocket])
 
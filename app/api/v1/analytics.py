@@ -4,6 +4,7 @@ MedAI - Analytics Routes
 from datetime import datetime
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
 
 from app.database import (
     get_users_collection,
@@ -11,8 +12,26 @@ from app.database import (
     get_image_analyses_collection,
     Database
 )
+from app.config import settings
 from app.core import get_current_user, check_database_connection
-from app.services import manager, is_ai_available, is_vision_available, is_transcription_available
+from app.services import (
+    manager,
+    is_ai_available,
+    is_vision_available,
+    is_transcription_available,
+    get_transcription_stats,
+    get_transcription_cache_stats,
+    transcription_job_runner,
+    session_store,
+    upload_spools,
+    get_llm_stats,
+    get_summary_cache_stats,
+    get_coalescing_stats,
+    get_model_health,
+    get_hedging_stats,
+    readiness
+)
+from app.services.component_readiness import COMPONENT_DATABASE, COMPONENT_WHISPER
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
@@ -106,7 +125,20 @@ async def get_system_stats(current_user: dict = Depends(get_current_user)):
             "total_users": total_users,
             "total_reports": total_reports,
             "total_images": total_images,
-            "websocket_connections": manager.get_connection_stats()
+            "websocket_connections": {
+                **manager.get_connection_stats(),
+                "cluster_connections": await manager.count_cluster_connections()
+            },
+            "transcription_queue": get_transcription_stats(),
+            "transcription_cache": get_transcription_cache_stats(),
+            "transcription_jobs": transcription_job_runner.get_stats(),
+            "session_store": session_store.get_stats(),
+            "resumable_uploads": upload_spools.get_stats(),
+            "llm_executors": get_llm_stats(),
+            "summary_cache": get_summary_cache_stats(),
+            "llm_coalescing": get_coalescing_stats(),
+            "gemini_models": get_model_health(),
+            "llm_hedging": get_hedging_stats()
         },
         "user_info": {
             "username": current_user["username"],
@@ -115,17 +147,33 @@ async def get_system_stats(current_user: dict = Depends(get_current_user)):
     }
 
 
+def _required_components() -> list:
+    """Components a worker needs before it should receive traffic"""
+    required = [COMPONENT_DATABASE]
+    if settings.PRELOAD_MODELS:
+        required.append(COMPONENT_WHISPER)
+    return required
+
+
 @router.get("/health")
 async def health_check():
-    """System health check"""
+    """System health check (liveness) with per-component readiness"""
     db_status = "healthy" if Database.is_connected() else "unavailable"
+    transcription_stats = get_transcription_stats()
     
     return {
         "status": "healthy" if db_status == "healthy" else "degraded",
+        "ready": readiness.is_ready(*_required_components()),
+        "components": readiness.snapshot(),
         "timestamp": datetime.utcnow().isoformat(),
         "services": {
             "database": db_status,
-            "whisper": "healthy" if is_transcription_available() else "unavailable",
+            "whisper": "healthy" if is_transcription_available() else readiness.state(COMPONENT_WHISPER),
+            "transcription_queue": {
+                "depth": transcription_stats["queue_depth"],
+                "capacity": transcription_stats["queue_size"],
+                "in_flight": transcription_stats["in_flight"]
+            },
             "gemini_ai": "healthy" if is_ai_available() else "unavailable",
             "gemini_vision": "healthy" if is_vision_available() else "unavailable",
             "websocket": {
@@ -135,3 +183,13 @@ async def health_check():
         },
         "version": "3.0.0"
     }
+
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 503 until background startup has finished"""
+    ready = readiness.is_ready(*_required_components())
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "components": readiness.snapshot()}
+    )
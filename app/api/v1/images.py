@@ -6,14 +6,14 @@ import uuid
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Request
 from fastapi.responses import FileResponse
 from bson import ObjectId
 
 from app.config import settings
 from app.database import get_image_analyses_collection
 from app.core import get_current_user, check_database_connection
-from app.services import analyze_medical_image, generate_report_pdf
+from app.services import analyze_medical_image, generate_report_pdf, until_disconnected
 
 router = APIRouter(prefix="/images", tags=["Image Analysis"])
 
@@ -23,6 +23,7 @@ VALID_IMAGE_TYPES = {'CT', 'MRI', 'XRAY', 'USG', 'X-RAY', 'ULTRASOUND'}
 
 @router.post("/analyze")
 async def analyze_image(
+    request: Request,
     file: UploadFile = File(...),
     image_type: str = Form(...),
     patient_id: Optional[str] = Form(None),
@@ -58,12 +59,12 @@ async def analyze_image(
             detail=f"Image too large. Max: {settings.MAX_IMAGE_SIZE_MB}MB"
         )
     
-    # Analyze image
-    analysis_result = await analyze_medical_image(
+    # Analyze image; abandoned if the client disconnects meanwhile
+    analysis_result = await until_disconnected(request, analyze_medical_image(
         image_data,
         image_type,
         clinical_context
-    )
+    ))
     
     # Save analysis record
     analysis_doc = {
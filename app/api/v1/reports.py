@@ -4,14 +4,14 @@ MedAI - Medical Reports Routes
 from datetime import datetime
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
 from fastapi.responses import FileResponse
 from bson import ObjectId
 
 from app.database import get_reports_collection
 from app.schemas import SummaryInput
 from app.core import get_current_user, check_database_connection, cleanup_expired_tokens
-from app.services import generate_medical_summary, generate_report_pdf
+from app.services import generate_medical_summary, generate_report_pdf, until_disconnected
 
 router = APIRouter(prefix="/reports", tags=["Reports"])
 
@@ -20,6 +20,7 @@ router = APIRouter(prefix="/reports", tags=["Reports"])
 async def create_report(
     input_data: SummaryInput,
     background_tasks: BackgroundTasks,
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
     """Generate medical report from transcript"""
@@ -32,11 +33,11 @@ async def create_report(
             detail="Transcript too short for analysis"
         )
     
-    # Generate summary
-    summary = await generate_medical_summary(
+    # Generate summary; abandoned if the client disconnects meanwhile
+    summary = await until_disconnected(request, generate_medical_summary(
         input_data.transcript,
         input_data.conversation_type
-    )
+    ))
     
     # Create report document
     report_dict = {
@@ -9,6 +9,7 @@ from app.api.v1.patients import router as patients_router
 from app.api.v1.reports import router as reports_router
 from app.api.v1.images import router as images_router
 from app.api.v1.transcription import router as transcription_router
+from app.api.v1.transcriptions import router as transcriptions_router
 from app.api.v1.analytics import router as analytics_router
 
 # Main API router
@@ -19,6 +20,7 @@ api_router.include_router(auth_router)
 api_router.include_router(patients_router)
 api_router.include_router(reports_router)
 api_router.include_router(images_router)
+api_router.include_router(transcriptions_router)
 api_router.include_router(analytics_router)
 
 # Export transcription router separately (WebSocket)
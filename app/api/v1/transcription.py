@@ -1,86 +1,397 @@
 """
 MedAI - WebSocket Transcription Routes
 """
+import json
+import asyncio
 import base64
 from datetime import datetime
+from typing import Optional, Tuple
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 
 from app.config import settings
-from app.services import manager, transcribe_audio
+from app.core import TranscriptionBusyError
+from app.services import manager, transcribe_audio, StreamingTranscriber
+from app.services.upload_spool import upload_spools, CHUNK_ACCEPTED, CHUNK_GAP
+from app.services.vad_service import VadStats
+from app.services.streaming_service import FORMAT_CONTAINER, SUPPORTED_FORMATS, PCM_FORMATS
+from app.services.transcription_service import SAMPLE_RATE, transcribe_converted_recording
+from app.services.audio_preprocessing import (
+    MIN_SAMPLE_RATE,
+    MAX_SAMPLE_RATE,
+    MAX_CHANNELS,
+    PreprocessedRecording
+)
 
 router = APIRouter(tags=["Transcription"])
 
+MODE_BATCH = "batch"
+MODE_STREAMING = "streaming"
+
+# Protocol 1: base64 audio inside JSON messages
+# Protocol 2: raw binary audio frames, JSON text frames for control messages
+PROTOCOL_JSON = 1
+PROTOCOL_BINARY = 2
+
+
+async def _send_busy(error: TranscriptionBusyError, session_id: str):
+    """Tell the client the transcription queue is full and when to retry"""
+    await manager.send_message({
+        "type": "busy",
+        "message": "Transcription service busy, retry later",
+        "retry_after": error.retry_after
+    }, session_id)
+
+
+async def _receive_frame(websocket: WebSocket, protocol: int) -> Tuple[Optional[dict], Optional[bytes]]:
+    """Read one frame as either a control message or a raw audio chunk"""
+    if protocol == PROTOCOL_JSON:
+        return await websocket.receive_json(), None
+    
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    if message.get("bytes") is not None:
+        return None, message["bytes"]
+    return json.loads(message.get("text") or "{}"), None
+
+
+async def _send_upload_state(upload, session_id: str):
+    """Tell a resuming client which chunk to send next"""
+    await manager.send_message({
+        "type": "upload_state",
+        "session_id": session_id,
+        **upload.state()
+    }, session_id)
+
+
+async def _send_history(session, since: Optional[int], session_id: str):
+    """Send the stored transcript: all of it, or only segments after `since`"""
+    if since is None:
+        if session.transcript:
+            await manager.send_message({
+                "type": "transcript",
+                "text": session.transcript,
+                "segments": len(session.segments),
+                "session_id": session_id,
+                "is_historical": True
+            }, session_id)
+        return
+    
+    # A client ahead of the server (e.g. after a clear) gets everything again
+    reset = since > len(session.segments)
+    segments = session.segments_since(0 if reset else since)
+    await manager.send_message({
+        "type": "transcript_delta",
+        "segments": [segment.model_dump(mode="json") for segment in segments],
+        "next_segment": len(session.segments),
+        "reset": reset,
+        "session_id": session_id
+    }, session_id)
+
+
+def _segment_index(segment) -> Optional[int]:
+    return segment.index if segment is not None else None
+
+
+async def _stream_windows(streamer: StreamingTranscriber, session_id: str):
+    """Transcribe every full window, store it as a segment and push a partial"""
+    while await streamer.ready():
+        new_text = await streamer.transcribe_next()
+        segment = await manager.add_transcript(session_id, new_text, *streamer.last_span)
+        await manager.send_message({
+            "type": "partial",
+            "text": new_text,
+            "window": streamer.windows_transcribed,
+            "segment": _segment_index(segment),
+            "timestamp": datetime.utcnow().isoformat(),
+            "session_id": session_id
+        }, session_id)
+
 
 @router.websocket("/ws/transcribe/{session_id}")
-async def websocket_transcribe(websocket: WebSocket, session_id: str):
-    """WebSocket endpoint for real-time transcription"""
-    await manager.connect(websocket, session_id)
+async def websocket_transcribe(
+    websocket: WebSocket,
+    session_id: str,
+    mode: str = Query(MODE_BATCH),
+    audio_format: str = Query(FORMAT_CONTAINER, alias="format"),
+    protocol: int = Query(PROTOCOL_JSON),
+    since: Optional[int] = Query(None, ge=0),
+    resumable: bool = Query(False),
+    new: bool = Query(False),
+    sample_rate: int = Query(SAMPLE_RATE, alias="rate"),
+    channels: int = Query(1)
+):
+    """WebSocket endpoint for real-time transcription
     
-    # Send existing transcript if any
-    session = manager.get_session(session_id)
-    if session and session.transcript:
+    `mode=streaming` transcribes rolling windows while audio arrives and
+    pushes `partial` messages followed by a `final` one on `audio_end`.
+    The default batch mode transcribes the whole buffer on `audio_end`.
+    
+    `protocol=2` sends audio as binary frames instead of base64 JSON.
+    
+    Raw PCM formats (`pcm_s16le`, `pcm_f32le`) may use any `rate` and
+    `channels`; chunks are downmixed and resampled to 16 kHz as they
+    arrive, so batch mode only has to normalize loudness on `audio_end`.
+    
+    On reconnect, `since=N` (segments the client already has) replaces
+    the full historical transcript with a `transcript_delta` message.
+    
+    `resumable=true` (batch mode) acknowledges every audio chunk with
+    `ack` and keeps the partial recording for a while after a disconnect.
+    On connect the server sends `upload_state` with the next expected
+    `seq` and the bytes received, and the client resends from there.
+    JSON chunks may carry their own `seq`; resends are ignored and a gap
+    is answered with `upload_gap`.
+    
+    `new=true` marks a session ID the client just generated; the server
+    then does not look for a stored session before accepting.
+    """
+    await manager.connect(websocket, session_id, new=new)
+    
+    if (
+        mode not in (MODE_BATCH, MODE_STREAMING)
+        or audio_format not in SUPPORTED_FORMATS
+        or protocol not in (PROTOCOL_JSON, PROTOCOL_BINARY)
+        or not MIN_SAMPLE_RATE <= sample_rate <= MAX_SAMPLE_RATE
+        or not 1 <= channels <= MAX_CHANNELS
+    ):
         await manager.send_message({
-            "type": "transcript",
-            "text": session.transcript,
-            "session_id": session_id,
-            "is_historical": True
+            "type": "error",
+            "message": (
+                f"Unsupported mode '{mode}', format '{audio_format}', protocol '{protocol}', "
+                f"rate {sample_rate} or channels {channels}"
+            )
         }, session_id)
-        
-    audio_buffer = bytearray()
+        await manager.close(session_id, code=1003)
+        return
+    
+    if protocol == PROTOCOL_BINARY:
+        # Confirm the negotiated protocol so the client can start sending binary frames
+        await manager.send_message({
+            "type": "session_config",
+            "protocol": protocol,
+            "mode": mode,
+            "format": audio_format,
+            "session_id": session_id
+        }, session_id)
+    
+    # Send existing transcript if any
+    session = manager.get_session(session_id)
+    if session:
+        await _send_history(session, since, session_id)
+    
+    def new_streamer() -> StreamingTranscriber:
+        # Segment times continue from the session's audio clock
+        session = manager.get_session(session_id)
+        return StreamingTranscriber(
+            audio_format,
+            session_id,
+            time_offset=session.audio_seconds if session else 0.0,
+            sample_rate=sample_rate,
+            channels=channels
+        )
+    
+    # Partial audio is kept across connections only when the client can resume it
+    resumable = resumable and mode == MODE_BATCH
+    upload = upload_spools.attach(session_id)
+    if not resumable:
+        # An earlier connection may still be transcribing the shared buffer
+        await upload.idle()
+        upload.reset()
+    audio_buffer = upload.buffer
+    if resumable:
+        await _send_upload_state(upload, session_id)
+    
+    streamer = new_streamer() if mode == MODE_STREAMING else None
+    
+    # Raw PCM is converted while it arrives; containers are decoded on audio_end
+    pcm_recording = None
+    if mode == MODE_BATCH and audio_format in PCM_FORMATS:
+        pcm_recording = PreprocessedRecording(sample_rate, channels, PCM_FORMATS[audio_format])
     
     try:
         while True:
-            data = await websocket.receive_json()
-            message_type = data.get("type")
+            data, chunk = await _receive_frame(websocket, protocol)
+            message_type = "audio_chunk" if chunk is not None else data.get("type")
             
             if message_type == "audio_chunk":
-                # Receive audio chunk
-                audio_b64 = data.get("data")
-                if not audio_b64:
-                    continue
-                    
-                try:
-                    chunk = base64.b64decode(audio_b64)
+                # Receive audio chunk (binary frame, or base64 in JSON)
+                if chunk is None:
+                    audio_b64 = data.get("data")
+                    if not audio_b64:
+                        continue
                     
-                    # Safety check: Prevent buffer from growing indefinitely
-                    if len(audio_buffer) + len(chunk) > settings.max_audio_size:
+                    try:
+                        chunk = base64.b64decode(audio_b64)
+                    except Exception as e:
+                        await manager.send_message({
+                            "type": "error",
+                            "message": "Audio decoding failed"
+                        }, session_id)
+                        continue
+                
+                if not chunk:
+                    continue
+                
+                if streamer is not None:
+                    if streamer.buffered_bytes + len(chunk) > settings.max_recording_size:
                         await manager.send_message({
                             "type": "error",
                             "message": "Audio buffer limit exceeded"
                         }, session_id)
-                        audio_buffer.clear()
+                        streamer.close()
+                        streamer = new_streamer()
                         continue
-                        
-                    audio_buffer.extend(chunk)
+                    
+                    streamer.feed(chunk)
+                    try:
+                        await _stream_windows(streamer, session_id)
+                    except TranscriptionBusyError as e:
+                        # The window stays pending and is retried on the next chunk
+                        await _send_busy(e, session_id)
+                    except Exception as e:
+                        await manager.send_message({
+                            "type": "error",
+                            "message": "Transcription failed",
+                            "details": str(e)
+                        }, session_id)
+                    continue
+                
+                # A reconnect's chunks wait until the previous connection's audio_end is done
+                await upload.idle()
+                
+                # Safety check: Prevent buffer from growing indefinitely
+                if len(audio_buffer) + len(chunk) > settings.max_recording_size:
+                    await manager.send_message({
+                        "type": "error",
+                        "message": "Audio buffer limit exceeded"
+                    }, session_id)
+                    upload.reset()
+                    if pcm_recording is not None:
+                        pcm_recording.reset()
+                    continue
+                
+                seq = data.get("seq") if data else None
+                result = upload.accept(chunk, seq if isinstance(seq, int) else None)
+                if (
+                    pcm_recording is not None
+                    and result == CHUNK_ACCEPTED
+                    and pcm_recording.bytes_in == upload.offset - len(chunk)
+                ):
+                    pcm_recording.feed(chunk)
+                if not resumable:
+                    continue
+                if result == CHUNK_GAP:
+                    await manager.send_message({
+                        "type": "upload_gap",
+                        "expected": upload.next_seq,
+                        "offset": upload.offset
+                    }, session_id)
+                else:
+                    await manager.send_message({
+                        "type": "ack",
+                        "seq": upload.next_seq - 1,
+                        "offset": upload.offset
+                    }, session_id)
+            
+            elif message_type == "upload_status":
+                await _send_upload_state(upload, session_id)
+            
+            elif message_type == "audio_end" and streamer is not None:
+                # Flush the tail of the stream and publish the final transcript
+                if not streamer.buffered_bytes and not streamer.windows_transcribed:
+                    await manager.send_message({
+                        "type": "warning",
+                        "message": "No audio data received"
+                    }, session_id)
+                    continue
+                
+                try:
+                    # Windows are stored as they complete; only the tail is new
+                    tail = await streamer.finish()
+                    segment = await manager.add_transcript(session_id, tail, *streamer.last_span)
+                    transcript = streamer.text
+                    vad = streamer.vad_stats.as_dict()
+                    manager.record_vad_stats(session_id, vad)
+                    
+                    await manager.send_message({
+                        "type": "final",
+                        "text": transcript,
+                        "windows": streamer.windows_transcribed,
+                        "segment": _segment_index(segment),
+                        "vad": vad,
+                        "timestamp": datetime.utcnow().isoformat(),
+                        "session_id": session_id
+                    }, session_id)
+                    streamer.close()
+                    streamer = new_streamer()
+                except TranscriptionBusyError as e:
+                    # Keep the stream so the client can resend audio_end
+                    await _send_busy(e, session_id)
                 except Exception as e:
                     await manager.send_message({
                         "type": "error",
-                        "message": "Audio decoding failed"
+                        "message": "Transcription failed",
+                        "details": str(e)
                     }, session_id)
+                    streamer.close()
+                    streamer = new_streamer()
             
             elif message_type == "audio_end":
+                if upload.transcribing:
+                    # A resent audio_end after a reconnect: the earlier connection's
+                    # transcript reaches this client, unless that attempt failed
+                    generation = upload.generation
+                    await upload.idle()
+                    if upload.generation != generation:
+                        continue
+                
                 # Process audio and transcribe
                 if audio_buffer:
+                    token = upload.begin_transcription()
+                    transcribed = False
                     try:
-                        transcript = await transcribe_audio(bytes(audio_buffer))
-                        await manager.add_transcript(session_id, transcript)
+                        # Zero-copy view over memory or the mmap'd spool file
+                        vad_stats = VadStats()
+                        with audio_buffer.view() as audio:
+                            if pcm_recording is not None:
+                                samples = await asyncio.to_thread(pcm_recording.finish, audio)
+                                transcript = await transcribe_converted_recording(samples, session_id, vad_stats)
+                            else:
+                                transcript = await transcribe_audio(audio, session_id, vad_stats)
+                        session = manager.get_session(session_id)
+                        start = session.audio_seconds if session else 0.0
+                        end = start + vad_stats.total_seconds if vad_stats.total_seconds else None
+                        segment = await manager.add_transcript(session_id, transcript, start, end)
+                        # Stored: a resent audio_end must not add the segment again
+                        transcribed = True
+                        vad = vad_stats.as_dict()
+                        manager.record_vad_stats(session_id, vad)
                         
                         await manager.send_message({
                             "type": "transcript",
                             "text": transcript,
+                            "segment": _segment_index(segment),
+                            "vad": vad,
                             "timestamp": datetime.utcnow().isoformat(),
                             "session_id": session_id
                         }, session_id)
                         
-                        audio_buffer.clear()
-                        
+                        if pcm_recording is not None:
+                            pcm_recording.reset()
+                    
+                    except TranscriptionBusyError as e:
+                        # Keep the buffer so the client can resend audio_end
+                        await _send_busy(e, session_id)
                     except Exception as e:
                         await manager.send_message({
                             "type": "error",
                             "message": "Transcription failed",
                             "details": str(e)
                         }, session_id)
+                    finally:
+                        upload.end_transcription(token, transcribed)
                 else:
                     await manager.send_message({
                         "type": "warning",
@@ -104,14 +415,18 @@ async def websocket_transcribe(websocket: WebSocket, session_id: str):
             
             elif message_type == "clear_transcript":
                 # Clear transcript
-                session = manager.get_session(session_id)
-                if session is not None:
-                    session.transcript = ""
+                if manager.clear_transcript(session_id):
                     await manager.send_message({
                         "type": "transcript_cleared"
                     }, session_id)
                     
     except WebSocketDisconnect:
-        manager.disconnect(session_id)
+        manager.disconnect(session_id, websocket)
     except Exception as e:
-        manager.disconnect(session_id)
+        manager.disconnect(session_id, websocket)
+    finally:
+        upload_spools.detach(session_id, keep=resumable)
+        if pcm_recording is not None:
+            pcm_recording.close()
+        if streamer is not None:
+            streamer.close()
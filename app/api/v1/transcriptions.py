@@ -0,0 +1,214 @@
+"""
+MedAI - Batch Transcription Job Routes
+"""
+import os
+import uuid
+import shutil
+import asyncio
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Query, UploadFile
+
+from app.config import settings
+from app.database import get_transcription_jobs_collection
+from app.core import get_current_user, check_database_connection
+from app.services import transcription_job_runner
+from app.services.transcription_jobs import JOB_QUEUED, JOB_AUDIO_DIR, job_audio_path
+
+router = APIRouter(prefix="/transcriptions", tags=["Transcription Jobs"])
+
+ALLOWED_AUDIO_EXTENSIONS = {'.wav', '.webm', '.ogg', '.opus', '.mp3', '.m4a', '.mp4', '.flac', '.aac'}
+VALID_JOB_STATUSES = {"queued", "processing", "completed", "failed"}
+
+# Chunk size for copying uploads to disk
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def _check_extension(filename: str):
+    ext = os.path.splitext(filename or "")[1].lower()
+    if ext not in ALLOWED_AUDIO_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported audio format '{filename}'. Allowed: {', '.join(sorted(ALLOWED_AUDIO_EXTENSIONS))}"
+        )
+
+
+def _too_large() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"Audio file too large. Max: {settings.MAX_RECORDING_SIZE_MB}MB"
+    )
+
+
+def _copy_upload(upload: UploadFile, path: str) -> int:
+    """Copy an uploaded (spooled) file to the job path, enforcing the size limit"""
+    upload.file.seek(0, os.SEEK_END)
+    size = upload.file.tell()
+    if size > settings.max_recording_size:
+        raise _too_large()
+    upload.file.seek(0)
+    with open(path, "wb") as out:
+        shutil.copyfileobj(upload.file, out, COPY_CHUNK_BYTES)
+    return size
+
+
+async def _save_stream(request: Request, path: str) -> int:
+    """Write a streamed request body straight to disk"""
+    size = 0
+    with open(path, "wb") as out:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > settings.max_recording_size:
+                raise _too_large()
+            out.write(chunk)
+    return size
+
+
+def _new_job(filename: str, size: int, path: str, job_id: str, patient_id: Optional[str], user: dict) -> dict:
+    now = datetime.utcnow()
+    return {
+        "job_id": job_id,
+        "status": JOB_QUEUED,
+        "filename": filename,
+        "size": size,
+        "audio_path": path,
+        "patient_id": patient_id,
+        "submitted_by": user["username"],
+        "attempts": 0,
+        "text": None,
+        "error": None,
+        "created_at": now,
+        "started_at": None,
+        "completed_at": None
+    }
+
+
+def _serialize_job(job: dict) -> dict:
+    job.pop("_id", None)
+    job.pop("audio_path", None)
+    for field in ("lease_owner", "lease_expires_at", "retry_at"):
+        job.pop(field, None)
+    for field in ("created_at", "started_at", "completed_at"):
+        if job.get(field):
+            job[field] = job[field].isoformat()
+    return job
+
+
+@router.post("", status_code=202)
+async def submit_transcriptions(
+    request: Request,
+    patient_id: Optional[str] = Query(None),
+    filename: Optional[str] = Query(None),
+    current_user: dict = Depends(get_current_user)
+):
+    """Queue audio files for background transcription
+    
+    Send one or many files as multipart form data (field `files` or `file`),
+    or stream a single file as the raw request body with `?filename=`.
+    Returns job IDs immediately; poll `GET /transcriptions/{job_id}`.
+    """
+    jobs = get_transcription_jobs_collection()
+    check_database_connection(jobs)
+    
+    os.makedirs(os.path.join(settings.UPLOAD_DIR, JOB_AUDIO_DIR), exist_ok=True)
+    new_jobs: List[dict] = []
+    saved: List[str] = []
+    
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form(max_files=settings.TRANSCRIPTION_JOB_MAX_FILES)
+            uploads = [
+                value for key, value in form.multi_items()
+                if key in ("files", "file") and not isinstance(value, str)
+            ]
+            if not uploads:
+                raise HTTPException(status_code=400, detail="No audio files provided")
+            for upload in uploads:
+                _check_extension(upload.filename)
+            
+            for upload in uploads:
+                job_id = str(uuid.uuid4())
+                path = job_audio_path(job_id, upload.filename)
+                saved.append(path)
+                size = await asyncio.to_thread(_copy_upload, upload, path)
+                new_jobs.append(_new_job(upload.filename, size, path, job_id, patient_id, current_user))
+        else:
+            if not filename:
+                raise HTTPException(status_code=400, detail="filename query parameter required for streamed uploads")
+            _check_extension(filename)
+            
+            job_id = str(uuid.uuid4())
+            path = job_audio_path(job_id, filename)
+            saved.append(path)
+            size = await _save_stream(request, path)
+            if size == 0:
+                raise HTTPException(status_code=400, detail="Empty audio data")
+            new_jobs.append(_new_job(filename, size, path, job_id, patient_id, current_user))
+        
+        await jobs.insert_many(new_jobs)
+    
+    except BaseException:
+        for path in saved:
+            if os.path.exists(path):
+                os.unlink(path)
+        raise
+    
+    transcription_job_runner.notify()
+    
+    return {
+        "jobs": [
+            {"job_id": job["job_id"], "filename": job["filename"], "size": job["size"], "status": job["status"]}
+            for job in new_jobs
+        ],
+        "count": len(new_jobs),
+        "message": f"{len(new_jobs)} transcription job(s) queued"
+    }
+
+
+@router.get("")
+async def get_transcription_jobs(
+    skip: int = 0,
+    limit: int = 50,
+    status: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get transcription jobs list (without transcript text)"""
+    jobs = get_transcription_jobs_collection()
+    check_database_connection(jobs)
+    
+    query = {"submitted_by": current_user["username"]}
+    if status:
+        if status not in VALID_JOB_STATUSES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid status. Use: {', '.join(sorted(VALID_JOB_STATUSES))}"
+            )
+        query["status"] = status
+    
+    cursor = jobs.find(query, {"text": 0}).sort("created_at", -1).skip(skip).limit(limit)
+    job_list = await cursor.to_list(limit)
+    total = await jobs.count_documents(query)
+    
+    return {
+        "jobs": [_serialize_job(job) for job in job_list],
+        "total": total,
+        "skip": skip,
+        "limit": limit
+    }
+
+
+@router.get("/{job_id}")
+async def get_transcription_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get job status, and the transcript once completed"""
+    jobs = get_transcription_jobs_collection()
+    check_database_connection(jobs)
+    
+    job = await jobs.find_one({"job_id": job_id, "submitted_by": current_user["username"]})
+    if not job:
+        raise HTTPException(status_code=404, detail="Transcription job not found")
+    
+    return _serialize_job(job)
@@ -37,10 +37,118 @@ class Settings(BaseSettings):
     GEMINI_API_KEY: str = ""
     LLM_PROVIDER: str = "openai"
     WHISPER_MODEL_SIZE: str = "base"
+    WHISPER_BACKEND: str = "whisper"  # whisper | ctranslate2
+    WHISPER_MODEL_DIR: str = ""  # converted CTranslate2 model; loads offline when set
+    WHISPER_COMPUTE_TYPE: str = "int8"  # ctranslate2 only: int8 | int8_float32 | float32
+    WHISPER_CPU_THREADS: int = 0  # per model, 0 = library default
+    
+    # Load Whisper and the Gemini SDK in the background at startup (false: on first use)
+    PRELOAD_MODELS: bool = True
+    
+    # Gemini calls: separate bounded thread pools for text and vision
+    LLM_TEXT_WORKERS: int = 4
+    LLM_TEXT_QUEUE_SIZE: int = 16
+    LLM_VISION_WORKERS: int = 2
+    LLM_VISION_QUEUE_SIZE: int = 8
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    LLM_VISION_TIMEOUT_SECONDS: float = 90.0
+    
+    # Gemini model routing: per-model circuit breakers over the fallback lists
+    MODEL_BREAKER_FAILURES: int = 3  # consecutive failures that open a model's breaker
+    MODEL_BREAKER_ERROR_RATE: float = 0.5  # or this error rate over the recent window
+    MODEL_BREAKER_MIN_CALLS: int = 10
+    MODEL_BREAKER_OPEN_SECONDS: float = 30.0  # doubles on every trip
+    MODEL_BREAKER_MAX_OPEN_SECONDS: float = 300.0
+    MODEL_HEALTH_WINDOW: int = 50  # recent calls per model used for scores
+    MODEL_SLOW_SECONDS: float = 20.0  # median latency above this demotes a model
+    
+    # Hedging: when the first model is slower than its recent p95, also ask the next one
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_BUDGET_RATIO: float = 0.1  # extra requests as a fraction of all requests
+    LLM_HEDGE_BUDGET_BURST: float = 5.0
+    LLM_HEDGE_DEFAULT_DELAY_SECONDS: float = 10.0  # until a model has latency history
+    LLM_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    
+    # Transcription workers
+    WHISPER_WORKERS: int = 1
+    WHISPER_EXECUTOR: str = "thread"  # thread | process
+    WHISPER_QUEUE_SIZE: int = 32
+    WHISPER_BATCHING: bool = False
+    WHISPER_BATCH_SIZE: int = 8
+    WHISPER_BATCH_WINDOW_MS: int = 50
+    
+    # Long recordings: split at pauses and transcribe shards in parallel
+    SHARDED_TRANSCRIPTION: bool = False
+    SHARDED_MIN_SECONDS: float = 300.0
+    SHARDED_SHARD_SECONDS: float = 120.0
+    SHARDED_OVERLAP_SECONDS: float = 2.0
+    
+    # Batch transcription jobs (REST uploads)
+    TRANSCRIPTION_JOB_CONCURRENCY: int = 2
+    TRANSCRIPTION_JOB_POLL_SECONDS: float = 5.0
+    TRANSCRIPTION_JOB_MAX_FILES: int = 100
+    TRANSCRIPTION_JOB_LEASE_SECONDS: float = 60.0  # a dead runner's jobs are reclaimed after this
+    TRANSCRIPTION_JOB_MAX_ATTEMPTS: int = 5
+    
+    # Transcription result cache
+    TRANSCRIPTION_CACHE_ENABLED: bool = True
+    TRANSCRIPTION_CACHE_MAX_MB: int = 32
+    TRANSCRIPTION_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    TRANSCRIPTION_CACHE_PERSISTENT: bool = True
+    
+    # AI summary cache (in-process LRU + MongoDB TTL collection)
+    SUMMARY_CACHE_ENABLED: bool = True
+    SUMMARY_CACHE_MAX_MB: int = 8
+    SUMMARY_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+    SUMMARY_CACHE_PERSISTENT: bool = True
+    
+    # Voice activity detection (silence trimming before Whisper)
+    VAD_ENABLED: bool = True
+    VAD_FRAME_MS: int = 30
+    VAD_ENERGY_THRESHOLD_DB: float = 12.0
+    VAD_MIN_ENERGY_DB: float = -55.0
+    VAD_SPEECH_FLOOR_DB: float = -40.0  # absolute speech level for audio without dynamic range
+    VAD_FLUX_THRESHOLD: float = 2.5
+    VAD_MIN_SPEECH_MS: int = 150
+    VAD_MIN_SILENCE_MS: int = 500
+    VAD_PADDING_MS: int = 200
+    
+    # Live session persistence (write-behind to conversation_sessions)
+    SESSION_PERSISTENCE: bool = True
+    SESSION_FLUSH_INTERVAL_MS: int = 250
+    SESSION_FLUSH_MAX_SEGMENTS: int = 500
+    
+    # Idle session eviction
+    SESSION_IDLE_TTL_SECONDS: int = 1800
+    SESSION_MEMORY_BUDGET_MB: int = 256
+    SESSION_SWEEP_INTERVAL_SECONDS: int = 30
+    
+    # Session registry shared by workers/nodes
+    SESSION_REGISTRY: str = "memory"  # memory | mongo
+    SESSION_REGISTRY_NODE_ID: str = ""  # default: hostname:pid
+    SESSION_REGISTRY_TTL_SECONDS: int = 60
+    SESSION_EVENTS_MAX_MB: int = 16
+    
+    # WebSocket outbound queues
+    WS_OUTBOX_MAX_MESSAGES: int = 256
+    WS_MAX_SEND_LAG_SECONDS: float = 10.0
+    WS_SLOW_CONSUMER_POLICY: str = "disconnect"  # disconnect | drop_oldest
+    
+    # Streaming transcription
+    STREAM_WINDOW_SECONDS: float = 10.0
+    STREAM_OVERLAP_SECONDS: float = 2.0
     
     # File limits
     MAX_IMAGE_SIZE_MB: int = 10
     MAX_AUDIO_SIZE_MB: int = 25
+    MAX_RECORDING_SIZE_MB: int = 500
+    AUDIO_SPOOL_THRESHOLD_MB: int = 4
+    # Recordings are scaled to this gated loudness before transcription
+    AUDIO_NORMALIZE_LOUDNESS: bool = True
+    AUDIO_TARGET_LOUDNESS_DBFS: float = -20.0
+    AUDIO_MAX_GAIN_DB: float = 12.0
+    # Partial recordings of resumable uploads are kept this long after a disconnect
+    UPLOAD_RESUME_TTL_SECONDS: int = 300
     
     @property
     def max_image_size(self) -> int:
@@ -50,6 +158,18 @@ class Settings(BaseSettings):
     def max_audio_size(self) -> int:
         return self.MAX_AUDIO_SIZE_MB * 1024 * 1024
     
+    @property
+    def max_recording_size(self) -> int:
+        return self.MAX_RECORDING_SIZE_MB * 1024 * 1024
+    
+    @property
+    def audio_spool_threshold(self) -> int:
+        return self.AUDIO_SPOOL_THRESHOLD_MB * 1024 * 1024
+    
+    @property
+    def session_memory_budget(self) -> int:
+        return self.SESSION_MEMORY_BUDGET_MB * 1024 * 1024
+    
     # CORS
     CORS_ORIGINS: List[str] = [
         "http://localhost:5173",
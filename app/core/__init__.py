@@ -22,6 +22,9 @@ from app.core.exceptions import (
     ValidationError,
     NotFoundError,
     AIServiceError,
+    TranscriptionBusyError,
+    AIBusyError,
+    ClientDisconnectedError,
     FileProcessingError,
     check_database_connection
 )
@@ -47,6 +50,9 @@ __all__ = [
     "ValidationError",
     "NotFoundError",
     "AIServiceError",
+    "TranscriptionBusyError",
+    "AIBusyError",
+    "ClientDisconnectedError",
     "FileProcessingError",
     "check_database_connection",
 ]
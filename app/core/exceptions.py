@@ -67,6 +67,45 @@ class AIServiceError(HTTPException):
         )
 
 
+class TranscriptionBusyError(HTTPException):
+    """Raised when the transcription queue is full"""
+    def __init__(self, retry_after: int = 5):
+        self.retry_after = retry_after
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": "Transcription service busy",
+                "message": f"Transcription queue is full, retry after {retry_after} seconds",
+                "retry_after": retry_after
+            },
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class AIBusyError(HTTPException):
+    """Raised when the AI service call queue is full"""
+    def __init__(self, retry_after: int = 5):
+        self.retry_after = retry_after
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={
+                "error": "AI service busy",
+                "message": f"AI request queue is full, retry after {retry_after} seconds",
+                "retry_after": retry_after
+            },
+            headers={"Retry-After": str(retry_after)}
+        )
+
+
+class ClientDisconnectedError(HTTPException):
+    """Raised when the client went away before a slow request finished"""
+    def __init__(self):
+        super().__init__(
+            status_code=499,
+            detail="Client closed request"
+        )
+
+
 class FileProcessingError(HTTPException):
     """Raised when file processing fails"""
     def __init__(self, detail: str = "File processing failed"):
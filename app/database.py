@@ -109,6 +109,24 @@ def get_patients_collection():
     return db.patient_records if db is not None else None
 
 
+def get_transcription_cache_collection():
+    """Get transcription cache collection"""
+    db = Database.get_db()
+    return db.transcription_cache if db is not None else None
+
+
+def get_summary_cache_collection():
+    """Get AI summary cache collection"""
+    db = Database.get_db()
+    return db.summary_cache if db is not None else None
+
+
+def get_transcription_jobs_collection():
+    """Get batch transcription jobs collection"""
+    db = Database.get_db()
+    return db.transcription_jobs if db is not None else None
+
+
 async def create_indexes():
     """Create database indexes for performance"""
     db = Database.get_db()
@@ -138,6 +156,22 @@ async def create_indexes():
         # Patient records
         await db.patient_records.create_index("patient_id", unique=True)
         
+        # Live conversation sessions (write-behind)
+        await db.conversation_sessions.create_index("session_id", unique=True)
+        await db.conversation_sessions.create_index([("doctor_id", 1), ("start_time", -1)])
+        
+        # Transcription cache with TTL
+        await db.transcription_cache.create_index("key", unique=True)
+        await db.transcription_cache.create_index("expires_at", expireAfterSeconds=0)
+        
+        # AI summary cache with TTL
+        await db.summary_cache.create_index("key", unique=True)
+        await db.summary_cache.create_index("expires_at", expireAfterSeconds=0)
+        
+        # Batch transcription jobs, claimed oldest first
+        await db.transcription_jobs.create_index("job_id", unique=True)
+        await db.transcription_jobs.create_index([("status", 1), ("created_at", 1)])
+        
         logger.info("Database indexes created")
         
     except Exception as e:
@@ -3,6 +3,7 @@ MedAI - Medical Transcription & Analysis System
 Main Application Entry Point
 """
 import os
+import asyncio
 import logging
 from datetime import datetime
 from contextlib import asynccontextmanager
@@ -16,7 +17,22 @@ from app.config import settings
 from app.database import Database, create_indexes, get_users_collection
 from app.core import get_password_hash
 from app.api import api_router, ws_router
-from app.services import load_whisper_model
+from app.services import (
+    ensure_whisper_model,
+    ensure_gemini,
+    shutdown_transcription_engine,
+    shutdown_llm_executors,
+    shutdown_hedgers,
+    transcription_job_runner,
+    session_store,
+    manager,
+    readiness
+)
+from app.services.component_readiness import (
+    COMPONENT_DATABASE,
+    COMPONENT_WHISPER,
+    COMPONENT_GEMINI
+)
 
 # Configure logging
 logging.basicConfig(
@@ -36,17 +52,16 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting MedAI Medical System...")
     
-    # Connect to database
-    await Database.connect()
-    
-    # Create indexes
-    await create_indexes()
-    
-    # Create default user if needed
-    await create_default_user()
+    # Flush live session changes to MongoDB in the background
+    session_store.start()
     
-    # Load Whisper model
-    load_whisper_model()
+    # Slow dependencies start in the background so the server accepts
+    # requests right away; /api/v1/analytics/ready reports when they are up
+    readiness.register(COMPONENT_DATABASE, COMPONENT_WHISPER, COMPONENT_GEMINI)
+    startup_tasks = [asyncio.create_task(bootstrap_database())]
+    if settings.PRELOAD_MODELS:
+        startup_tasks.append(asyncio.create_task(ensure_whisper_model()))
+        startup_tasks.append(asyncio.create_task(ensure_gemini()))
     
     # Ensure directories exist
     os.makedirs(settings.REPORTS_DIR, exist_ok=True)
@@ -60,10 +75,31 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("Shutting down MedAI...")
+    for task in startup_tasks:
+        task.cancel()
+    await asyncio.gather(*startup_tasks, return_exceptions=True)
+    await transcription_job_runner.shutdown()
+    await manager.shutdown()
+    await session_store.shutdown()
+    await shutdown_transcription_engine()
+    shutdown_llm_executors()
+    shutdown_hedgers()
     await Database.disconnect()
     logger.info("Shutdown complete")
 
 
+async def bootstrap_database():
+    """Connect to MongoDB, prepare it, then start the services that use it"""
+    if await readiness.track(COMPONENT_DATABASE, Database.connect()):
+        await asyncio.gather(create_indexes(), create_default_user())
+    
+    # Join the session registry and evict idle sessions in the background
+    await manager.start()
+    
+    # Resume queued batch transcription jobs
+    await transcription_job_runner.start()
+
+
 async def create_default_user():
     """Create default admin user if not exists"""
     users = get_users_collection()
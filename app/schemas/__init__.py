@@ -17,6 +17,7 @@ from app.schemas.report import (
     SummaryInput,
     MedicalReportCreate,
     MedicalReportResponse,
+    TranscriptSegment,
     ConversationSession
 )
 from app.schemas.image import (
@@ -40,6 +41,7 @@ __all__ = [
     "SummaryInput",
     "MedicalReportCreate",
     "MedicalReportResponse",
+    "TranscriptSegment",
     "ConversationSession",
     # Image schemas
     "ImageAnalysisRequest",
@@ -3,8 +3,8 @@ MedAI - Pydantic Schemas
 Medical Report Schemas
 """
 from datetime import datetime
-from typing import Optional, Dict
-from pydantic import BaseModel, Field
+from typing import Optional, Dict, List
+from pydantic import BaseModel, Field, PrivateAttr, computed_field
 
 
 class SummaryInput(BaseModel):
@@ -47,8 +47,22 @@ class MedicalReportResponse(BaseModel):
     image_analysis: Optional[Dict] = None
 
 
+class TranscriptSegment(BaseModel):
+    """Schema for one transcribed piece of a conversation"""
+    index: int
+    text: str
+    start: Optional[float] = None  # seconds of session audio
+    end: Optional[float] = None
+    confidence: Optional[float] = Field(None, ge=0, le=1)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
 class ConversationSession(BaseModel):
-    """Schema for conversation session"""
+    """Schema for conversation session
+    
+    The transcript is an append-only list of segments; `transcript` joins
+    them on demand and caches the result until the next append.
+    """
     session_id: str
     patient_name: Optional[str] = None
     patient_age: Optional[int] = None
@@ -56,5 +70,47 @@ class ConversationSession(BaseModel):
     doctor_id: str
     start_time: datetime = Field(default_factory=datetime.utcnow)
     end_time: Optional[datetime] = None
-    transcript: str = ""
+    segments: List[TranscriptSegment] = Field(default_factory=list)
+    audio_seconds: float = 0.0
+    speech_seconds: float = 0.0
+    trimmed_seconds: float = 0.0
     status: str = Field(default="active", pattern="^(active|completed|archived)$")
+    
+    _joined: Optional[str] = PrivateAttr(default=None)
+    
+    @computed_field
+    @property
+    def transcript(self) -> str:
+        if self._joined is None:
+            self._joined = " ".join(segment.text for segment in self.segments)
+        return self._joined
+    
+    def append_segment(
+        self,
+        text: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        confidence: Optional[float] = None
+    ) -> TranscriptSegment:
+        """Append a segment in O(1) and advance the session audio clock"""
+        segment = TranscriptSegment(
+            index=len(self.segments),
+            text=text,
+            start=start,
+            end=end,
+            confidence=confidence
+        )
+        self.segments.append(segment)
+        self._joined = None
+        if end is not None:
+            self.audio_seconds = max(self.audio_seconds, end)
+        return segment
+    
+    def segments_since(self, index: int) -> List[TranscriptSegment]:
+        """Segments a client that already has `index` segments is missing"""
+        return self.segments[index:]
+    
+    def clear_segments(self):
+        """Drop the transcript (the audio clock keeps running)"""
+        self.segments = []
+        self._joined = None
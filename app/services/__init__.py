@@ -4,13 +4,47 @@ MedAI - Services Package
 from app.services.ai_service import (
     is_ai_available,
     is_vision_available,
-    generate_medical_summary
+    ensure_gemini,
+    generate_medical_summary,
+    get_summary_cache_stats,
+    get_coalescing_stats,
+    get_model_health,
+    get_hedging_stats,
+    shutdown_hedgers
+)
+from app.services.model_router import ModelRouter, Hedger
+from app.services.llm_executor import (
+    LLMExecutor,
+    llm_executors,
+    get_llm_stats,
+    shutdown_llm_executors,
+    until_disconnected
 )
 from app.services.transcription_service import (
     load_whisper_model,
+    ensure_whisper_model,
     get_whisper_model,
     is_transcription_available,
-    transcribe_audio
+    transcribe_audio,
+    get_transcription_stats,
+    get_transcription_cache_stats,
+    shutdown_transcription_engine
+)
+from app.services.transcription_jobs import (
+    TranscriptionJobRunner,
+    transcription_job_runner
+)
+from app.services.streaming_service import (
+    StreamingTranscriber,
+    merge_overlapping_text
+)
+from app.services.component_readiness import (
+    ReadinessTracker,
+    readiness
+)
+from app.services.upload_spool import (
+    UploadSpools,
+    upload_spools
 )
 from app.services.image_service import (
     analyze_medical_image
@@ -20,19 +54,50 @@ from app.services.pdf_service import (
 )
 from app.services.websocket_manager import (
     ConnectionManager,
-    manager
+    manager,
+    session_store
 )
 
 __all__ = [
     # AI Service
     "is_ai_available",
     "is_vision_available",
+    "ensure_gemini",
     "generate_medical_summary",
+    "get_summary_cache_stats",
+    "get_coalescing_stats",
+    "get_model_health",
+    "get_hedging_stats",
+    "shutdown_hedgers",
+    "ModelRouter",
+    "Hedger",
+    # LLM execution
+    "LLMExecutor",
+    "llm_executors",
+    "get_llm_stats",
+    "shutdown_llm_executors",
+    "until_disconnected",
     # Transcription
     "load_whisper_model",
+    "ensure_whisper_model",
     "get_whisper_model",
     "is_transcription_available",
     "transcribe_audio",
+    "get_transcription_stats",
+    "get_transcription_cache_stats",
+    "shutdown_transcription_engine",
+    # Transcription jobs
+    "TranscriptionJobRunner",
+    "transcription_job_runner",
+    # Streaming
+    "StreamingTranscriber",
+    "merge_overlapping_text",
+    # Readiness
+    "ReadinessTracker",
+    "readiness",
+    # Resumable uploads
+    "UploadSpools",
+    "upload_spools",
     # Image Analysis
     "analyze_medical_image",
     # PDF
@@ -40,4 +105,5 @@ __all__ = [
     # WebSocket
     "ConnectionManager",
     "manager",
+    "session_store",
 ]
@@ -4,109 +4,419 @@ Gemini AI Integration for Medical Analysis
 """
 import logging
 import json
+import time
 import asyncio
-from typing import Dict, Optional
+import hashlib
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Awaitable, Callable, Dict, Optional
 
 from app.config import settings
+from app.core.exceptions import AIBusyError
+from app.services.component_readiness import readiness, COMPONENT_GEMINI, STATE_DISABLED
+from app.services.llm_executor import llm_executors, WORKLOAD_TEXT, WORKLOAD_VISION
+from app.services.model_router import ModelRouter, Hedger
+from app.services.summary_cache import SummaryCache, prompt_version
 
 logger = logging.getLogger("MedAI.AIService")
 
-# Initialize Gemini
+# Gemini models - configured on first use, importing the SDK is slow
 gemini_model = None
 gemini_vision_model = None
+_gemini_configured = False
+_gemini_lock = threading.Lock()
 
-try:
-    import google.generativeai as genai
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
+]
+
+GENERATION_CONFIG = {
+    "temperature": 0.1,
+    "top_p": 0.8,
+    "top_k": 40,
+    "max_output_tokens": 2048,
+}
+
+# Priority list for models
+# Using verified names from genai.list_models()
+# 1. Flash 2.0 (state of the art, very fast)
+# 2. Flash Latest alias
+# 3. 1.5 Flash (legacy stable name)
+# 4. Pro Latest alias
+TEXT_MODEL_PRIORITY = [
+    "gemini-2.0-flash", 
+    "gemini-flash-latest", 
+    "gemini-1.5-flash", 
+    "gemini-pro-latest", 
+    "gemini-pro"
+]
+
+VISION_MODEL_PRIORITY = [
+    "gemini-2.0-flash", 
+    "gemini-flash-latest", 
+    "gemini-1.5-flash", 
+    "gemini-pro-latest"
+]
+
+
+SUMMARY_PROMPT = """
+        You are a medical transcription specialist analyzing a doctor-patient conversation.
+        
+        CONVERSATION TYPE: {conversation_type}
+        TRANSCRIPT: {transcript}
+        
+        Extract and structure all medical information into this exact JSON format:
+        {{
+            "present_complaints": "Detailed description of patient's main symptoms",
+            "clinical_details": "Relevant medical history, medications, allergies",
+            "physical_examination": "Vital signs and examination findings",
+            "impression": "Clinical assessment and differential diagnoses",
+            "management_plan": "Treatments, medications with dosages, follow-up",
+            "additional_notes": "Patient education and other notes"
+        }}
+        
+        Return ONLY valid JSON, no additional text.
+        """
+
+# Changes whenever the prompt or generation settings change, invalidating cached summaries
+SUMMARY_PROMPT_VERSION = prompt_version(SUMMARY_PROMPT, GENERATION_CONFIG, SAFETY_SETTINGS)
+
+REQUIRED_SUMMARY_FIELDS = [
+    "present_complaints", "clinical_details", "physical_examination",
+    "impression", "management_plan", "additional_notes"
+]
+
+# Shared by the text and vision models: both lists name the same Gemini models
+gemini_router = ModelRouter(
+    failure_threshold=settings.MODEL_BREAKER_FAILURES,
+    error_rate_threshold=settings.MODEL_BREAKER_ERROR_RATE,
+    min_calls=settings.MODEL_BREAKER_MIN_CALLS,
+    open_seconds=settings.MODEL_BREAKER_OPEN_SECONDS,
+    max_open_seconds=settings.MODEL_BREAKER_MAX_OPEN_SECONDS,
+    window=settings.MODEL_HEALTH_WINDOW,
+    slow_seconds=settings.MODEL_SLOW_SECONDS
+)
+
+# Optional: race a slow first model against the next one, within a budget
+gemini_hedgers = {
+    workload: Hedger(
+        gemini_router,
+        workload,
+        # Up to two attempts per call, plus losers still finishing
+        workers=4 * workers,
+        budget_ratio=settings.LLM_HEDGE_BUDGET_RATIO,
+        budget_burst=settings.LLM_HEDGE_BUDGET_BURST,
+        default_delay=settings.LLM_HEDGE_DEFAULT_DELAY_SECONDS,
+        min_delay=settings.LLM_HEDGE_MIN_DELAY_SECONDS
+    )
+    for workload, workers in (
+        (WORKLOAD_TEXT, settings.LLM_TEXT_WORKERS),
+        (WORKLOAD_VISION, settings.LLM_VISION_WORKERS)
+    )
+} if settings.LLM_HEDGING_ENABLED else {}
+
+# Regenerated reports and client retries of the same transcript skip Gemini
+summary_cache = SummaryCache(
+    max_bytes=settings.SUMMARY_CACHE_MAX_MB * 1024 * 1024,
+    ttl=settings.SUMMARY_CACHE_TTL_SECONDS,
+    persistent=settings.SUMMARY_CACHE_PERSISTENT
+)
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls into one
     
-    class FallbackGenerativeModel:
-        """Wrapper for Gemini models with automatic fallback"""
-        def __init__(self, model_preferred_names, generation_config=None, safety_settings=None):
-            self.model_names = model_preferred_names
-            self.generation_config = generation_config
-            self.safety_settings = safety_settings
-            self._models = {}
-            
-        def _get_model(self, name):
-            if name not in self._models:
-                self._models[name] = genai.GenerativeModel(
-                    name,
-                    generation_config=self.generation_config,
-                    safety_settings=self.safety_settings
-                )
-            return self._models[name]
+    The first caller for a key starts the call; callers arriving while it
+    runs wait for the same result (or exception). The shared call is
+    cancelled only when every caller waiting for it has been cancelled.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[str, list] = {}
+        self.calls = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, fn: Callable[[], Awaitable]):
+        flight = self._flights.get(key)
+        if flight is None:
+            # [task, number of waiting callers]
+            flight = [asyncio.ensure_future(fn()), 0]
+            self._flights[key] = flight
+            flight[0].add_done_callback(lambda _: self._forget(key, flight))
+            self.calls += 1
+        else:
+            self.coalesced += 1
+        
+        flight[1] += 1
+        try:
+            return await asyncio.shield(flight[0])
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and not flight[0].done():
+                flight[0].cancel()
+    
+    def _forget(self, key: str, flight: list):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+    
+    def get_stats(self) -> dict:
+        requests = self.calls + self.coalesced
+        return {
+            "upstream_calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+            "coalesced_ratio": round(self.coalesced / requests, 3) if requests else 0.0
+        }
+
+
+# Identical summarize/analyze requests in flight share one Gemini call
+single_flight = SingleFlight()
+
+
+def flight_key(*parts) -> str:
+    """Hash of a prompt and its payload (text or raw bytes)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        data = part if isinstance(part, (bytes, bytearray, memoryview)) else str(part).encode("utf-8")
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+class FallbackGenerativeModel:
+    """Wrapper for Gemini models with automatic fallback
+    
+    Models are tried in the order the router gives (healthy models by
+    priority, then degraded ones); models whose breaker is open are skipped.
+    With a hedger, a slow first model is raced against the next one.
+    """
+    def __init__(self, model_preferred_names, generation_config=None, safety_settings=None, router=None, hedger=None):
+        self.model_names = model_preferred_names
+        self.generation_config = generation_config
+        self.safety_settings = safety_settings
+        self.router = router or ModelRouter()
+        self.hedger = hedger
+        self._models = {}
+    
+    def _get_model(self, name):
+        if name not in self._models:
+            import google.generativeai as genai
+            self._models[name] = genai.GenerativeModel(
+                name,
+                generation_config=self.generation_config,
+                safety_settings=self.safety_settings
+            )
+        return self._models[name]
+    
+    def _attempt(self, name, contents, kwargs, call):
+        started = time.monotonic()
+        try:
+            model = self._get_model(name)
+            # For simple prompt strings, this works. For vision lists [prompt, image], it also works.
+            response = model.generate_content(contents, **kwargs)
+        except Exception:
+            self.router.record_failure(name, time.monotonic() - started, call)
+            raise
+        self.router.record_success(name, time.monotonic() - started, call)
+        return response
+    
+    def _candidates(self, ordered, call):
+        """Models that may be called now, claiming each only when it is about to be tried"""
+        for name in ordered:
+            if self.router.acquire(name, call):
+                yield name
+    
+    def generate_content(self, contents, **kwargs):
+        # Identifies this call to the router as the owner of any probe it claims
+        call = object()
+        ordered = self.router.order(self.model_names)
+        candidates = self._candidates(ordered, call)
+        if self.hedger is not None:
+            self.hedger.budget.earn()
+            return self._generate_hedged(ordered, candidates, contents, kwargs, call)
+        
+        last_exception = None
+        attempted = False
+        for name in candidates:
+            attempted = True
+            try:
+                return self._attempt(name, contents, kwargs, call)
+            except Exception as e:
+                logger.warning(f"Gemini model {name} failed: {e}. Trying next available model...")
+                last_exception = e
+        
+        if not attempted:
+            return self._attempt_broken(ordered, contents, kwargs, call)
+        
+        logger.error(f"All Gemini models ({self.model_names}) failed.")
+        raise last_exception
+    
+    def _attempt_broken(self, ordered, contents, kwargs, call):
+        # Every breaker is open: probe the model closest to reopening rather than fail outright
+        logger.warning(f"All Gemini models ({self.model_names}) are circuit-broken, trying {ordered[0]}")
+        self.router.acquire(ordered[0], call, force=True)
+        return self._attempt(ordered[0], contents, kwargs, call)
+    
+    def _generate_hedged(self, ordered, candidates, contents, kwargs, call):
+        """Fallback with at most one hedge: if the first model is slower than
+        its recent p95, the next model gets the same call and the first
+        answer wins. Failures fall back to the next model as usual."""
+        hedger = self.hedger
+        pending = {}
+        
+        def launch():
+            name = next(candidates, None)
+            if name is not None:
+                pending[hedger.submit(self._attempt, name, contents, kwargs, call)] = name
+            return name
+        
+        primary = launch()
+        if primary is None:
+            return self._attempt_broken(ordered, contents, kwargs, call)
+        
+        hedge = None
+        hedge_decided = False
+        last_exception = None
+        while pending:
+            timeout = None if hedge_decided else hedger.delay(primary)
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                hedge_decided = True
+                if hedger.try_hedge():
+                    hedge = launch()
+                    if hedge is None:
+                        hedger.budget.refund()
+                    else:
+                        logger.info(f"Gemini model {primary} slower than {timeout:.1f}s, hedging with {hedge}")
+                continue
             
-        def generate_content(self, contents, **kwargs):
-            last_exception = None
-            for name in self.model_names:
+            for future in done:
+                name = pending.pop(future)
                 try:
-                    model = self._get_model(name)
-                    # For simple prompt strings, this works. For vision lists [prompt, image], it also works.
-                    return model.generate_content(contents, **kwargs)
+                    response = future.result()
                 except Exception as e:
                     logger.warning(f"Gemini model {name} failed: {e}. Trying next available model...")
                     last_exception = e
+                    continue
+                # The loser is dropped if still queued; a running call is left to finish
+                for loser, loser_name in pending.items():
+                    if loser.cancel():
+                        # It never ran, so it must not keep a probe it claimed
+                        self.router.release(loser_name, call)
+                hedger.record(hedge is not None, name == hedge)
+                return response
             
-            logger.error(f"All Gemini models ({self.model_names}) failed.")
-            raise last_exception
-
-    if settings.GEMINI_API_KEY:
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        
-        safety_settings = [
-            {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-            {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_MEDIUM_AND_ABOVE"},
-        ]
-        
-        generation_config = {
-            "temperature": 0.1,
-            "top_p": 0.8,
-            "top_k": 40,
-            "max_output_tokens": 2048,
-        }
+            if not pending:
+                # Plain fallback once nothing is in flight; a hedge is only sent for the first model
+                hedge_decided = True
+                launch()
         
-        # Priority list for models
-        # Using verified names from genai.list_models()
-        # 1. Flash 2.0 (state of the art, very fast)
-        # 2. Flash Latest alias
-        # 3. 1.5 Flash (legacy stable name)
-        # 4. Pro Latest alias
-        text_model_priority = [
-            "gemini-2.0-flash", 
-            "gemini-flash-latest", 
-            "gemini-1.5-flash", 
-            "gemini-pro-latest", 
-            "gemini-pro"
-        ]
-        
-        vision_model_priority = [
-            "gemini-2.0-flash", 
-            "gemini-flash-latest", 
-            "gemini-1.5-flash", 
-            "gemini-pro-latest"
-        ]
-        
-        gemini_model = FallbackGenerativeModel(
-            text_model_priority,
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
+        hedger.record(hedge is not None, False)
+        logger.error(f"All Gemini models ({self.model_names}) failed.")
+        raise last_exception
+
+
+def configure_gemini() -> bool:
+    """Import the Gemini SDK and build the models, once (blocking)"""
+    global gemini_model, gemini_vision_model, _gemini_configured
+    
+    with _gemini_lock:
+        if _gemini_configured:
+            return gemini_model is not None
+        _gemini_configured = True
         
-        gemini_vision_model = FallbackGenerativeModel(
-            vision_model_priority,
-            generation_config=generation_config,
-            safety_settings=safety_settings
-        )
+        if not settings.GEMINI_API_KEY:
+            logger.warning("Gemini API key not configured")
+            return False
         
-        logger.info("Gemini AI configured with fallback support")
-    else:
-        logger.warning("Gemini API key not configured")
+        try:
+            import google.generativeai as genai
+            genai.configure(api_key=settings.GEMINI_API_KEY)
+            
+            gemini_model = FallbackGenerativeModel(
+                TEXT_MODEL_PRIORITY,
+                generation_config=GENERATION_CONFIG,
+                safety_settings=SAFETY_SETTINGS,
+                router=gemini_router,
+                hedger=gemini_hedgers.get(WORKLOAD_TEXT)
+            )
+            
+            gemini_vision_model = FallbackGenerativeModel(
+                VISION_MODEL_PRIORITY,
+                generation_config=GENERATION_CONFIG,
+                safety_settings=SAFETY_SETTINGS,
+                router=gemini_router,
+                hedger=gemini_hedgers.get(WORKLOAD_VISION)
+            )
+            
+            logger.info("Gemini AI configured with fallback support")
+        except ImportError:
+            logger.warning("google-generativeai package not installed")
+        except Exception as e:
+            logger.error(f"Gemini AI configuration failed: {e}")
         
-except ImportError:
-    logger.warning("google-generativeai package not installed")
-except Exception as e:
-    logger.error(f"Gemini AI configuration failed: {e}")
+        return gemini_model is not None
+
+
+async def ensure_gemini() -> bool:
+    """Configure Gemini off the event loop on first use"""
+    if _gemini_configured:
+        return gemini_model is not None
+    if not settings.GEMINI_API_KEY:
+        configure_gemini()
+        readiness.set(COMPONENT_GEMINI, STATE_DISABLED)
+        return False
+    return await readiness.track(COMPONENT_GEMINI, asyncio.to_thread(configure_gemini))
+
+
+def get_vision_model() -> Optional[FallbackGenerativeModel]:
+    """Get the Gemini vision model, if configured"""
+    return gemini_vision_model
+
+
+async def generate_content(model: FallbackGenerativeModel, contents, workload: str, *payload):
+    """Run `model.generate_content(contents)` on the workload's executor, coalescing duplicates
+    
+    `payload` identifies the contents for coalescing; it defaults to the
+    contents themselves, callers sending images pass the raw image bytes.
+    """
+    executor = llm_executors[workload]
+    key = flight_key(workload, *model.model_names, *(payload or (contents,)))
+    return await single_flight.do(key, lambda: executor.run(
+        model.generate_content,
+        contents,
+        request_options={"timeout": executor.timeout}
+    ))
+
+
+def get_coalescing_stats() -> dict:
+    """Get single-flight counters for Gemini calls"""
+    return single_flight.get_stats()
+
+
+def get_model_health() -> dict:
+    """Get circuit-breaker state and rolling health of each Gemini model"""
+    return gemini_router.get_stats()
+
+
+def get_hedging_stats() -> dict:
+    """Get per-workload hedging counters (empty when hedging is off)"""
+    return {workload: hedger.get_stats() for workload, hedger in gemini_hedgers.items()}
+
+
+def shutdown_hedgers():
+    for hedger in gemini_hedgers.values():
+        hedger.shutdown()
+
+
+def get_summary_cache_stats() -> dict:
+    """Get summary cache hit/miss counters"""
+    stats = summary_cache.get_stats()
+    stats["prompt_version"] = SUMMARY_PROMPT_VERSION
+    return stats
 
 
 def is_ai_available() -> bool:
@@ -121,33 +431,24 @@ def is_vision_available() -> bool:
 
 async def generate_medical_summary(transcript: str, conversation_type: str = "consultation") -> Dict:
     """Generate structured medical summary from transcript"""
-    if not gemini_model:
+    if not await ensure_gemini():
         return await basic_medical_parsing(transcript)
     
+    # Only summaries from the model are cached, never the keyword fallback
+    cache_key = None
+    if settings.SUMMARY_CACHE_ENABLED:
+        cache_key = summary_cache.summary_key(
+            transcript, conversation_type, gemini_model.model_names, SUMMARY_PROMPT_VERSION
+        )
+        cached = await summary_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Summary cache hit")
+            return cached
+    
     try:
-        prompt = f"""
-        You are a medical transcription specialist analyzing a doctor-patient conversation.
+        prompt = SUMMARY_PROMPT.format(conversation_type=conversation_type, transcript=transcript)
         
-        CONVERSATION TYPE: {conversation_type}
-        TRANSCRIPT: {transcript}
-        
-        Extract and structure all medical information into this exact JSON format:
-        {{
-            "present_complaints": "Detailed description of patient's main symptoms",
-            "clinical_details": "Relevant medical history, medications, allergies",
-            "physical_examination": "Vital signs and examination findings",
-            "impression": "Clinical assessment and differential diagnoses",
-            "management_plan": "Treatments, medications with dosages, follow-up",
-            "additional_notes": "Patient education and other notes"
-        }}
-        
-        Return ONLY valid JSON, no additional text.
-        """
-        
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: gemini_model.generate_content(prompt)
-        )
+        response = await generate_content(gemini_model, prompt, WORKLOAD_TEXT)
         
         response_text = response.text.strip()
         
@@ -161,21 +462,23 @@ async def generate_medical_summary(transcript: str, conversation_type: str = "co
             summary = json.loads(response_text.strip())
             
             # Validate required fields
-            required_fields = [
-                "present_complaints", "clinical_details", "physical_examination",
-                "impression", "management_plan", "additional_notes"
-            ]
-            
-            for field in required_fields:
+            for field in REQUIRED_SUMMARY_FIELDS:
                 if field not in summary or not summary[field]:
                     summary[field] = "Not documented"
             
-            return summary
-            
+            if cache_key is not None:
+                await summary_cache.set(cache_key, summary)
+            return dict(summary)
+        
         except json.JSONDecodeError:
             logger.warning("JSON parsing failed, using basic parsing")
             return await basic_medical_parsing(transcript)
-            
+    
+    except AIBusyError:
+        raise
+    except asyncio.TimeoutError:
+        logger.error("AI summarization timed out, using basic parsing")
+        return await basic_medical_parsing(transcript)
     except Exception as e:
         logger.error(f"AI summarization error: {e}")
         return await basic_medical_parsing(transcript)
@@ -0,0 +1,99 @@
+"""
+MedAI - Spooled Audio Buffer
+In-memory audio buffer that spills to a memory-mapped temp file
+"""
+import os
+import mmap
+import logging
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from app.config import settings
+
+logger = logging.getLogger("MedAI.AudioBuffer")
+
+
+class SpooledAudioBuffer:
+    """Append-only byte buffer for a recording
+    
+    Data stays in a bytearray until it grows past `threshold` bytes, then
+    moves to an unlinked temp file. Readers get a zero-copy memoryview
+    (over the bytearray or an mmap of the file) through `view()`; the view
+    must be released before the buffer is appended to again.
+    """
+    
+    def __init__(self, threshold: Optional[int] = None, directory: Optional[str] = None):
+        self.threshold = settings.audio_spool_threshold if threshold is None else threshold
+        self.directory = directory or settings.TEMP_DIR
+        self._memory: Optional[bytearray] = bytearray()
+        self._file = None
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __bool__(self) -> bool:
+        return self._size > 0
+    
+    @property
+    def spooled(self) -> bool:
+        """Whether the data has moved to disk"""
+        return self._file is not None
+    
+    @property
+    def memory_bytes(self) -> int:
+        """Bytes held in process memory"""
+        return len(self._memory) if self._memory is not None else 0
+    
+    def _spool(self):
+        os.makedirs(self.directory, exist_ok=True)
+        # Unnamed where supported, so the data never outlives the process
+        self._file = tempfile.TemporaryFile(dir=self.directory, prefix="audio_", suffix=".spool")
+        self._file.write(self._memory)
+        self._memory = None
+        logger.debug(f"Audio buffer spooled to disk at {self._size} bytes")
+    
+    def extend(self, chunk: bytes):
+        """Append a chunk"""
+        if self._file is None and self._size + len(chunk) > self.threshold:
+            self._spool()
+        
+        if self._file is not None:
+            self._file.write(chunk)
+        else:
+            self._memory.extend(chunk)
+        self._size += len(chunk)
+    
+    @contextmanager
+    def view(self) -> Iterator[memoryview]:
+        """Zero-copy view of the buffered bytes"""
+        if self._file is None:
+            data = memoryview(self._memory)
+            try:
+                yield data
+            finally:
+                data.release()
+            return
+        
+        self._file.flush()
+        mapped = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        data = memoryview(mapped)
+        try:
+            yield data
+        finally:
+            data.release()
+            mapped.close()
+    
+    def clear(self):
+        """Drop all data and return to the in-memory tier"""
+        self.close()
+        self._memory = bytearray()
+    
+    def close(self):
+        """Release memory and delete the spool file"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._memory = None
+        self._size = 0
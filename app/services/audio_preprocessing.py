@@ -0,0 +1,350 @@
+"""
+MedAI - Audio Preprocessing
+Vectorized PCM decode, downmix, polyphase resampling and loudness normalization
+"""
+import math
+import logging
+from typing import List, Optional
+
+import numpy as np
+
+from app.config import settings
+from app.services.audio_buffer import SpooledAudioBuffer
+
+logger = logging.getLogger("MedAI.AudioPreprocessing")
+
+# Whisper input rate
+SAMPLE_RATE = 16000
+
+# Raw PCM sample formats (little-endian)
+PCM_S16LE = "s16le"
+PCM_S24LE = "s24le"
+PCM_S32LE = "s32le"
+PCM_F32LE = "f32le"
+SAMPLE_WIDTHS = {PCM_S16LE: 2, PCM_S24LE: 3, PCM_S32LE: 4, PCM_F32LE: 4}
+
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 192000
+MAX_CHANNELS = 8
+
+# Resampling filter: windowed sinc, zero crossings per side and Kaiser window shape
+ZERO_CROSSINGS = 16
+KAISER_BETA = 8.0
+
+# Output samples computed per step, bounding the copy of strided input windows
+RESAMPLE_BLOCK = 8192
+
+# Loudness gating as in ITU-R BS.1770 (without K-weighting): 400 ms blocks,
+# -70 dBFS absolute gate, then a gate 10 dB below the mean of what is left
+LOUDNESS_BLOCK_SECONDS = 0.4
+ABSOLUTE_GATE = 10 ** (-70 / 10)
+RELATIVE_GATE = 10 ** (-10 / 10)
+
+# Normalized peaks stay below full scale
+PEAK_CEILING = 0.98
+
+
+def decode_pcm(data, sample_format: str = PCM_S16LE) -> np.ndarray:
+    """Convert raw little-endian PCM into float32 samples in [-1, 1]"""
+    if sample_format == PCM_S16LE:
+        return np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_format == PCM_S32LE:
+        return (np.frombuffer(data, dtype="<i4") / 2147483648.0).astype(np.float32)
+    if sample_format == PCM_F32LE:
+        return np.frombuffer(data, dtype="<f4").astype(np.float32)
+    if sample_format == PCM_S24LE:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        # Sign-extend the 24-bit values
+        values = (values << 8) >> 8
+        return values.astype(np.float32) / 8388608.0
+    raise ValueError(f"Unsupported PCM sample format: {sample_format}")
+
+
+def downmix(samples: np.ndarray, channels: int) -> np.ndarray:
+    """Average interleaved channels into mono"""
+    if channels == 1:
+        return samples
+    return samples.reshape(-1, channels).mean(axis=1, dtype=np.float32)
+
+
+class PolyphaseResampler:
+    """Streaming rational-ratio resampler
+    
+    Upsampling by `up`, low-pass filtering and downsampling by `down` are
+    done in one step: each output sample is the dot product of one phase of
+    the filter with the input samples under it, computed for a whole block
+    of outputs at once. The last `taps` inputs are kept between calls, so
+    chunks can be fed as they arrive and the output is the same as for the
+    whole recording at once.
+    """
+    
+    def __init__(self, src_rate: int, dst_rate: int = SAMPLE_RATE):
+        if not MIN_SAMPLE_RATE <= src_rate <= MAX_SAMPLE_RATE:
+            raise ValueError(f"Unsupported sample rate: {src_rate}")
+        
+        divisor = math.gcd(src_rate, dst_rate)
+        self.up = dst_rate // divisor
+        self.down = src_rate // divisor
+        self.passthrough = self.up == self.down
+        
+        # Low-pass at the lower of the two Nyquist rates, gain `up` to make up
+        # for the inserted zeros
+        length = 2 * ZERO_CROSSINGS * max(self.up, self.down) + 1
+        cutoff = 1.0 / max(self.up, self.down)
+        t = np.arange(length) - (length - 1) / 2
+        kernel = np.sinc(cutoff * t) * np.kaiser(length, KAISER_BETA)
+        kernel *= self.up / kernel.sum()
+        
+        # Phase p holds kernel[p], kernel[p + up], ...; shape (up, taps)
+        self.taps = -(-length // self.up)
+        padded = np.zeros(self.taps * self.up)
+        padded[:length] = kernel
+        phases = padded.reshape(self.taps, self.up).T
+        # Reversed so a phase lines up with a window of inputs in time order
+        self._reversed = np.ascontiguousarray(phases[:, ::-1], dtype=np.float32)
+        self._block = -(-RESAMPLE_BLOCK // self.up) * self.up
+        # Centre the filter so output sample n lines up with input time n * down / up
+        self._delay = (length - 1) // 2
+        self.reset()
+    
+    def reset(self):
+        # Inputs before the first sample are silence
+        self._buffer = np.zeros(self.taps, dtype=np.float32)
+        self._start = -self.taps
+        self._received = 0
+        self._emitted = 0
+    
+    def _compute(self, end: int) -> np.ndarray:
+        """Output samples from the next unemitted one up to `end` (exclusive)"""
+        first = self._emitted
+        out = np.zeros(max(0, end - first), dtype=np.float32)
+        # windows[i] = buffer[i:i + taps]; output n reads the window ending at
+        # input t // up, where t = n * down + delay
+        windows = np.lib.stride_tricks.sliding_window_view(self._buffer, self.taps)
+        step = self._block
+        for block in range(first, end, step):
+            block_end = min(block + step, end)
+            # Outputs n, n + up, n + 2 * up, ... share a filter phase and read
+            # windows `down` inputs apart: one strided matrix-vector product each
+            for n in range(block, min(block + self.up, block_end)):
+                t = n * self.down + self._delay
+                row = t // self.up - self._start - (self.taps - 1)
+                count = -(-(block_end - n) // self.up)
+                rows = windows[row:row + (count - 1) * self.down + 1:self.down]
+                out[n - first:block_end - first:self.up] = rows @ self._reversed[t % self.up]
+        self._emitted = max(self._emitted, end)
+        
+        # Keep only the inputs the next output still reaches back to
+        oldest = (self._emitted * self.down + self._delay) // self.up - (self.taps - 1)
+        drop = min(oldest - self._start, len(self._buffer))
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._start += drop
+        return out
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample the next chunk; output lags the input by half the filter"""
+        if self.passthrough:
+            return samples
+        
+        self._buffer = np.concatenate([self._buffer, samples.astype(np.float32, copy=False)])
+        self._received += len(samples)
+        
+        # Outputs whose newest input has arrived
+        end = (self._received * self.up - 1 - self._delay) // self.down + 1
+        return self._compute(end)
+    
+    def flush(self) -> np.ndarray:
+        """Emit the delayed tail at the end of the stream"""
+        if self.passthrough:
+            return np.zeros(0, dtype=np.float32)
+        
+        total = -(-self._received * self.up // self.down)
+        if total > self._emitted:
+            newest = ((total - 1) * self.down + self._delay) // self.up
+            padding = newest - (self._start + len(self._buffer)) + 1
+            if padding > 0:
+                self._buffer = np.concatenate([self._buffer, np.zeros(padding, dtype=np.float32)])
+        tail = self._compute(total)
+        self.reset()
+        return tail
+
+
+class PcmConverter:
+    """Raw PCM chunks in any supported rate, width and layout to 16 kHz mono float32
+    
+    Chunks may split frames; the partial frame is kept for the next one.
+    """
+    
+    def __init__(self, sample_rate: int = SAMPLE_RATE, channels: int = 1, sample_format: str = PCM_S16LE):
+        if sample_format not in SAMPLE_WIDTHS:
+            raise ValueError(f"Unsupported PCM sample format: {sample_format}")
+        if not 1 <= channels <= MAX_CHANNELS:
+            raise ValueError(f"Unsupported channel count: {channels}")
+        
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_format = sample_format
+        self.frame_bytes = SAMPLE_WIDTHS[sample_format] * channels
+        self._resampler = PolyphaseResampler(sample_rate)
+        self._remainder = b""
+    
+    def process(self, chunk) -> np.ndarray:
+        """Convert the next chunk of raw PCM"""
+        data = self._remainder + bytes(chunk) if self._remainder else chunk
+        usable = len(data) - len(data) % self.frame_bytes
+        self._remainder = bytes(data[usable:])
+        
+        samples = decode_pcm(memoryview(data)[:usable], self.sample_format)
+        return self._resampler.process(downmix(samples, self.channels))
+    
+    def flush(self) -> np.ndarray:
+        return self._resampler.flush()
+    
+    def reset(self):
+        self._resampler.reset()
+        self._remainder = b""
+
+
+class LoudnessMeter:
+    """Gated loudness and peak of 16 kHz audio, fed incrementally"""
+    
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        self.block = int(LOUDNESS_BLOCK_SECONDS * sample_rate)
+        self.peak = 0.0
+        self._energies: List[float] = []
+        self._remainder = np.zeros(0, dtype=np.float32)
+    
+    def add(self, samples: np.ndarray):
+        if not samples.size:
+            return
+        self.peak = max(self.peak, float(np.max(np.abs(samples))))
+        
+        data = np.concatenate([self._remainder, samples]) if self._remainder.size else samples
+        count = len(data) // self.block
+        if count:
+            blocks = data[:count * self.block].reshape(count, self.block)
+            self._energies.extend(np.mean(np.square(blocks), axis=1).tolist())
+        self._remainder = data[count * self.block:].copy()
+    
+    def loudness(self) -> Optional[float]:
+        """Loudness in dBFS, or None for silence"""
+        energies = np.array(self._energies, dtype=np.float64)
+        if self._remainder.size:
+            energies = np.append(energies, np.mean(np.square(self._remainder)))
+        
+        gated = energies[energies > ABSOLUTE_GATE]
+        if not gated.size:
+            return None
+        gated = gated[gated > gated.mean() * RELATIVE_GATE]
+        return float(10 * np.log10(gated.mean()))
+    
+    def gain(self, target_dbfs: Optional[float] = None, max_gain_db: Optional[float] = None) -> float:
+        """Linear gain that brings the audio to the target loudness without clipping"""
+        target_dbfs = settings.AUDIO_TARGET_LOUDNESS_DBFS if target_dbfs is None else target_dbfs
+        max_gain_db = settings.AUDIO_MAX_GAIN_DB if max_gain_db is None else max_gain_db
+        
+        loudness = self.loudness()
+        if loudness is None:
+            return 1.0
+        gain = 10 ** (float(np.clip(target_dbfs - loudness, -max_gain_db, max_gain_db)) / 20)
+        if self.peak * gain > PEAK_CEILING:
+            gain = PEAK_CEILING / self.peak
+        return gain
+
+
+def normalize_loudness(samples: np.ndarray, target_dbfs: Optional[float] = None) -> np.ndarray:
+    """Scale 16 kHz samples to the target loudness"""
+    meter = LoudnessMeter()
+    meter.add(samples)
+    gain = meter.gain(target_dbfs)
+    if gain == 1.0:
+        return samples
+    return samples * np.float32(gain)
+
+
+def preprocess_pcm(
+    data,
+    sample_rate: int = SAMPLE_RATE,
+    channels: int = 1,
+    sample_format: str = PCM_S16LE,
+    normalize: bool = False
+) -> np.ndarray:
+    """Convert a whole raw PCM recording to 16 kHz mono float32"""
+    converter = PcmConverter(sample_rate, channels, sample_format)
+    samples = converter.process(data)
+    tail = converter.flush()
+    if tail.size:
+        samples = np.concatenate([samples, tail])
+    return normalize_loudness(samples) if normalize else samples
+
+
+class PreprocessedRecording:
+    """A raw PCM recording converted chunk by chunk while it is received
+    
+    Decoding, resampling and loudness metering happen as chunks arrive, so
+    at `audio_end` only the normalization gain is left to apply. Converted
+    samples are held in a SpooledAudioBuffer and move to disk past the spool
+    threshold like the encoded recordings.
+    """
+    
+    def __init__(
+        self,
+        sample_rate: int = SAMPLE_RATE,
+        channels: int = 1,
+        sample_format: str = PCM_S16LE,
+        normalize: Optional[bool] = None
+    ):
+        self.converter = PcmConverter(sample_rate, channels, sample_format)
+        self.normalize = settings.AUDIO_NORMALIZE_LOUDNESS if normalize is None else normalize
+        self.bytes_in = 0
+        self._samples = SpooledAudioBuffer()
+        self._meter = LoudnessMeter()
+        self._flushed = False
+    
+    @property
+    def seconds(self) -> float:
+        return len(self._samples) / 4 / SAMPLE_RATE
+    
+    def _append(self, samples: np.ndarray):
+        if samples.size:
+            self._meter.add(samples)
+            self._samples.extend(memoryview(np.ascontiguousarray(samples, dtype=np.float32)).cast("B"))
+    
+    def feed(self, chunk):
+        """Convert and keep the next chunk"""
+        self.bytes_in += len(chunk)
+        self._append(self.converter.process(chunk))
+    
+    def finish(self, source=None) -> np.ndarray:
+        """All samples so far, normalized; can be called again (e.g. after a busy retry)
+        
+        `source` is the raw recording as stored elsewhere. If chunks were
+        received without passing through here (an upload resumed on a new
+        connection), it is converted from scratch instead.
+        """
+        if source is not None and len(source) != self.bytes_in:
+            converter = self.converter
+            return preprocess_pcm(
+                source, converter.sample_rate, converter.channels, converter.sample_format, self.normalize
+            )
+        
+        if not self._flushed:
+            self._append(self.converter.flush())
+            self._flushed = True
+        
+        gain = self._meter.gain() if self.normalize else 1.0
+        with self._samples.view() as view:
+            return np.frombuffer(view, dtype=np.float32) * np.float32(gain)
+    
+    def reset(self):
+        """Start a new recording"""
+        self.converter.reset()
+        self._samples.clear()
+        self._meter = LoudnessMeter()
+        self.bytes_in = 0
+        self._flushed = False
+    
+    def close(self):
+        self._samples.close()
@@ -0,0 +1,83 @@
+"""
+MedAI - Readiness
+Startup state of components that load in the background
+"""
+import time
+import logging
+from typing import Awaitable, Dict, Optional
+
+logger = logging.getLogger("MedAI.Readiness")
+
+STATE_PENDING = "pending"
+STATE_LOADING = "loading"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+STATE_DISABLED = "disabled"
+
+COMPONENT_DATABASE = "database"
+COMPONENT_WHISPER = "whisper"
+COMPONENT_GEMINI = "gemini"
+
+
+class ReadinessTracker:
+    """Records when each component started loading and how it ended
+    
+    The process is live as soon as it serves requests; it is ready once
+    every required component is ready.
+    """
+    
+    def __init__(self):
+        self._components: Dict[str, dict] = {}
+    
+    def register(self, *names: str):
+        """Report components as pending until they start loading"""
+        for name in names:
+            self._components.setdefault(name, {"state": STATE_PENDING})
+    
+    def set(self, name: str, state: str, error: Optional[str] = None):
+        component = self._components.setdefault(name, {"state": STATE_PENDING})
+        now = time.monotonic()
+        if state == STATE_LOADING:
+            component["started"] = now
+        elif "started" in component and state in (STATE_READY, STATE_FAILED):
+            component["seconds"] = round(now - component["started"], 2)
+        component["state"] = state
+        component["error"] = error
+    
+    def state(self, name: str) -> str:
+        return self._components.get(name, {}).get("state", STATE_PENDING)
+    
+    async def track(self, name: str, loader: Awaitable):
+        """Await a loader, marking the component ready unless it fails or returns None/False"""
+        self.set(name, STATE_LOADING)
+        try:
+            result = await loader
+        except Exception as e:
+            logger.error(f"{name} failed to load: {e}")
+            self.set(name, STATE_FAILED, str(e))
+            raise
+        if result is None or result is False:
+            self.set(name, STATE_FAILED, "unavailable")
+        else:
+            self.set(name, STATE_READY)
+            logger.info(f"{name} ready in {self._components[name].get('seconds', 0)}s")
+        return result
+    
+    def is_ready(self, *names: str) -> bool:
+        """Whether the given components (default: all known) are ready or disabled"""
+        names = names or tuple(self._components)
+        return all(self.state(name) in (STATE_READY, STATE_DISABLED) for name in names)
+    
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            name: {
+                "state": component["state"],
+                "seconds": component.get("seconds"),
+                "error": component.get("error")
+            }
+            for name, component in self._components.items()
+        }
+
+
+# Global readiness of the background-loaded components
+readiness = ReadinessTracker()
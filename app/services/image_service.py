@@ -6,10 +6,11 @@ import io
 import logging
 import asyncio
 from typing import Dict, Optional
-from PIL import Image as PILImage
 
 from app.config import settings
-from app.services.ai_service import gemini_vision_model
+from app.core.exceptions import AIBusyError
+from app.services.ai_service import ensure_gemini, get_vision_model, generate_content
+from app.services.llm_executor import WORKLOAD_VISION
 
 logger = logging.getLogger("MedAI.ImageAnalysis")
 
@@ -61,7 +62,9 @@ async def analyze_medical_image(
 ) -> Dict:
     """Analyze medical image using Gemini Vision"""
     
-    if not gemini_vision_model:
+    await ensure_gemini()
+    vision_model = get_vision_model()
+    if not vision_model:
         return {
             "findings": "AI model not configured",
             "diagnosis": "Not available",
@@ -76,6 +79,7 @@ async def analyze_medical_image(
             raise ValueError(f"Image exceeds {settings.MAX_IMAGE_SIZE_MB}MB limit")
         
         # Open image
+        from PIL import Image as PILImage
         image = PILImage.open(io.BytesIO(image_data))
         
         # Get appropriate prompt
@@ -88,15 +92,27 @@ async def analyze_medical_image(
         
         prompt = prompt_template.format(context=clinical_context or "Not provided")
         
-        # Generate analysis
-        response = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: gemini_vision_model.generate_content([prompt, image])
+        # Generate analysis on the vision pool, apart from text summaries;
+        # identical uploads in flight share one call
+        response = await generate_content(
+            vision_model, [prompt, image], WORKLOAD_VISION, prompt, image_data
         )
         
         analysis_text = response.text
         return parse_image_analysis(analysis_text, image_type)
-        
+    
+    except AIBusyError:
+        raise
+    except asyncio.TimeoutError:
+        logger.error("Image analysis timed out")
+        return {
+            "findings": "Analysis timed out",
+            "diagnosis": "Analysis failed",
+            "severity": "Unknown",
+            "recommendations": "Please retry or consult radiologist",
+            "confidence_score": 0.0,
+            "error": "timeout"
+        }
     except Exception as e:
         logger.error(f"Image analysis error: {e}")
         return {
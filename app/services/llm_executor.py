@@ -0,0 +1,194 @@
+"""
+MedAI - LLM Executor
+Bounded thread pools for blocking Gemini SDK calls, one per workload
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+from app.config import settings
+from app.core.exceptions import AIBusyError, ClientDisconnectedError
+
+logger = logging.getLogger("MedAI.LLMExecutor")
+
+WORKLOAD_TEXT = "text"
+WORKLOAD_VISION = "vision"
+
+# Number of recent calls used for wait/service time metrics
+METRICS_WINDOW = 200
+
+# How often a waiting request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+T = TypeVar("T")
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[int(q * (len(ordered) - 1))], 3) if ordered else 0.0
+
+
+class LLMExecutor:
+    """Runs blocking SDK calls of one workload on its own fixed-size thread pool
+    
+    At most `workers` calls run at once and `queue_size` more wait; beyond
+    that, calls fail fast with AIBusyError instead of piling up. A call that
+    times out or whose caller is cancelled is dropped if it is still queued;
+    one already running cannot be interrupted, so its result is discarded
+    and it keeps its worker until the SDK returns (SDK calls get the same
+    timeout, which bounds that).
+    """
+    
+    def __init__(self, name: str, workers: int = 4, queue_size: int = 16, timeout: float = 60.0):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.timeout = timeout
+        
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._cancelled = 0
+        self._abandoned = 0
+        self._wait_times: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._service_times: Deque[float] = deque(maxlen=METRICS_WINDOW)
+    
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue slot frees up"""
+        service = (sum(self._service_times) / len(self._service_times)) if self._service_times else 5.0
+        return max(1, int(round(service * (self._queued / self.workers + 1))))
+    
+    def _call(self, enqueued_at: float, fn: Callable, args, kwargs):
+        """Runs on a pool thread"""
+        started = time.monotonic()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        self._wait_times.append(started - enqueued_at)
+        try:
+            result = fn(*args, **kwargs)
+            with self._lock:
+                self._completed += 1
+            return result
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._service_times.append(time.monotonic() - started)
+    
+    async def run(self, fn: Callable[..., T], *args, timeout: Optional[float] = None, **kwargs) -> T:
+        """Call `fn(*args, **kwargs)` on the pool and wait at most `timeout` seconds"""
+        with self._lock:
+            if self._queued + self._running >= self.workers + self.queue_size:
+                self._rejected += 1
+                raise AIBusyError(self.retry_after())
+            self._queued += 1
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"llm-{self.name}")
+        
+        future = self._executor.submit(self._call, time.monotonic(), fn, args, kwargs)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            self._release(future)
+            logger.warning(f"{self.name} LLM call timed out after {timeout or self.timeout}s")
+            raise
+        except asyncio.CancelledError:
+            self._cancelled += 1
+            self._release(future)
+            raise
+    
+    def _release(self, future):
+        """Drop a call nobody waits for any more"""
+        if future.cancel():
+            # Never started, so _call did not take it off the queue
+            with self._lock:
+                self._queued -= 1
+        elif not future.done():
+            self._abandoned += 1
+    
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def get_stats(self) -> Dict:
+        """Queue depth, outcomes and latency metrics"""
+        waits = list(self._wait_times)
+        services = list(self._service_times)
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "timeout_seconds": self.timeout,
+            "queued": self._queued,
+            "in_flight": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "timeouts": self._timeouts,
+            "cancelled": self._cancelled,
+            "abandoned": self._abandoned,
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p95_wait_seconds": _percentile(waits, 0.95),
+            "avg_service_seconds": round(sum(services) / len(services), 3) if services else 0.0,
+            "p95_service_seconds": _percentile(services, 0.95)
+        }
+
+
+async def until_disconnected(request, awaitable: Awaitable[T], poll_interval: float = DISCONNECT_POLL_SECONDS) -> T:
+    """Await `awaitable`, cancelling it if the HTTP client goes away first"""
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+                raise ClientDisconnectedError()
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+# Text (summaries) and vision (image analysis) calls do not compete for threads
+llm_executors = {
+    WORKLOAD_TEXT: LLMExecutor(
+        WORKLOAD_TEXT,
+        workers=settings.LLM_TEXT_WORKERS,
+        queue_size=settings.LLM_TEXT_QUEUE_SIZE,
+        timeout=settings.LLM_TIMEOUT_SECONDS
+    ),
+    WORKLOAD_VISION: LLMExecutor(
+        WORKLOAD_VISION,
+        workers=settings.LLM_VISION_WORKERS,
+        queue_size=settings.LLM_VISION_QUEUE_SIZE,
+        timeout=settings.LLM_VISION_TIMEOUT_SECONDS
+    )
+}
+
+
+def get_llm_stats() -> Dict:
+    """Per-workload LLM executor metrics"""
+    return {name: executor.get_stats() for name, executor in llm_executors.items()}
+
+
+def shutdown_llm_executors():
+    for executor in llm_executors.values():
+        executor.shutdown()
@@ -0,0 +1,347 @@
+"""
+MedAI - Model Router
+Per-model circuit breakers, rolling health scores and request hedging for Gemini fallback routing
+"""
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("MedAI.ModelRouter")
+
+STATE_CLOSED = "closed"        # healthy, receives traffic
+STATE_OPEN = "open"            # failing, skipped until its cool-down ends
+STATE_HALF_OPEN = "half_open"  # cool-down over, one probe request in flight
+
+# Routing tiers: healthy models first, then degraded, both in priority order
+TIER_HEALTHY = 0
+TIER_DEGRADED = 1
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))] if ordered else 0.0
+
+
+class ModelHealth:
+    """Rolling outcomes and breaker state of one model"""
+    
+    def __init__(self, name: str, window: int):
+        self.name = name
+        # (succeeded, seconds) of recent calls
+        self.outcomes: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self.state = STATE_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.open_seconds = 0.0
+        self.trips = 0
+        self.probe_owner = None  # the call holding the half-open probe
+        self.calls = 0
+        self.failures = 0
+        self.skipped = 0
+    
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+    
+    def latency(self, q: float) -> float:
+        """Latency percentile of recent successful calls"""
+        return _percentile([seconds for ok, seconds in self.outcomes if ok], q)
+    
+    def reopens_at(self) -> float:
+        return self.opened_at + self.open_seconds
+
+
+class ModelRouter:
+    """Orders fallback models by health and guards each with a circuit breaker
+    
+    A model's breaker opens after `failure_threshold` consecutive failures,
+    or when at least `min_calls` recent calls fail at `error_rate_threshold`
+    or more. Open models are skipped; after a cool-down that doubles on
+    every trip (up to `max_open_seconds`) a single request probes the model
+    (half-open) and its outcome closes or re-opens the breaker.
+    
+    Models with a high recent error rate or slow median latency are tried
+    after healthy ones. One router can serve several FallbackGenerativeModel
+    instances (text and vision), which then share what they learn about a
+    model. Calls run on worker threads, so state is guarded by a lock.
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: int = 3,
+        error_rate_threshold: float = 0.5,
+        min_calls: int = 10,
+        open_seconds: float = 30.0,
+        max_open_seconds: float = 300.0,
+        window: int = 50,
+        degraded_error_rate: float = 0.2,
+        slow_seconds: float = 20.0
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.error_rate_threshold = error_rate_threshold
+        self.min_calls = max(1, min_calls)
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.window = window
+        self.degraded_error_rate = degraded_error_rate
+        self.slow_seconds = slow_seconds
+        
+        self._models: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+    
+    def _health(self, name: str) -> ModelHealth:
+        health = self._models.get(name)
+        if health is None:
+            health = self._models[name] = ModelHealth(name, self.window)
+        return health
+    
+    def _tier(self, health: ModelHealth) -> int:
+        degraded = (
+            (len(health.outcomes) >= self.min_calls and health.error_rate >= self.degraded_error_rate)
+            or health.latency(0.5) > self.slow_seconds
+        )
+        return TIER_DEGRADED if degraded else TIER_HEALTHY
+    
+    def order(self, names: List[str]) -> List[str]:
+        """Models to try, best first
+        
+        Open models whose cool-down has not ended go last, soonest to
+        reopen first, so callers still have something to try when every
+        breaker is open.
+        """
+        now = time.monotonic()
+        with self._lock:
+            available, blocked = [], []
+            for priority, name in enumerate(names):
+                health = self._health(name)
+                if health.state == STATE_CLOSED:
+                    available.append((self._tier(health), priority, name))
+                elif health.state == STATE_OPEN and now >= health.reopens_at():
+                    # Probe candidates keep their priority so a recovered primary wins again
+                    available.append((TIER_HEALTHY, priority, name))
+                else:
+                    blocked.append((health.reopens_at(), priority, name))
+            return [name for *_, name in sorted(available)] + [name for *_, name in sorted(blocked)]
+    
+    def acquire(self, name: str, owner=None, force: bool = False) -> bool:
+        """Whether a request may call the model now
+        
+        For a model whose cool-down ended (or any open model with `force`)
+        this claims the half-open probe for `owner`, which must then record
+        the outcome or release it.
+        """
+        with self._lock:
+            health = self._health(name)
+            if health.state == STATE_CLOSED:
+                return True
+            if health.state == STATE_OPEN and (force or time.monotonic() >= health.reopens_at()):
+                health.state = STATE_HALF_OPEN
+                health.probe_owner = owner
+                logger.info(f"Probing Gemini model {name} after {health.open_seconds:.0f}s open")
+                return True
+            health.skipped += 1
+            return False
+    
+    def _is_probe(self, health: ModelHealth, owner) -> bool:
+        return health.state == STATE_HALF_OPEN and health.probe_owner is owner
+    
+    def release(self, name: str, owner=None):
+        """Give back a probe claimed by `owner` whose call never ran"""
+        with self._lock:
+            health = self._health(name)
+            if self._is_probe(health, owner):
+                # Still past its cool-down, so the next request probes instead
+                health.state = STATE_OPEN
+                health.probe_owner = None
+    
+    def record_success(self, name: str, seconds: float, owner=None):
+        """Record a successful call; only the probe's success closes an open breaker
+        
+        A call started before the breaker opened may still succeed after;
+        that is recorded but does not close the breaker or reset its back-off.
+        """
+        with self._lock:
+            health = self._health(name)
+            health.calls += 1
+            health.consecutive_failures = 0
+            if self._is_probe(health, owner):
+                # A fresh window, so old failures do not trip it again at once
+                health.outcomes.clear()
+                health.state = STATE_CLOSED
+                health.probe_owner = None
+                health.trips = 0
+                logger.info(f"Gemini model {name} recovered, breaker closed")
+            health.outcomes.append((True, seconds))
+    
+    def record_failure(self, name: str, seconds: float, owner=None):
+        """Record a failed call; trips a closed breaker or re-opens after a failed probe"""
+        with self._lock:
+            health = self._health(name)
+            health.calls += 1
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.outcomes.append((False, seconds))
+            
+            if health.state == STATE_CLOSED:
+                tripped = (
+                    health.consecutive_failures >= self.failure_threshold
+                    or (len(health.outcomes) >= self.min_calls and health.error_rate >= self.error_rate_threshold)
+                )
+            else:
+                # Late failures of calls started before the breaker opened do not extend it
+                tripped = self._is_probe(health, owner)
+            if tripped:
+                health.probe_owner = None
+                health.trips += 1
+                health.state = STATE_OPEN
+                health.opened_at = time.monotonic()
+                health.open_seconds = min(self.max_open_seconds, self.open_seconds * 2 ** (health.trips - 1))
+                logger.warning(f"Gemini model {name} breaker open for {health.open_seconds:.0f}s")
+    
+    def latency(self, name: str, q: float) -> Optional[float]:
+        """Recent latency percentile of a model, or None without successful calls"""
+        with self._lock:
+            health = self._models.get(name)
+            if health is None or not any(ok for ok, _ in health.outcomes):
+                return None
+            return health.latency(q)
+    
+    def get_stats(self) -> Dict:
+        """Breaker state and rolling health of every model seen"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                name: {
+                    "state": health.state,
+                    "tier": "degraded" if self._tier(health) == TIER_DEGRADED else "healthy",
+                    "calls": health.calls,
+                    "failures": health.failures,
+                    "skipped": health.skipped,
+                    "trips": health.trips,
+                    "error_rate": round(health.error_rate, 3),
+                    "p50_latency_seconds": round(health.latency(0.5), 3),
+                    "p95_latency_seconds": round(health.latency(0.95), 3),
+                    "reopens_in_seconds": (
+                        round(max(0.0, health.reopens_at() - now), 1) if health.state == STATE_OPEN else None
+                    )
+                }
+                for name, health in self._models.items()
+            }
+
+
+class HedgeBudget:
+    """Token bucket capping hedged requests at a fraction of all requests
+    
+    Every request earns `ratio` tokens (up to `burst`), a hedge spends one.
+    """
+    
+    def __init__(self, ratio: float, burst: float):
+        self.ratio = ratio
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._lock = threading.Lock()
+    
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+    
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1.0:
+                return False
+            self._tokens -= 1.0
+            return True
+    
+    def refund(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1.0)
+
+
+class Hedger:
+    """Hedging policy of one FallbackGenerativeModel
+    
+    When the first model has not answered after `delay()` (its recent p95
+    latency, or `default_delay` until it has a history), the same call is
+    sent to the next model and the first answer wins. Attempts run on a
+    small thread pool of their own; a loser that already started cannot be
+    interrupted, so its answer is discarded when it arrives.
+    """
+    
+    def __init__(
+        self,
+        router: ModelRouter,
+        name: str,
+        workers: int = 8,
+        budget_ratio: float = 0.1,
+        budget_burst: float = 5.0,
+        percentile: float = 0.95,
+        default_delay: float = 10.0,
+        min_delay: float = 1.0
+    ):
+        self.router = router
+        self.name = name
+        self.workers = max(2, workers)
+        self.budget = HedgeBudget(budget_ratio, budget_burst)
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.budget_denied = 0
+    
+    def delay(self, model_name: str) -> float:
+        """Seconds to wait for `model_name` before hedging"""
+        latency = self.router.latency(model_name, self.percentile)
+        return max(self.min_delay, latency if latency is not None else self.default_delay)
+    
+    def try_hedge(self) -> bool:
+        """Spend budget on a hedge, or count the denial"""
+        if self.budget.try_spend():
+            return True
+        with self._lock:
+            self.budget_denied += 1
+        return False
+    
+    def submit(self, fn: Callable, *args) -> Future:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"hedge-{self.name}")
+            return self._executor.submit(fn, *args)
+    
+    def record(self, hedged: bool, hedge_won: bool):
+        with self._lock:
+            self.requests += 1
+            if hedged:
+                self.hedged += 1
+                if hedge_won:
+                    self.hedge_wins += 1
+                else:
+                    self.primary_wins += 1
+    
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+    
+    def get_stats(self) -> Dict:
+        """How often requests were hedged and which side answered first"""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "primary_wins": self.primary_wins,
+            "budget_denied": self.budget_denied,
+            "hedge_ratio": round(self.hedged / self.requests, 3) if self.requests else 0.0,
+            "hedge_win_rate": round(self.hedge_wins / self.hedged, 3) if self.hedged else 0.0
+        }
@@ -8,10 +8,6 @@ from datetime import datetime
 from typing import Dict
 from bson import ObjectId
 
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-
 from app.config import settings
 
 logger = logging.getLogger("MedAI.PDFService")
@@ -24,6 +20,11 @@ def ensure_reports_directory():
 
 def generate_report_pdf(report: Dict) -> str:
     """Generate professional medical PDF report"""
+    # reportlab is imported on first use to keep startup fast
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    
     ensure_reports_directory()
     
     try:
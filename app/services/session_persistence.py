@@ -0,0 +1,213 @@
+"""
+MedAI - Session Store
+Write-behind persistence of live conversation sessions to MongoDB
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.database import get_sessions_collection
+from app.schemas import ConversationSession, TranscriptSegment
+
+logger = logging.getLogger("MedAI.SessionStore")
+
+# Session fields rewritten from the in-memory object on every flush
+SNAPSHOT_FIELDS = (
+    "patient_name", "patient_age", "patient_gender", "end_time", "status",
+    "audio_seconds", "speech_seconds", "trimmed_seconds"
+)
+
+
+class _PendingWrite:
+    """Changes to one session that have not reached MongoDB yet"""
+    __slots__ = ("session", "segments", "reset")
+    
+    def __init__(self, session: ConversationSession):
+        self.session = session
+        self.segments: List[TranscriptSegment] = []
+        self.reset = False
+    
+    def absorb(self, newer: "_PendingWrite"):
+        """Fold a later write into this one (used when a flush fails)"""
+        self.session = newer.session
+        if newer.reset:
+            self.segments = newer.segments
+            self.reset = True
+        else:
+            self.segments.extend(newer.segments)
+    
+    def to_operation(self) -> UpdateOne:
+        """An idempotent update: applying it twice leaves the same document
+        
+        Segments carry their position, so instead of pushing them the
+        update rebuilds the array as the stored segments before the first
+        new index followed by the new ones. Replaying a batch after a
+        partial failure therefore never duplicates segments.
+        """
+        session = self.session
+        fields = {field: {"$literal": getattr(session, field)} for field in SNAPSHOT_FIELDS}
+        fields["updated_at"] = {"$literal": datetime.utcnow()}
+        fields["doctor_id"] = {"$ifNull": ["$doctor_id", {"$literal": session.doctor_id}]}
+        fields["start_time"] = {"$ifNull": ["$start_time", {"$literal": session.start_time}]}
+        
+        segments = {"$literal": [segment.model_dump() for segment in self.segments]}
+        first = self.segments[0].index if self.segments else 0
+        if self.reset or (self.segments and first == 0):
+            fields["segments"] = segments
+        elif self.segments:
+            fields["segments"] = {"$concatArrays": [
+                {"$slice": [{"$ifNull": ["$segments", []]}, first]},
+                segments
+            ]}
+        
+        return UpdateOne({"session_id": session.session_id}, [{"$set": fields}], upsert=True)
+
+
+class SessionStore:
+    """Buffers session changes in memory and flushes them as bulk writes
+    
+    Callers on the WebSocket path only record changes; a background task
+    writes everything that changed every `flush_interval` seconds with one
+    unordered bulk_write. Sessions are read back lazily on reconnect.
+    """
+    
+    def __init__(self, flush_interval: float = 0.25, max_pending_segments: int = 500, load_timeout: float = 2.0):
+        self.flush_interval = flush_interval
+        self.max_pending_segments = max_pending_segments
+        self.load_timeout = load_timeout
+        
+        self._pending: Dict[str, _PendingWrite] = {}
+        self._flushing: Dict[str, _PendingWrite] = {}
+        self._pending_segments = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        
+        self._flushes = 0
+        self._writes = 0
+        self._failures = 0
+        self._loads = 0
+        self._last_flush_seconds = 0.0
+    
+    @property
+    def started(self) -> bool:
+        return self._task is not None
+    
+    def _entry(self, session: ConversationSession) -> _PendingWrite:
+        entry = self._pending.get(session.session_id)
+        if entry is None:
+            entry = self._pending[session.session_id] = _PendingWrite(session)
+        return entry
+    
+    def _poke(self):
+        if self._wakeup is not None and self._pending_segments >= self.max_pending_segments:
+            self._wakeup.set()
+    
+    def mark_dirty(self, session: ConversationSession):
+        """Record that session fields (patient info, stats) changed"""
+        self._entry(session)
+    
+    def append_segment(self, session: ConversationSession, segment: TranscriptSegment):
+        """Record a new transcript segment"""
+        self._entry(session).segments.append(segment)
+        self._pending_segments += 1
+        self._poke()
+    
+    def reset_segments(self, session: ConversationSession):
+        """Record that the transcript was cleared"""
+        entry = self._entry(session)
+        entry.segments = []
+        entry.reset = True
+    
+    def unflushed_session(self, session_id: str) -> Optional[ConversationSession]:
+        """Session object with changes not yet confirmed by MongoDB, if any"""
+        entry = self._pending.get(session_id) or self._flushing.get(session_id)
+        return entry.session if entry else None
+    
+    async def load(self, session_id: str) -> Optional[ConversationSession]:
+        """Read a persisted session, or None if absent or the database is slow"""
+        sessions = get_sessions_collection()
+        if sessions is None:
+            return None
+        
+        try:
+            doc = await asyncio.wait_for(sessions.find_one({"session_id": session_id}), self.load_timeout)
+        except Exception as e:
+            logger.warning(f"Could not load session {session_id}: {e}")
+            return None
+        if not doc:
+            return None
+        
+        doc.pop("_id", None)
+        doc.pop("updated_at", None)
+        self._loads += 1
+        return ConversationSession.model_validate(doc)
+    
+    async def flush(self):
+        """Write all pending changes in one bulk operation"""
+        if not self._pending:
+            return
+        sessions = get_sessions_collection()
+        if sessions is None:
+            return
+        
+        batch, self._pending = self._pending, {}
+        self._flushing = batch
+        self._pending_segments = 0
+        started = asyncio.get_running_loop().time()
+        try:
+            await sessions.bulk_write([entry.to_operation() for entry in batch.values()], ordered=False)
+            self._flushes += 1
+            self._writes += len(batch)
+        except Exception as e:
+            # Put the batch back in front of anything recorded meanwhile
+            self._failures += 1
+            logger.warning(f"Session flush of {len(batch)} session(s) failed: {e}")
+            for session_id, newer in self._pending.items():
+                if session_id in batch:
+                    batch[session_id].absorb(newer)
+                else:
+                    batch[session_id] = newer
+            self._pending = batch
+            self._pending_segments = sum(len(entry.segments) for entry in batch.values())
+        finally:
+            self._flushing = {}
+            self._last_flush_seconds = asyncio.get_running_loop().time() - started
+    
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+    
+    def start(self):
+        """Start the background flush task"""
+        if self.started:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+    
+    async def shutdown(self):
+        """Stop the flush task and write what is left"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+    
+    def get_stats(self) -> dict:
+        """Write-behind queue and flush counters"""
+        return {
+            "pending_sessions": len(self._pending),
+            "pending_segments": self._pending_segments,
+            "flushes": self._flushes,
+            "session_writes": self._writes,
+            "failures": self._failures,
+            "loads": self._loads,
+            "last_flush_ms": round(self._last_flush_seconds * 1000, 1)
+        }
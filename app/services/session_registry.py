@@ -0,0 +1,212 @@
+"""
+MedAI - Session Registry
+Which node holds each live WebSocket session, and message fan-out between nodes
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from app.config import settings
+from app.database import Database
+
+logger = logging.getLogger("MedAI.SessionRegistry")
+
+REGISTRY_MEMORY = "memory"
+REGISTRY_MONGO = "mongo"
+
+# Event kinds exchanged between nodes
+EVENT_MESSAGE = "message"  # deliver `message` to `session_id`, or to every session if None
+EVENT_CLAIM = "claim"      # `session_id` connected on `origin`; other nodes drop their copy
+EVENT_RELEASE = "release"  # `session_id` disconnected from `origin`
+
+EventHandler = Callable[[dict], Awaitable[None]]
+
+
+class SessionRegistry:
+    """Interface for session ownership lookup and pub/sub between nodes
+    
+    A node is one ConnectionManager (one uvicorn worker). Events published
+    by a node are delivered to the handlers of every other node.
+    """
+    
+    async def start(self, node_id: str, handler: EventHandler):
+        raise NotImplementedError
+    
+    async def shutdown(self, node_id: str):
+        raise NotImplementedError
+    
+    async def register(self, session_id: str, node_id: str):
+        raise NotImplementedError
+    
+    async def unregister(self, session_id: str, node_id: str):
+        raise NotImplementedError
+    
+    async def locate(self, session_id: str) -> Optional[str]:
+        raise NotImplementedError
+    
+    async def publish(self, event: dict):
+        raise NotImplementedError
+    
+    async def count_connections(self) -> int:
+        raise NotImplementedError
+
+
+class InMemorySessionRegistry(SessionRegistry):
+    """Registry for a single process (the default)
+    
+    Several managers can share one instance, which makes it a local
+    stand-in for multi-worker deployments in tests.
+    """
+    
+    def __init__(self):
+        self._owners: Dict[str, str] = {}
+        self._handlers: Dict[str, EventHandler] = {}
+    
+    async def start(self, node_id: str, handler: EventHandler):
+        self._handlers[node_id] = handler
+    
+    async def shutdown(self, node_id: str):
+        self._handlers.pop(node_id, None)
+        for session_id in [s for s, owner in self._owners.items() if owner == node_id]:
+            del self._owners[session_id]
+    
+    async def register(self, session_id: str, node_id: str):
+        self._owners[session_id] = node_id
+    
+    async def unregister(self, session_id: str, node_id: str):
+        if self._owners.get(session_id) == node_id:
+            del self._owners[session_id]
+    
+    async def locate(self, session_id: str) -> Optional[str]:
+        return self._owners.get(session_id)
+    
+    async def publish(self, event: dict):
+        for node_id, handler in list(self._handlers.items()):
+            if node_id != event["origin"]:
+                await handler(event)
+    
+    async def count_connections(self) -> int:
+        return len(self._owners)
+
+
+class MongoSessionRegistry(SessionRegistry):
+    """Registry shared by all workers and nodes through MongoDB
+    
+    Ownership lives in `session_registry`, refreshed by a heartbeat and
+    expired by a TTL index so sessions of crashed nodes disappear. Events go
+    through the capped `session_events` collection, which every node follows
+    with a tailable cursor; this works on a standalone server, unlike
+    change streams.
+    """
+    
+    def __init__(self, ttl: int = 60, events_size: int = 16 * 1024 * 1024, poll_interval: float = 0.05):
+        self.ttl = ttl
+        self.events_size = events_size
+        self.poll_interval = poll_interval
+        self._tasks: Dict[str, list] = {}
+    
+    @staticmethod
+    def _db():
+        return Database.get_db()
+    
+    async def _ensure_events_collection(self, db):
+        try:
+            await db.create_collection("session_events", capped=True, size=self.events_size)
+            # A tailable cursor on an empty capped collection dies immediately
+            await db.session_events.insert_one({"kind": "init", "created_at": datetime.utcnow()})
+        except CollectionInvalid:
+            pass
+    
+    async def start(self, node_id: str, handler: EventHandler):
+        db = self._db()
+        if db is None:
+            logger.warning("MongoDB unavailable; session registry limited to this process")
+            return
+        
+        await self._ensure_events_collection(db)
+        await db.session_registry.create_index("session_id", unique=True)
+        await db.session_registry.create_index("updated_at", expireAfterSeconds=self.ttl)
+        self._tasks[node_id] = [
+            asyncio.create_task(self._tail(node_id, handler)),
+            asyncio.create_task(self._heartbeat(node_id))
+        ]
+        logger.info(f"Session registry node {node_id} started")
+    
+    async def shutdown(self, node_id: str):
+        tasks = self._tasks.pop(node_id, [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        
+        db = self._db()
+        if db is not None:
+            await db.session_registry.delete_many({"node_id": node_id})
+    
+    async def _heartbeat(self, node_id: str):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                await self._db().session_registry.update_many(
+                    {"node_id": node_id},
+                    {"$set": {"updated_at": datetime.utcnow()}}
+                )
+            except Exception as e:
+                logger.warning(f"Session registry heartbeat failed: {e}")
+    
+    async def _tail(self, node_id: str, handler: EventHandler):
+        # Only events published after this node started
+        last_id = ObjectId.from_datetime(datetime.utcnow())
+        while True:
+            try:
+                cursor = self._db().session_events.find(
+                    {"_id": {"$gt": last_id}},
+                    cursor_type=CursorType.TAILABLE_AWAIT
+                )
+                while cursor.alive:
+                    async for event in cursor:
+                        last_id = event["_id"]
+                        if event.get("origin") not in (None, node_id):
+                            await handler(event)
+                    await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Session event stream interrupted: {e}")
+                await asyncio.sleep(1.0)
+    
+    async def register(self, session_id: str, node_id: str):
+        await self._db().session_registry.update_one(
+            {"session_id": session_id},
+            {"$set": {"node_id": node_id, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+    
+    async def unregister(self, session_id: str, node_id: str):
+        await self._db().session_registry.delete_one({"session_id": session_id, "node_id": node_id})
+    
+    async def locate(self, session_id: str) -> Optional[str]:
+        doc = await self._db().session_registry.find_one({"session_id": session_id})
+        return doc["node_id"] if doc else None
+    
+    async def publish(self, event: dict):
+        await self._db().session_events.insert_one({**event, "created_at": datetime.utcnow()})
+    
+    async def count_connections(self) -> int:
+        return await self._db().session_registry.count_documents({})
+
+
+def create_session_registry(backend: str) -> SessionRegistry:
+    """Build the registry configured by SESSION_REGISTRY"""
+    if backend == REGISTRY_MEMORY:
+        return InMemorySessionRegistry()
+    if backend == REGISTRY_MONGO:
+        return MongoSessionRegistry(
+            ttl=settings.SESSION_REGISTRY_TTL_SECONDS,
+            events_size=settings.SESSION_EVENTS_MAX_MB * 1024 * 1024
+        )
+    raise ValueError(f"Unknown session registry backend: {backend}")
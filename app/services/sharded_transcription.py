@@ -0,0 +1,155 @@
+"""
+MedAI - Sharded Transcription
+Parallel transcription of long recordings split at pauses
+"""
+import time
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.services.vad_service import VadStats, trim_silence, find_silence_cut
+from app.services.transcript_merge import merge_overlapping_text
+from app.services.transcription_engine import TranscriptionEngine
+
+logger = logging.getLogger("MedAI.ShardedTranscription")
+
+SAMPLE_RATE = 16000
+
+# (start, end, overlaps_previous) in samples
+Shard = Tuple[int, int, bool]
+
+
+def plan_shards(samples: np.ndarray, shard_samples: int, overlap_samples: int) -> List[Shard]:
+    """Cut audio into shards of at most `shard_samples`
+    
+    Each shard ends in the latest pause of its second half when VAD finds
+    one. Otherwise it is cut at full length and the next shard starts
+    `overlap_samples` earlier, so a word cut in half appears whole in one
+    of the two shards and the repeat is removed when stitching.
+    """
+    shards: List[Shard] = []
+    total = len(samples)
+    start = 0
+    overlapped = False
+    
+    while start < total:
+        end = start + shard_samples
+        if end >= total:
+            shards.append((start, total, overlapped))
+            break
+        
+        cut = find_silence_cut(samples[start:end], shard_samples // 2)
+        if cut is not None:
+            shards.append((start, start + cut, overlapped))
+            start, overlapped = start + cut, False
+        else:
+            shards.append((start, end, overlapped))
+            start, overlapped = end - overlap_samples, True
+    
+    return shards
+
+
+def stitch_shards(texts: List[str], shards: List[Shard]) -> str:
+    """Join shard transcripts in order, dropping text repeated across overlaps"""
+    transcript = ""
+    for text, (_, _, overlapped) in zip(texts, shards):
+        if overlapped:
+            text = merge_overlapping_text(transcript, text)
+        else:
+            text = " ".join(text.split())
+        if text:
+            transcript = f"{transcript} {text}" if transcript else text
+    return transcript
+
+
+class ShardedTranscriber:
+    """Transcribes long recordings shard by shard on the TranscriptionEngine
+    
+    Shards go through the engine's queue as one admission, so they run in
+    parallel on its workers (one model each) while its queue bound and
+    per-session fairness still apply: a long upload cannot starve live
+    sessions or load models of its own.
+    """
+    
+    def __init__(
+        self,
+        engine: TranscriptionEngine,
+        min_seconds: float = 300.0,
+        shard_seconds: float = 120.0,
+        overlap_seconds: float = 2.0,
+        enabled: bool = True
+    ):
+        if overlap_seconds >= shard_seconds:
+            raise ValueError("Shard overlap must be shorter than the shard")
+        
+        self.engine = engine
+        self.min_samples = int(min_seconds * SAMPLE_RATE)
+        self.shard_samples = int(shard_seconds * SAMPLE_RATE)
+        self.overlap_samples = int(overlap_seconds * SAMPLE_RATE)
+        self.enabled = enabled
+        
+        self._active = 0
+        
+        self._jobs = 0
+        self._shards = 0
+        self._audio_seconds = 0.0
+        self._wall_seconds = 0.0
+    
+    def should_shard(self, samples: np.ndarray) -> bool:
+        """Whether a recording is long enough to be worth sharding"""
+        return self.enabled and len(samples) >= self.min_samples
+    
+    def _prepare(self, samples: np.ndarray, vad_stats: Optional[VadStats]) -> Tuple[List[Shard], List[np.ndarray]]:
+        shards = plan_shards(samples, self.shard_samples, self.overlap_samples)
+        pieces = []
+        for start, end, overlapped in shards:
+            stats = VadStats()
+            pieces.append(trim_silence(samples[start:end], stats)[0])
+            if vad_stats is not None:
+                # The overlap was already counted with the previous shard
+                covered = self.overlap_samples if overlapped else 0
+                vad_stats.add_part(stats, 1 - covered / (end - start))
+        return shards, pieces
+    
+    async def transcribe(
+        self,
+        samples: np.ndarray,
+        vad_stats: Optional[VadStats] = None,
+        session_id: str = "default"
+    ) -> str:
+        """Transcribe all shards in parallel and stitch the text in order"""
+        started = time.monotonic()
+        shards, pieces = await asyncio.to_thread(self._prepare, samples, vad_stats)
+        
+        speech = [piece for piece in pieces if piece.size]
+        self._active += 1
+        try:
+            results = iter(await self.engine.transcribe_many(speech, session_id))
+        finally:
+            self._active -= 1
+        texts = [next(results) if piece.size else "" for piece in pieces]
+        
+        elapsed = time.monotonic() - started
+        self._jobs += 1
+        self._shards += len(shards)
+        self._audio_seconds += len(samples) / SAMPLE_RATE
+        self._wall_seconds += elapsed
+        logger.info(
+            f"Sharded transcription: {len(samples) / SAMPLE_RATE:.0f}s audio in "
+            f"{len(shards)} shard(s), {elapsed:.1f}s wall"
+        )
+        return stitch_shards(texts, shards)
+    
+    def get_stats(self) -> dict:
+        """Job counts and throughput"""
+        return {
+            "enabled": self.enabled,
+            "workers": self.engine.workers,
+            "active_jobs": self._active,
+            "jobs": self._jobs,
+            "shards": self._shards,
+            "audio_seconds": round(self._audio_seconds, 1),
+            "speed_factor": round(self._audio_seconds / self._wall_seconds, 2) if self._wall_seconds else 0.0
+        }
@@ -0,0 +1,220 @@
+"""
+MedAI - Streaming Transcription Service
+Rolling-window incremental transcription for live sessions
+"""
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.services.vad_service import VadStats, find_silence_cut
+from app.services.transcript_merge import MAX_OVERLAP_WORDS, merge_overlapping_text
+from app.services.audio_preprocessing import PCM_S16LE, PCM_F32LE, PcmConverter
+from app.services.transcription_service import (
+    SAMPLE_RATE,
+    ContainerStreamDecoder,
+    transcribe_samples
+)
+
+logger = logging.getLogger("MedAI.Streaming")
+
+# Audio formats accepted by the streaming transcriber
+FORMAT_CONTAINER = "container"  # webm/ogg/mp4/wav blobs from MediaRecorder
+FORMAT_PCM_S16LE = "pcm_s16le"  # raw signed 16-bit PCM, 16 kHz mono unless told otherwise
+FORMAT_PCM_F32LE = "pcm_f32le"  # raw 32-bit float PCM, as produced by Web Audio
+SUPPORTED_FORMATS = {FORMAT_CONTAINER, FORMAT_PCM_S16LE, FORMAT_PCM_F32LE}
+
+# Sample format of each raw PCM wire format
+PCM_FORMATS = {FORMAT_PCM_S16LE: PCM_S16LE, FORMAT_PCM_F32LE: PCM_F32LE}
+
+
+class StreamingTranscriber:
+    """Cuts a session's audio into windows and transcribes them as they fill
+    
+    Windows end in a pause found by VAD when possible; otherwise they are cut
+    at full length and the next window overlaps the previous one.
+    """
+    
+    def __init__(
+        self,
+        audio_format: str = FORMAT_CONTAINER,
+        session_id: str = "default",
+        window_seconds: Optional[float] = None,
+        overlap_seconds: Optional[float] = None,
+        time_offset: float = 0.0,
+        sample_rate: int = SAMPLE_RATE,
+        channels: int = 1
+    ):
+        if audio_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported audio format: {audio_format}")
+        
+        window_seconds = window_seconds or settings.STREAM_WINDOW_SECONDS
+        overlap_seconds = settings.STREAM_OVERLAP_SECONDS if overlap_seconds is None else overlap_seconds
+        if overlap_seconds >= window_seconds:
+            raise ValueError("Stream overlap must be shorter than the window")
+        
+        self.audio_format = audio_format
+        self.session_id = session_id
+        self.window_samples = int(window_seconds * SAMPLE_RATE)
+        self.overlap_samples = int(overlap_seconds * SAMPLE_RATE)
+        self.hop_samples = self.window_samples - self.overlap_samples
+        self.hop_seconds = window_seconds - overlap_seconds
+        
+        # Containers go through one ffmpeg process, fed only bytes not yet sent;
+        # raw PCM is converted to 16 kHz mono as it arrives
+        self._encoded = bytearray()
+        self._decoder = None
+        self._converter = None
+        if audio_format in PCM_FORMATS:
+            self._converter = PcmConverter(sample_rate, channels, PCM_FORMATS[audio_format])
+        else:
+            self._decoder = ContainerStreamDecoder()
+        
+        # Decoded samples; `_offset` is the absolute index of samples[0]
+        self._samples = np.zeros(0, dtype=np.float32)
+        self._offset = 0
+        
+        # Absolute sample index where the next window starts
+        self._window_start = 0
+        self._overlapped = False
+        self.windows_transcribed = 0
+        self.segments: List[str] = []
+        self.vad_stats = VadStats()
+        
+        # Session time of the first sample, and the span of the last window
+        self.time_offset = time_offset
+        self.last_span: Tuple[float, float] = (time_offset, time_offset)
+    
+    @property
+    def text(self) -> str:
+        """Transcript assembled from all windows so far"""
+        return " ".join(s for s in self.segments if s)
+    
+    def _text_tail(self) -> str:
+        """Last words of the transcript, enough to stitch the next overlapping window"""
+        words: List[str] = []
+        for segment in reversed(self.segments):
+            words[:0] = segment.split()
+            if len(words) >= MAX_OVERLAP_WORDS:
+                break
+        return " ".join(words[-MAX_OVERLAP_WORDS:])
+    
+    @property
+    def buffered_bytes(self) -> int:
+        """Bytes currently held for this stream"""
+        return len(self._encoded) + self._samples.nbytes
+    
+    @property
+    def total_samples(self) -> int:
+        return self._offset + len(self._samples)
+    
+    def feed(self, chunk: bytes):
+        """Append a received audio chunk"""
+        if self._converter is not None:
+            self._append(self._converter.process(chunk))
+        else:
+            self._encoded.extend(chunk)
+    
+    def _append(self, samples: np.ndarray):
+        if samples.size:
+            self._samples = np.concatenate([self._samples, samples])
+    
+    async def _refresh_container_samples(self, finish: bool = False):
+        """Pass newly received container bytes to the decoder and collect its output"""
+        if self._encoded:
+            pending, self._encoded = bytes(self._encoded), bytearray()
+            await asyncio.to_thread(self._decoder.write, pending)
+        if finish:
+            self._append(await asyncio.to_thread(self._decoder.finish))
+        else:
+            self._append(self._decoder.read())
+    
+    async def ready(self) -> bool:
+        """Whether a full window of audio is waiting to be transcribed"""
+        if self._decoder is not None:
+            await self._refresh_container_samples()
+        return self.total_samples - self._window_start >= self.window_samples
+    
+    def _window(self, end: int) -> np.ndarray:
+        start = self._window_start - self._offset
+        return self._samples[start:end - self._offset]
+    
+    def _advance(self, text: str, start: int, end: int):
+        self.last_span = (
+            self.time_offset + start / SAMPLE_RATE,
+            self.time_offset + end / SAMPLE_RATE
+        )
+        if self._overlapped:
+            new_text = merge_overlapping_text(self._text_tail(), text)
+        else:
+            new_text = " ".join(text.split())
+        if new_text:
+            self.segments.append(new_text)
+        self.windows_transcribed += 1
+        return new_text
+    
+    async def _transcribe(self, window: np.ndarray, covered: int) -> str:
+        """Transcribe a window; only its samples after the first `covered` count in the VAD totals"""
+        stats = VadStats()
+        text = await transcribe_samples(window, self.session_id, stats)
+        self.vad_stats.add_part(stats, 1 - covered / len(window))
+        return text
+    
+    def _release(self):
+        """Drop decoded samples that no future window can reach"""
+        drop = self._window_start - self._offset
+        if drop > 0:
+            self._samples = self._samples[drop:]
+            self._offset += drop
+    
+    async def transcribe_next(self) -> str:
+        """Transcribe the next full window and return its new (de-duplicated) text"""
+        window = self._window(self._window_start + self.window_samples)
+        
+        # Prefer ending the window in a pause from its second half
+        cut = await asyncio.to_thread(find_silence_cut, window, self.window_samples // 2)
+        if cut is not None:
+            window = window[:cut]
+            next_start, overlapped = self._window_start + cut, False
+        else:
+            next_start, overlapped = self._window_start + self.hop_samples, True
+        
+        # An overlapping window repeats the end of the previous one
+        covered = self.overlap_samples if self._overlapped else 0
+        text = await self._transcribe(window, covered)
+        new_text = self._advance(text, self._window_start, self._window_start + len(window))
+        
+        self._overlapped = overlapped
+        self._window_start = next_start
+        self._release()
+        return new_text
+    
+    async def finish(self) -> str:
+        """Transcribe the remaining tail and return the new text"""
+        if self._decoder is not None:
+            await self._refresh_container_samples(finish=True)
+        else:
+            # Samples still inside the resampling filter
+            self._append(self._converter.flush())
+        
+        end = self.total_samples
+        # The first `overlap` samples of the tail were already covered
+        covered = self.overlap_samples if self._overlapped else 0
+        if end - self._window_start <= covered:
+            return ""
+        
+        text = await self._transcribe(self._window(end), covered)
+        new_text = self._advance(text, self._window_start, end)
+        
+        self._window_start = end
+        self._release()
+        return new_text
+    
+    def close(self):
+        """Release buffered audio and stop the decoder"""
+        if self._decoder is not None:
+            self._decoder.close()
+        self._encoded = bytearray()
+        self._samples = np.zeros(0, dtype=np.float32)
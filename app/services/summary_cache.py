@@ -0,0 +1,49 @@
+"""
+MedAI - Summary Cache
+Cache of AI medical summaries keyed by transcript, conversation type, models and prompt
+"""
+import json
+import hashlib
+import unicodedata
+from typing import Dict, Iterable
+
+from app.database import get_summary_cache_collection
+from app.services.two_tier_cache import TwoTierCache
+
+
+def normalize_transcript(transcript: str) -> str:
+    """Canonical form: Unicode NFC with whitespace collapsed"""
+    return " ".join(unicodedata.normalize("NFC", transcript).split())
+
+
+def prompt_version(*parts) -> str:
+    """Short fingerprint of a prompt template and its generation settings"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class SummaryCache(TwoTierCache):
+    """Two-tier cache (in-process LRU plus Mongo TTL) of structured summaries
+    
+    The key covers the normalized transcript, the conversation type, the
+    model priority list and the prompt version, so changing any of them
+    misses instead of serving a summary made under other conditions.
+    """
+    
+    value_field = "summary"
+    label = "Summary"
+    
+    def _collection(self):
+        return get_summary_cache_collection()
+    
+    def _size_of(self, value: Dict) -> int:
+        return len(json.dumps(value).encode("utf-8"))
+    
+    def summary_key(self, transcript: str, conversation_type: str, models: Iterable[str], version: str) -> str:
+        digest = hashlib.sha256(normalize_transcript(transcript).encode("utf-8")).hexdigest()
+        return f"{digest}:{conversation_type}:{','.join(models)}:{version}"
+    
+    async def get(self, key: str):
+        summary = await super().get(key)
+        # Callers may modify the summary; keep the cached one intact
+        return dict(summary) if summary is not None else None
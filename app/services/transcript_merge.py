@@ -0,0 +1,31 @@
+"""
+MedAI - Transcript Merge
+Stitching of transcripts from overlapping audio windows
+"""
+import re
+
+# Maximum number of words compared when stitching overlapping windows
+MAX_OVERLAP_WORDS = 40
+
+_WORD_NORMALIZE = re.compile(r"[^\w']+")
+
+
+def _normalize_word(word: str) -> str:
+    return _WORD_NORMALIZE.sub("", word.lower())
+
+
+def merge_overlapping_text(previous: str, new: str, max_words: int = MAX_OVERLAP_WORDS) -> str:
+    """Return the part of `new` that does not repeat the tail of `previous`"""
+    new_words = new.split()
+    if not previous or not new_words:
+        return " ".join(new_words)
+    
+    prev_tail = [_normalize_word(w) for w in previous.split()[-max_words:]]
+    new_head = [_normalize_word(w) for w in new_words[:max_words]]
+    
+    # Longest suffix of the previous text that is a prefix of the new text
+    for size in range(min(len(prev_tail), len(new_head)), 0, -1):
+        if prev_tail[-size:] == new_head[:size]:
+            return " ".join(new_words[size:])
+    
+    return " ".join(new_words)
@@ -0,0 +1,166 @@
+"""
+MedAI - Transcription Backends
+Speech-to-text engines behind the Whisper worker pools
+"""
+from typing import List
+
+import numpy as np
+
+BACKEND_WHISPER = "whisper"
+BACKEND_CTRANSLATE2 = "ctranslate2"
+
+# Whisper decodes fixed 30-second mel segments (16 kHz)
+SEGMENT_SAMPLES = 30 * 16000
+
+# Same thresholds model.transcribe uses to drop silent segments
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+
+class TranscriptionBackend:
+    """A speech-to-text engine
+    
+    A backend only holds settings, so it can be pickled to process-pool
+    workers; `load` builds a model and the other methods run it. Models
+    are not re-entrant, each worker loads its own.
+    """
+    
+    name = ""
+    
+    def __init__(self, model_size: str = "base", language: str = "en", threads: int = 0):
+        self.model_size = model_size
+        self.language = language
+        self.threads = threads  # CPU threads per model, 0 = library default
+    
+    @property
+    def cache_id(self) -> str:
+        """Identifies everything about the backend that changes its output"""
+        return f"{self.name}:{self.model_size}"
+    
+    def load(self):
+        raise NotImplementedError
+    
+    def transcribe(self, model, samples: np.ndarray) -> str:
+        """Transcribe 16 kHz mono float32 samples of any length"""
+        raise NotImplementedError
+    
+    def decode_batch(self, model, segments: List[np.ndarray]) -> List[str]:
+        """Transcribe up to 30-second segments, one text per segment"""
+        return [self.transcribe(model, segment) for segment in segments]
+    
+    def describe(self) -> dict:
+        return {"backend": self.name, "model": self.model_size}
+
+
+class WhisperBackend(TranscriptionBackend):
+    """openai-whisper on PyTorch (fp32 on CPU)"""
+    
+    name = BACKEND_WHISPER
+    
+    def load(self):
+        import whisper
+        if self.threads > 0:
+            import torch
+            torch.set_num_threads(self.threads)
+        return whisper.load_model(self.model_size)
+    
+    def transcribe(self, model, samples: np.ndarray) -> str:
+        result = model.transcribe(samples, fp16=False, language=self.language)
+        return result.get("text", "").strip()
+    
+    def decode_batch(self, model, segments: List[np.ndarray]) -> List[str]:
+        """Decode the segments as a single Whisper batch"""
+        import torch
+        import whisper
+        
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(torch.from_numpy(segment)),
+                n_mels=model.dims.n_mels
+            )
+            for segment in segments
+        ]).to(model.device)
+        
+        options = whisper.DecodingOptions(language=self.language, fp16=False, without_timestamps=True)
+        with torch.no_grad():
+            results = whisper.decode(model, mels, options)
+        
+        return [
+            "" if (r.no_speech_prob > NO_SPEECH_THRESHOLD and r.avg_logprob < LOGPROB_THRESHOLD)
+            else r.text.strip()
+            for r in results
+        ]
+
+
+class CTranslate2Backend(TranscriptionBackend):
+    """Whisper converted to CTranslate2 (faster-whisper), int8-quantized by default
+    
+    With `model_dir` the converted model is loaded from disk only and
+    nothing is downloaded, e.g. a directory produced by
+    `ct2-transformers-converter --model openai/whisper-base --quantization int8`.
+    Without it, `model_size` is fetched from the Hugging Face hub once.
+    """
+    
+    name = BACKEND_CTRANSLATE2
+    
+    def __init__(
+        self,
+        model_size: str = "base",
+        language: str = "en",
+        threads: int = 0,
+        model_dir: str = "",
+        compute_type: str = "int8",
+        beam_size: int = 5
+    ):
+        super().__init__(model_size, language, threads)
+        self.model_dir = model_dir
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+    
+    @property
+    def cache_id(self) -> str:
+        return f"{self.name}:{self.model_dir or self.model_size}:{self.compute_type}"
+    
+    def load(self):
+        from faster_whisper import WhisperModel
+        return WhisperModel(
+            self.model_dir or self.model_size,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.threads,
+            local_files_only=bool(self.model_dir)
+        )
+    
+    def transcribe(self, model, samples: np.ndarray) -> str:
+        segments, _ = model.transcribe(
+            samples,
+            language=self.language,
+            beam_size=self.beam_size,
+            no_speech_threshold=NO_SPEECH_THRESHOLD,
+            log_prob_threshold=LOGPROB_THRESHOLD
+        )
+        # Segments are decoded lazily while iterating
+        return " ".join(segment.text.strip() for segment in segments).strip()
+    
+    def describe(self) -> dict:
+        return {
+            "backend": self.name,
+            "model": self.model_dir or self.model_size,
+            "compute_type": self.compute_type
+        }
+
+
+def create_transcription_backend(
+    name: str,
+    model_size: str = "base",
+    language: str = "en",
+    model_dir: str = "",
+    compute_type: str = "int8",
+    threads: int = 0
+) -> TranscriptionBackend:
+    """Build the backend configured by WHISPER_BACKEND"""
+    if name == BACKEND_WHISPER:
+        return WhisperBackend(model_size, language, threads)
+    if name == BACKEND_CTRANSLATE2:
+        return CTranslate2Backend(model_size, language, threads, model_dir=model_dir, compute_type=compute_type)
+    raise ValueError(f"Unknown transcription backend: {name}")
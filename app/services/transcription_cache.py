@@ -0,0 +1,49 @@
+"""
+MedAI - Transcription Cache
+Content-addressed cache of transcripts keyed by audio hash and model settings
+"""
+import json
+import asyncio
+import hashlib
+from typing import Dict
+
+from app.database import get_transcription_cache_collection
+from app.services.two_tier_cache import TwoTierCache
+
+# Hash in a worker thread above this size so large recordings do not block the loop
+HASH_OFFLOAD_BYTES = 1024 * 1024
+
+
+class TranscriptionCache(TwoTierCache):
+    """Two-tier cache (in-process LRU plus Mongo TTL) of transcripts
+    
+    Only successful transcriptions are stored. Values are dicts holding the
+    `text` and the VAD totals of the run that produced it, so a hit can
+    report the same audio duration as a fresh transcription.
+    """
+    
+    value_field = "result"
+    label = "Transcription"
+    
+    def _collection(self):
+        return get_transcription_cache_collection()
+    
+    def _size_of(self, result: Dict) -> int:
+        return len(result["text"].encode("utf-8"))
+    
+    @staticmethod
+    def _digest(audio_bytes) -> str:
+        return hashlib.sha256(audio_bytes).hexdigest()
+    
+    async def key_for(self, audio_bytes, model: str, language: str, options: Dict) -> str:
+        """Cache key from the audio content and everything that changes the output
+        
+        `options` holds the preprocessing settings (VAD, loudness, sharding)
+        besides the model; any change to them yields new keys.
+        """
+        if len(audio_bytes) > HASH_OFFLOAD_BYTES:
+            digest = await asyncio.to_thread(self._digest, audio_bytes)
+        else:
+            digest = self._digest(audio_bytes)
+        version = hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()[:12]
+        return f"{digest}:{model}:{language}:{version}"
@@ -0,0 +1,354 @@
+"""
+MedAI - Transcription Engine
+Speech-to-text worker pool with bounded, per-session fair queueing
+"""
+import time
+import queue
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from app.core.exceptions import TranscriptionBusyError
+from app.services.transcription_backends import TranscriptionBackend, WhisperBackend, SEGMENT_SAMPLES
+
+logger = logging.getLogger("MedAI.TranscriptionEngine")
+
+EXECUTOR_THREAD = "thread"
+EXECUTOR_PROCESS = "process"
+
+# Number of recent jobs used for wait/service time metrics
+METRICS_WINDOW = 200
+
+# Model and backend owned by a process-pool worker
+_process_backend: Optional[TranscriptionBackend] = None
+_process_model = None
+
+
+def _process_worker_init(backend: TranscriptionBackend):
+    """Load a private model in a process-pool worker"""
+    global _process_backend, _process_model
+    _process_backend = backend
+    _process_model = backend.load()
+
+
+def _process_worker_transcribe(samples: np.ndarray) -> str:
+    return _process_backend.transcribe(_process_model, samples)
+
+
+def _process_worker_decode_batch(segments: List[np.ndarray]) -> List[str]:
+    return _process_backend.decode_batch(_process_model, segments)
+
+
+def split_segments(samples: np.ndarray) -> List[np.ndarray]:
+    """Split audio into consecutive 30-second segments"""
+    return [
+        samples[start:start + SEGMENT_SAMPLES]
+        for start in range(0, max(len(samples), 1), SEGMENT_SAMPLES)
+    ]
+
+
+class _Job:
+    __slots__ = ("session_id", "samples", "future", "enqueued_at")
+    
+    def __init__(self, session_id: str, samples: np.ndarray, future: asyncio.Future):
+        self.session_id = session_id
+        self.samples = samples
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class TranscriptionEngine:
+    """Runs a TranscriptionBackend off the event loop on a fixed number of workers
+    
+    Jobs are queued per session and dispatched round-robin, so one session
+    with many pending windows cannot starve the others. When the queue is
+    full, submissions fail fast with TranscriptionBusyError.
+    
+    With batching enabled, audio is split into 30-second segments and each
+    worker waits up to `batch_window` seconds to gather segments from several
+    sessions, decoding them together as one batch.
+    """
+    
+    def __init__(
+        self,
+        model_loader: Callable[[], object],
+        workers: int = 1,
+        queue_size: int = 32,
+        executor_kind: str = EXECUTOR_THREAD,
+        backend: Optional[TranscriptionBackend] = None,
+        batching: bool = False,
+        batch_size: int = 8,
+        batch_window: float = 0.05
+    ):
+        if executor_kind not in (EXECUTOR_THREAD, EXECUTOR_PROCESS):
+            raise ValueError(f"Unknown executor kind: {executor_kind}")
+        
+        self.model_loader = model_loader
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        self.executor_kind = executor_kind
+        self.backend = backend or WhisperBackend()
+        self.batching = batching
+        self.batch_size = max(1, batch_size) if batching else 1
+        self.batch_window = batch_window
+        
+        self._executor: Optional[Executor] = None
+        self._start_lock = asyncio.Lock()
+        self._models: "queue.Queue" = queue.Queue()
+        self._pending: "OrderedDict[str, Deque[_Job]]" = OrderedDict()
+        self._queued = 0
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatchers: List[asyncio.Task] = []
+        
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._wait_times: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._service_times: Deque[float] = deque(maxlen=METRICS_WINDOW)
+        self._batches = 0
+        self._batch_sizes: Dict[int, int] = {}
+    
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+    
+    def _build_thread_models(self):
+        """One model instance per worker thread; decoding is not re-entrant (blocking)"""
+        first = self.model_loader()
+        if first is None:
+            raise RuntimeError("Whisper model not loaded")
+        extra = [self.backend.load() for _ in range(self.workers - 1)]
+        
+        self._models.put(first)
+        for model in extra:
+            self._models.put(model)
+    
+    async def start(self):
+        """Create the worker pool and dispatcher tasks"""
+        async with self._start_lock:
+            if self.started:
+                return
+            
+            if self.executor_kind == EXECUTOR_PROCESS:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    initializer=_process_worker_init,
+                    initargs=(self.backend,)
+                )
+            else:
+                # Loading the extra models takes seconds; keep the event loop serving meanwhile
+                await asyncio.to_thread(self._build_thread_models)
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix="whisper"
+                )
+            
+            self._wakeup = asyncio.Event()
+            self._dispatchers = [
+                asyncio.create_task(self._dispatch_loop())
+                for _ in range(self.workers)
+            ]
+            logger.info(
+                f"Transcription engine started: {self.workers} {self.executor_kind} worker(s), "
+                f"queue size {self.queue_size}"
+            )
+    
+    async def shutdown(self):
+        """Stop dispatchers, fail queued jobs and release the pool"""
+        for task in self._dispatchers:
+            task.cancel()
+        self._dispatchers = []
+        
+        for jobs in self._pending.values():
+            for job in jobs:
+                if not job.future.done():
+                    job.future.set_exception(RuntimeError("Transcription engine stopped"))
+        self._pending.clear()
+        self._queued = 0
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        while not self._models.empty():
+            self._models.get_nowait()
+    
+    def retry_after(self) -> int:
+        """Estimated seconds until a queue slot frees up"""
+        service = (sum(self._service_times) / len(self._service_times)) if self._service_times else 5.0
+        return max(1, int(round(service * (self._queued / self.workers + 1))))
+    
+    async def transcribe(
+        self,
+        samples: np.ndarray,
+        session_id: str = "default",
+        units: Optional[List[np.ndarray]] = None
+    ) -> str:
+        """Queue samples for transcription and wait for the text
+        
+        `units` optionally pre-splits the audio into <=30s pieces (e.g. at
+        speech boundaries) for batched decoding.
+        """
+        if not self.batching:
+            units = [samples]
+        elif units is None:
+            units = split_segments(samples)
+        (texts,) = await self._submit([units], session_id)
+        return " ".join(t for t in texts if t)
+    
+    async def transcribe_many(self, recordings: List[np.ndarray], session_id: str = "default") -> List[str]:
+        """Transcribe several pieces of one session (e.g. shards) as one admission
+        
+        Either all pieces are queued or none is; they share the session's
+        round-robin turn with its other jobs, and the texts come back in order.
+        """
+        groups = [
+            split_segments(samples) if self.batching else [samples]
+            for samples in recordings
+        ]
+        results = await self._submit(groups, session_id)
+        return [" ".join(t for t in texts if t) for texts in results]
+    
+    async def _submit(self, groups: List[List[np.ndarray]], session_id: str) -> List[List[str]]:
+        """Queue every unit of every group and wait for the texts, grouped the same way"""
+        if not self.started:
+            await self.start()
+        
+        count = sum(len(units) for units in groups)
+        # A recording longer than the whole queue is still admitted when the queue is empty
+        if self._queued and self._queued + count > self.queue_size:
+            self._rejected += 1
+            raise TranscriptionBusyError(self.retry_after())
+        
+        loop = asyncio.get_running_loop()
+        jobs = [_Job(session_id, unit, loop.create_future()) for units in groups for unit in units]
+        self._pending.setdefault(session_id, deque()).extend(jobs)
+        self._queued += len(jobs)
+        self._wakeup.set()
+        
+        try:
+            texts = iter(await asyncio.gather(*(job.future for job in jobs)))
+        except BaseException:
+            for job in jobs:
+                job.future.cancel()
+            raise
+        return [[next(texts) for _ in units] for units in groups]
+    
+    def _next_job(self) -> Optional[_Job]:
+        """Pop the oldest job of the next session in round-robin order"""
+        while self._pending:
+            session_id, jobs = self._pending.popitem(last=False)
+            job = jobs.popleft()
+            if jobs:
+                self._pending[session_id] = jobs
+            self._queued -= 1
+            if not job.future.cancelled():
+                return job
+        return None
+    
+    def _run_in_thread(self, segments: List[np.ndarray]) -> List[str]:
+        model = self._models.get()
+        try:
+            if self.batching:
+                return self.backend.decode_batch(model, segments)
+            return [self.backend.transcribe(model, segments[0])]
+        finally:
+            self._models.put(model)
+    
+    async def _collect_batch(self, first: _Job) -> List[_Job]:
+        """Gather more jobs, from any session, until the batch is full or the window closes"""
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            job = self._next_job()
+            if job is not None:
+                batch.append(job)
+                continue
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    async def _dispatch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = self._next_job()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            
+            batch = await self._collect_batch(job) if self.batch_size > 1 else [job]
+            segments = [j.samples for j in batch]
+            
+            started = time.monotonic()
+            for j in batch:
+                self._wait_times.append(started - j.enqueued_at)
+            self._in_flight += len(batch)
+            self._batches += 1
+            self._batch_sizes[len(batch)] = self._batch_sizes.get(len(batch), 0) + 1
+            try:
+                if self.executor_kind == EXECUTOR_PROCESS and self.batching:
+                    texts = await loop.run_in_executor(self._executor, _process_worker_decode_batch, segments)
+                elif self.executor_kind == EXECUTOR_PROCESS:
+                    texts = [await loop.run_in_executor(self._executor, _process_worker_transcribe, segments[0])]
+                else:
+                    texts = await loop.run_in_executor(self._executor, self._run_in_thread, segments)
+                self._completed += len(batch)
+                for j, text in zip(batch, texts):
+                    if not j.future.done():
+                        j.future.set_result(text)
+            except asyncio.CancelledError:
+                for j in batch:
+                    if not j.future.done():
+                        j.future.cancel()
+                raise
+            except Exception as e:
+                self._failed += len(batch)
+                logger.error(f"Transcription batch of {len(batch)} job(s) failed: {e}")
+                for j in batch:
+                    if not j.future.done():
+                        j.future.set_exception(e)
+            finally:
+                self._in_flight -= len(batch)
+                self._service_times.append(time.monotonic() - started)
+    
+    def get_stats(self) -> Dict:
+        """Queue depth, throughput and latency metrics"""
+        waits = sorted(self._wait_times)
+        return {
+            "started": self.started,
+            "backend": self.backend.name,
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depth": self._queued,
+            "queued_sessions": len(self._pending),
+            "in_flight": self._in_flight,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "batching": self.batching,
+            "batches": self._batches,
+            "avg_batch_size": round(
+                sum(size * count for size, count in self._batch_sizes.items()) / self._batches, 2
+            ) if self._batches else 0.0,
+            "batch_size_histogram": dict(sorted(self._batch_sizes.items())),
+            "avg_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p50_wait_seconds": round(waits[int(0.50 * (len(waits) - 1))], 3) if waits else 0.0,
+            "p95_wait_seconds": round(waits[int(0.95 * (len(waits) - 1))], 3) if waits else 0.0,
+            "p99_wait_seconds": round(waits[int(0.99 * (len(waits) - 1))], 3) if waits else 0.0,
+            "avg_service_seconds": round(
+                sum(self._service_times) / len(self._service_times), 3
+            ) if self._service_times else 0.0
+        }
@@ -0,0 +1,318 @@
+"""
+MedAI - Transcription Jobs
+Persistent background queue for batch transcription of uploaded recordings
+"""
+import os
+import mmap
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+
+from app.config import settings
+from app.core.exceptions import TranscriptionBusyError
+from app.database import get_transcription_jobs_collection
+from app.services.vad_service import VadStats
+from app.services.transcription_service import (
+    is_transcription_available,
+    ensure_whisper_model,
+    transcribe_recording
+)
+
+logger = logging.getLogger("MedAI.TranscriptionJobs")
+
+JOB_QUEUED = "queued"
+JOB_PROCESSING = "processing"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Uploaded audio waits here until its job finishes
+JOB_AUDIO_DIR = "transcriptions"
+
+# Longest wait before a job sent back by a full Whisper queue is retried
+MAX_RETRY_DELAY_SECONDS = 300.0
+
+
+class LeaseLostError(Exception):
+    """Another runner took over a job while this one was transcribing it"""
+
+
+def job_audio_path(job_id: str, filename: str) -> str:
+    """Where the audio of a job is stored until it is transcribed"""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return os.path.join(settings.UPLOAD_DIR, JOB_AUDIO_DIR, f"{job_id}{ext}")
+
+
+async def _transcribe_file(path: str, session_id: str, vad_stats: VadStats) -> str:
+    """Transcribe a stored recording through a read-only mmap of the file"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise ValueError("Empty audio data")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            audio = memoryview(mapped)
+            try:
+                return await transcribe_recording(audio, session_id, vad_stats)
+            finally:
+                audio.release()
+
+
+class TranscriptionJobRunner:
+    """Claims queued jobs from MongoDB and transcribes them in the background
+    
+    Job state lives in the `transcription_jobs` collection and the audio on
+    disk, so pending work survives a restart. Jobs are claimed oldest first
+    with an atomic status update, and each one is submitted to the shared
+    Whisper worker pool as its own session, so live sessions keep their
+    fair share.
+    
+    A claimed job carries a lease (owner and expiry) that the runner renews
+    while it works. Only jobs whose lease expired, because their process
+    died, are claimed again, so several processes or nodes can share the
+    collection without running a job twice. A job is failed once it has
+    been claimed `max_attempts` times.
+    """
+    
+    def __init__(
+        self,
+        concurrency: int = 2,
+        poll_interval: float = 5.0,
+        lease_seconds: float = 60.0,
+        max_attempts: int = 5,
+        owner: Optional[str] = None
+    ):
+        self.concurrency = max(1, concurrency)
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._workers: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running = 0
+        self._completed = 0
+        self._failed = 0
+        self._requeued = 0
+        self._lost_leases = 0
+    
+    @property
+    def started(self) -> bool:
+        return bool(self._workers)
+    
+    async def start(self):
+        """Start the workers; jobs of dead processes are reclaimed when their lease expires"""
+        if self.started:
+            return
+        
+        self._wakeup = asyncio.Event()
+        self._workers = [asyncio.create_task(self._worker_loop()) for _ in range(self.concurrency)]
+        logger.info(f"Transcription job runner started: {self.concurrency} worker(s), owner {self.owner}")
+    
+    async def shutdown(self):
+        """Stop the workers; their jobs are reclaimed once the leases expire"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+    
+    def notify(self):
+        """Wake idle workers after new jobs were submitted"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    async def _wait(self, timeout: float):
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    
+    def _claimable(self, now: datetime) -> dict:
+        """Queued jobs due for a (re)try, and processing jobs whose lease expired"""
+        return {"$or": [
+            {"status": JOB_QUEUED, "retry_at": {"$not": {"$gt": now}}},
+            {"status": JOB_PROCESSING, "lease_expires_at": {"$not": {"$gt": now}}}
+        ]}
+    
+    async def _claim(self) -> Optional[dict]:
+        jobs = get_transcription_jobs_collection()
+        if jobs is None:
+            return None
+        # Only load a lazily loaded model once there is work for it
+        if not is_transcription_available() and await jobs.find_one(self._claimable(datetime.utcnow())) is None:
+            return None
+        if await ensure_whisper_model() is None:
+            return None
+        
+        now = datetime.utcnow()
+        return await jobs.find_one_and_update(
+            self._claimable(now),
+            {
+                "$set": {
+                    "status": JOB_PROCESSING,
+                    "started_at": now,
+                    "lease_owner": self.owner,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds)
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("created_at", 1), ("_id", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def _finish(self, job_id: str, fields: dict) -> bool:
+        """Update a job we still hold the lease of; False if another runner took it over"""
+        jobs = get_transcription_jobs_collection()
+        result = await jobs.update_one(
+            {"job_id": job_id, "lease_owner": self.owner},
+            {"$set": {**fields, "lease_owner": None, "lease_expires_at": None}}
+        )
+        if not result.matched_count:
+            self._lost_leases += 1
+            logger.warning(f"Lease on transcription job {job_id} was lost; discarding this run")
+            return False
+        return True
+    
+    async def _renew_lease(self, job_id: str, task: asyncio.Task):
+        """Extend the lease while the job runs; cancel the run if the lease was lost"""
+        jobs = get_transcription_jobs_collection()
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                result = await jobs.update_one(
+                    {"job_id": job_id, "lease_owner": self.owner},
+                    {"$set": {"lease_expires_at": datetime.utcnow() + timedelta(seconds=self.lease_seconds)}}
+                )
+            except Exception as e:
+                logger.warning(f"Could not renew lease on transcription job {job_id}: {e}")
+                continue
+            if not result.matched_count:
+                self._lost_leases += 1
+                logger.warning(f"Lease on transcription job {job_id} was taken over; stopping this run")
+                task.cancel()
+                return
+    
+    async def _transcribe(self, job: dict, vad_stats: VadStats) -> str:
+        """Transcribe a job's audio while keeping its lease alive"""
+        task = asyncio.ensure_future(_transcribe_file(job["audio_path"], f"job-{job['job_id']}", vad_stats))
+        renewer = asyncio.create_task(self._renew_lease(job["job_id"], task))
+        try:
+            return await task
+        except asyncio.CancelledError:
+            if renewer.done() and not renewer.cancelled():
+                raise LeaseLostError(job["job_id"]) from None
+            raise
+        finally:
+            renewer.cancel()
+            task.cancel()
+    
+    async def _run(self, job: dict):
+        job_id = job["job_id"]
+        attempts = job.get("attempts", 1)
+        vad_stats = VadStats()
+        
+        if attempts > self.max_attempts:
+            # Its runners keep dying (or lost their leases) before it finishes
+            finished = await self._finish(job_id, {
+                "status": JOB_FAILED,
+                "error": f"Gave up after {self.max_attempts} attempts",
+                "completed_at": datetime.utcnow()
+            })
+            if finished:
+                self._failed += 1
+                self._remove_audio(job)
+            return
+        
+        try:
+            text = await self._transcribe(job, vad_stats)
+        except LeaseLostError:
+            # The new owner of the lease finishes the job
+            return
+        except TranscriptionBusyError as e:
+            if attempts >= self.max_attempts:
+                finished = await self._finish(job_id, {
+                    "status": JOB_FAILED,
+                    "error": f"Transcription queue still full after {attempts} attempts",
+                    "completed_at": datetime.utcnow()
+                })
+                if finished:
+                    self._failed += 1
+                    self._remove_audio(job)
+                return
+            # Live sessions filled the queue; give the job back and retry it later
+            delay = min(MAX_RETRY_DELAY_SECONDS, e.retry_after * 2 ** (attempts - 1))
+            if await self._finish(job_id, {
+                "status": JOB_QUEUED,
+                "started_at": None,
+                "retry_at": datetime.utcnow() + timedelta(seconds=delay)
+            }):
+                self._requeued += 1
+            return
+        except Exception as e:
+            logger.error(f"Transcription job {job_id} failed: {e}")
+            if await self._finish(job_id, {
+                "status": JOB_FAILED,
+                "error": str(e),
+                "completed_at": datetime.utcnow()
+            }):
+                self._failed += 1
+                self._remove_audio(job)
+            return
+        
+        if await self._finish(job_id, {
+            "status": JOB_COMPLETED,
+            "text": text,
+            "vad": vad_stats.as_dict(),
+            "completed_at": datetime.utcnow()
+        }):
+            self._completed += 1
+            self._remove_audio(job)
+    
+    def _remove_audio(self, job: dict):
+        try:
+            os.unlink(job["audio_path"])
+        except OSError:
+            pass
+    
+    async def _worker_loop(self):
+        while True:
+            try:
+                job = await self._claim()
+            except Exception as e:
+                logger.warning(f"Could not claim transcription job: {e}")
+                job = None
+            
+            if job is None:
+                await self._wait(self.poll_interval)
+                continue
+            
+            self._running += 1
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"Transcription job {job.get('job_id')} could not be updated: {e}")
+            finally:
+                self._running -= 1
+    
+    def get_stats(self) -> dict:
+        """Job counts handled by this process"""
+        return {
+            "started": self.started,
+            "concurrency": self.concurrency,
+            "running": self._running,
+            "completed": self._completed,
+            "failed": self._failed,
+            "requeued": self._requeued,
+            "lost_leases": self._lost_leases
+        }
+
+
+# Global job runner instance
+transcription_job_runner = TranscriptionJobRunner(
+    concurrency=settings.TRANSCRIPTION_JOB_CONCURRENCY,
+    poll_interval=settings.TRANSCRIPTION_JOB_POLL_SECONDS,
+    lease_seconds=settings.TRANSCRIPTION_JOB_LEASE_SECONDS,
+    max_attempts=settings.TRANSCRIPTION_JOB_MAX_ATTEMPTS
+)
@@ -1,40 +1,137 @@
 """
 MedAI - Transcription Service
-Whisper Audio Transcription
+Audio Transcription (Whisper / CTranslate2 backends)
 """
 import os
+import struct
+import asyncio
 import logging
+import threading
 import tempfile
+import subprocess
 from typing import Optional
 
+import numpy as np
+
 from app.config import settings
+from app.core.exceptions import TranscriptionBusyError
+from app.services.transcription_engine import TranscriptionEngine, SEGMENT_SAMPLES
+from app.services.transcription_backends import create_transcription_backend
+from app.services.transcription_cache import TranscriptionCache
+from app.services.sharded_transcription import ShardedTranscriber
+from app.services.vad_service import VadStats, trim_silence, pack_speech
+from app.services.component_readiness import readiness, COMPONENT_WHISPER
+from app.services.audio_preprocessing import (
+    PCM_S16LE,
+    PCM_S24LE,
+    PCM_S32LE,
+    PCM_F32LE,
+    MIN_SAMPLE_RATE,
+    MAX_SAMPLE_RATE,
+    MAX_CHANNELS,
+    normalize_loudness,
+    preprocess_pcm
+)
 
 logger = logging.getLogger("MedAI.Transcription")
 
-# Whisper model - loaded on demand
+# Whisper operates on 16 kHz mono float32 audio
+SAMPLE_RATE = 16000
+
+# Transcription language passed to Whisper
+LANGUAGE = "en"
+
+# Speech-to-text engine selected by WHISPER_BACKEND
+transcription_backend = create_transcription_backend(
+    settings.WHISPER_BACKEND,
+    model_size=settings.WHISPER_MODEL_SIZE,
+    language=LANGUAGE,
+    model_dir=settings.WHISPER_MODEL_DIR,
+    compute_type=settings.WHISPER_COMPUTE_TYPE,
+    threads=settings.WHISPER_CPU_THREADS
+)
+
+# Model of the configured backend - loaded on demand
 _whisper_model = None
+_model_task: Optional[asyncio.Future] = None
+
+# Format tags in the WAV fmt chunk
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# WAV sample layouts decoded in-process
+WAV_SAMPLE_FORMATS = {
+    (WAVE_FORMAT_PCM, 16): PCM_S16LE,
+    (WAVE_FORMAT_PCM, 24): PCM_S24LE,
+    (WAVE_FORMAT_PCM, 32): PCM_S32LE,
+    (WAVE_FORMAT_IEEE_FLOAT, 32): PCM_F32LE
+}
+
+# Settings besides the model that change a transcript; part of every cache key
+OUTPUT_SETTINGS = (
+    "VAD_ENABLED",
+    "VAD_FRAME_MS",
+    "VAD_ENERGY_THRESHOLD_DB",
+    "VAD_MIN_ENERGY_DB",
+    "VAD_SPEECH_FLOOR_DB",
+    "VAD_FLUX_THRESHOLD",
+    "VAD_MIN_SPEECH_MS",
+    "VAD_MIN_SILENCE_MS",
+    "VAD_PADDING_MS",
+    "AUDIO_NORMALIZE_LOUDNESS",
+    "AUDIO_TARGET_LOUDNESS_DBFS",
+    "AUDIO_MAX_GAIN_DB",
+    "SHARDED_TRANSCRIPTION",
+    "SHARDED_MIN_SECONDS",
+    "SHARDED_SHARD_SECONDS",
+    "SHARDED_OVERLAP_SECONDS",
+    "WHISPER_BATCHING"
+)
+
+# Decode path counters (see get_decode_stats)
+_decode_stats = {
+    "native": 0,
+    "pipe": 0,
+    "tempfile": 0,
+    "tempfile_bytes_written": 0
+}
 
 
 def load_whisper_model():
-    """Load Whisper model"""
+    """Load the model of the configured transcription backend"""
     global _whisper_model
     
     if _whisper_model is not None:
         return _whisper_model
     
     try:
-        import whisper
-        logger.info(f"Loading Whisper model ({settings.WHISPER_MODEL_SIZE})...")
-        _whisper_model = whisper.load_model(settings.WHISPER_MODEL_SIZE)
-        logger.info("Whisper model loaded successfully")
+        logger.info(f"Loading transcription model {transcription_backend.describe()}...")
+        _whisper_model = transcription_backend.load()
+        logger.info("Transcription model loaded successfully")
         return _whisper_model
     except Exception as e:
         logger.error(f"Failed to load Whisper model: {e}")
         return None
 
 
+async def ensure_whisper_model():
+    """Load the model in a worker thread on first use
+    
+    Concurrent callers share one load; a failed load is not retried.
+    """
+    global _model_task
+    if _whisper_model is not None:
+        return _whisper_model
+    if _model_task is None:
+        _model_task = asyncio.ensure_future(
+            readiness.track(COMPONENT_WHISPER, asyncio.to_thread(load_whisper_model))
+        )
+    return await asyncio.shield(_model_task)
+
+
 def get_whisper_model():
-    """Get Whisper model instance"""
+    """Get the loaded transcription model instance"""
     global _whisper_model
     return _whisper_model
 
@@ -44,44 +141,394 @@ def is_transcription_available() -> bool:
     return _whisper_model is not None
 
 
-async def transcribe_audio(audio_bytes: bytes) -> str:
-    """Transcribe audio bytes to text"""
-    model = get_whisper_model()
+# Worker pool that runs Whisper off the event loop
+transcription_engine = TranscriptionEngine(
+    get_whisper_model,
+    workers=settings.WHISPER_WORKERS,
+    queue_size=settings.WHISPER_QUEUE_SIZE,
+    executor_kind=settings.WHISPER_EXECUTOR,
+    backend=transcription_backend,
+    batching=settings.WHISPER_BATCHING,
+    batch_size=settings.WHISPER_BATCH_SIZE,
+    batch_window=settings.WHISPER_BATCH_WINDOW_MS / 1000
+)
+
+
+# Long recordings, split at pauses and transcribed in parallel on the worker pool
+sharded_transcriber = ShardedTranscriber(
+    transcription_engine,
+    min_seconds=settings.SHARDED_MIN_SECONDS,
+    shard_seconds=settings.SHARDED_SHARD_SECONDS,
+    overlap_seconds=settings.SHARDED_OVERLAP_SECONDS,
+    enabled=settings.SHARDED_TRANSCRIPTION
+)
+
+
+# Transcript cache keyed by audio content, backend/model and language
+transcription_cache = TranscriptionCache(
+    max_bytes=settings.TRANSCRIPTION_CACHE_MAX_MB * 1024 * 1024,
+    ttl=settings.TRANSCRIPTION_CACHE_TTL_SECONDS,
+    persistent=settings.TRANSCRIPTION_CACHE_PERSISTENT
+)
+
+
+def get_transcription_cache_stats() -> dict:
+    """Get transcription cache hit/miss counters"""
+    return transcription_cache.get_stats()
+
+
+def get_transcription_stats() -> dict:
+    """Get transcription worker pool metrics"""
+    stats = transcription_engine.get_stats()
+    stats["model"] = transcription_backend.describe()
+    stats["sharding"] = sharded_transcriber.get_stats()
+    return stats
+
+
+async def shutdown_transcription_engine():
+    """Stop the transcription worker pool"""
+    await transcription_engine.shutdown()
+
+
+def get_decode_stats() -> dict:
+    """Get counters of which audio decode path was used"""
+    return dict(_decode_stats)
+
+
+def pcm16_to_float32(pcm_bytes: bytes) -> np.ndarray:
+    """Convert little-endian signed 16-bit PCM into float32 samples in [-1, 1]"""
+    return np.frombuffer(pcm_bytes, dtype="<i2").astype(np.float32) / 32768.0
+
+
+def _decode_wav(audio_bytes) -> Optional[np.ndarray]:
+    """Decode PCM or float WAV in-process, or None if another path is needed
     
-    if not model:
-        return "Whisper model not loaded"
+    Chunks are walked directly over the input buffer, so a memoryview of a
+    spooled recording is converted to float32 without an intermediate copy.
+    Other sample rates and channel layouts are resampled and downmixed
+    with NumPy instead of ffmpeg.
+    """
+    if len(audio_bytes) < 12 or audio_bytes[:4] != b"RIFF" or audio_bytes[8:12] != b"WAVE":
+        return None
     
-    try:
-        # Validate audio data
-        if len(audio_bytes) == 0:
-            return "Empty audio data"
-        
-        if len(audio_bytes) > settings.max_audio_size:
-            return "Audio file too large"
+    fmt = None
+    offset = 12
+    while offset + 8 <= len(audio_bytes):
+        chunk_id = bytes(audio_bytes[offset:offset + 4])
+        (chunk_size,) = struct.unpack("<I", audio_bytes[offset + 4:offset + 8])
+        body = offset + 8
         
-        # Write to temp file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
+        if chunk_id == b"fmt " and chunk_size >= 16:
+            fmt = struct.unpack("<HHIIHH", audio_bytes[body:body + 16])
+            if fmt[0] == WAVE_FORMAT_EXTENSIBLE and chunk_size >= 40:
+                # The real format tag opens the sub-format GUID
+                (tag,) = struct.unpack("<H", audio_bytes[body + 24:body + 26])
+                fmt = (tag,) + fmt[1:]
+        elif chunk_id == b"data":
+            if fmt is None:
+                return None
+            audio_format, channels, rate, _, _, bits = fmt
+            sample_format = WAV_SAMPLE_FORMATS.get((audio_format, bits))
+            if (
+                sample_format is None
+                or not MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE
+                or not 1 <= channels <= MAX_CHANNELS
+            ):
+                return None
+            
+            # Tolerate streaming writers that leave the data size unset
+            size = min(chunk_size, len(audio_bytes) - body)
+            size -= size % (bits // 8 * channels)
+            return preprocess_pcm(audio_bytes[body:body + size], rate, channels, sample_format)
         
+        offset = body + chunk_size + (chunk_size & 1)
+    
+    return None
+
+
+def _decode_pipe(audio_bytes: bytes) -> np.ndarray:
+    """Decode any ffmpeg-readable format through stdin/stdout pipes"""
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "-loglevel", "error",
+        "pipe:1"
+    ]
+    result = subprocess.run(cmd, input=audio_bytes, capture_output=True, check=True)
+    return pcm16_to_float32(result.stdout)
+
+
+class ContainerStreamDecoder:
+    """Decodes a growing webm/ogg/mp4 stream through one long-lived ffmpeg process
+    
+    Each chunk is written once to ffmpeg's stdin, and a reader thread
+    collects the PCM it emits, so a session's audio is decoded once in
+    total instead of from the first byte on every window.
+    """
+    
+    def __init__(self):
+        self.cmd = [
+            "ffmpeg", "-nostdin", "-threads", "1",
+            # Start emitting audio without buffering seconds of input first
+            "-probesize", "32768", "-analyzeduration", "0",
+            "-i", "pipe:0",
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+            "-loglevel", "error",
+            "pipe:1"
+        ]
+        self.bytes_in = 0
+        self._process: Optional[subprocess.Popen] = None
+        self._reader: Optional[threading.Thread] = None
+        self._pcm = bytearray()
+        self._lock = threading.Lock()
+    
+    def _start(self):
+        self._process = subprocess.Popen(
+            self.cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0
+        )
+        self._reader = threading.Thread(target=self._read_output, name="stream-decode", daemon=True)
+        self._reader.start()
+    
+    def _read_output(self):
+        stdout = self._process.stdout
+        while True:
+            data = stdout.read(65536)
+            if not data:
+                return
+            with self._lock:
+                self._pcm.extend(data)
+    
+    def write(self, data) -> None:
+        """Send newly received bytes to ffmpeg (blocking)"""
+        if not data:
+            return
+        if self._process is None:
+            self._start()
         try:
-            # Transcribe
-            result = model.transcribe(
-                tmp_path,
-                fp16=False,
-                language='en'
-            )
-            
-            transcribed_text = result.get("text", "").strip()
-            logger.info(f"Transcription completed: {len(transcribed_text)} characters")
-            
-            return transcribed_text
-            
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.unlink(tmp_path)
-                
+            self._process.stdin.write(data)
+        except (BrokenPipeError, ValueError):
+            raise RuntimeError(f"Audio stream decoder exited with code {self._process.poll()}")
+        self.bytes_in += len(data)
+    
+    def read(self) -> np.ndarray:
+        """Samples decoded since the last call"""
+        with self._lock:
+            usable = len(self._pcm) - len(self._pcm) % 2
+            pcm = bytes(self._pcm[:usable])
+            del self._pcm[:usable]
+        return pcm16_to_float32(pcm)
+    
+    def finish(self) -> np.ndarray:
+        """Close the input and return the remaining samples (blocking)"""
+        if self._process is None:
+            return np.zeros(0, dtype=np.float32)
+        try:
+            self._process.stdin.close()
+        except BrokenPipeError:
+            pass
+        self._reader.join()
+        self._process.wait()
+        return self.read()
+    
+    def close(self):
+        """Stop ffmpeg and drop undelivered output"""
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.kill()
+            for pipe in (self._process.stdin, self._process.stdout):
+                try:
+                    pipe.close()
+                except (BrokenPipeError, ValueError):
+                    pass
+            self._process.wait()
+            self._process = None
+        with self._lock:
+            self._pcm = bytearray()
+
+
+def _decode_tempfile(audio_bytes: bytes) -> np.ndarray:
+    """Decode via a temporary file for inputs ffmpeg cannot read from a pipe"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+        tmp.write(audio_bytes)
+        tmp_path = tmp.name
+    _decode_stats["tempfile_bytes_written"] += len(audio_bytes)
+    
+    try:
+        cmd = [
+            "ffmpeg", "-nostdin", "-threads", "0",
+            "-i", tmp_path,
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+            "-loglevel", "error",
+            "pipe:1"
+        ]
+        result = subprocess.run(cmd, capture_output=True, check=True)
+        return pcm16_to_float32(result.stdout)
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+
+
+def decode_audio(audio_bytes: bytes) -> np.ndarray:
+    """Decode encoded audio bytes into 16 kHz mono float32 samples
+    
+    PCM and float WAV is parsed and resampled in-process; everything else
+    (webm/opus/ogg, mp4) is streamed through ffmpeg pipes. The temp-file path is
+    only used when the pipe decode fails, e.g. MP4 with a trailing moov atom.
+    """
+    samples = _decode_wav(audio_bytes)
+    if samples is not None:
+        _decode_stats["native"] += 1
+        return samples
+    
+    try:
+        samples = _decode_pipe(audio_bytes)
+        if samples.size:
+            _decode_stats["pipe"] += 1
+            return samples
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug(f"Pipe decode failed, falling back to temp file: {e}")
+    
+    _decode_stats["tempfile"] += 1
+    return _decode_tempfile(audio_bytes)
+
+
+async def transcribe_samples(
+    samples: np.ndarray,
+    session_id: str = "default",
+    vad_stats: Optional[VadStats] = None
+) -> str:
+    """Transcribe already decoded 16 kHz mono float32 samples on the worker pool
+    
+    Silence is trimmed first; audio without speech never reaches Whisper.
+    Long recordings are sharded at pauses and transcribed in parallel.
+    """
+    if await ensure_whisper_model() is None:
+        raise RuntimeError("Whisper model not loaded")
+    
+    if samples.size == 0:
+        return ""
+    
+    samples = samples.astype(np.float32, copy=False)
+    if sharded_transcriber.should_shard(samples):
+        return await sharded_transcriber.transcribe(samples, vad_stats, session_id)
+    
+    trimmed, segments = await asyncio.to_thread(trim_silence, samples, vad_stats)
+    if trimmed.size == 0:
+        return ""
+    
+    units = None
+    if transcription_engine.batching:
+        units = pack_speech(samples, segments, SEGMENT_SAMPLES)
+    
+    return await transcription_engine.transcribe(trimmed, session_id, units=units)
+
+
+async def transcribe_recording(
+    audio_bytes: bytes,
+    session_id: str = "default",
+    vad_stats: Optional[VadStats] = None
+) -> str:
+    """Transcribe a whole recording, raising on invalid audio or failure
+    
+    Accepts bytes or a memoryview of a spooled buffer. Results are cached
+    by audio content.
+    """
+    if await ensure_whisper_model() is None:
+        raise RuntimeError("Whisper model not loaded")
+    
+    # Validate audio data
+    if len(audio_bytes) == 0:
+        raise ValueError("Empty audio data")
+    
+    if len(audio_bytes) > settings.max_recording_size:
+        raise ValueError("Audio file too large")
+    
+    async def transcribe(stats: VadStats):
+        # Decode in memory (ffmpeg may block) and transcribe on the worker pool
+        samples = await asyncio.to_thread(decode_audio, audio_bytes)
+        if settings.AUDIO_NORMALIZE_LOUDNESS:
+            samples = await asyncio.to_thread(normalize_loudness, samples)
+        return await transcribe_samples(samples, session_id, stats)
+    
+    return await _cached_transcription(audio_bytes, transcription_backend.cache_id, transcribe, vad_stats)
+
+
+async def transcribe_converted_recording(
+    samples: np.ndarray,
+    session_id: str = "default",
+    vad_stats: Optional[VadStats] = None
+) -> str:
+    """Transcribe a whole recording already converted to 16 kHz mono float32
+    
+    Results are cached by the converted samples, like encoded recordings
+    are by their bytes.
+    """
+    if await ensure_whisper_model() is None:
+        raise RuntimeError("Whisper model not loaded")
+    
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    return await _cached_transcription(
+        memoryview(samples).cast("B"),
+        f"{transcription_backend.cache_id}:f32",
+        lambda stats: transcribe_samples(samples, session_id, stats),
+        vad_stats
+    )
+
+
+async def _cached_transcription(content, model: str, transcribe, vad_stats: Optional[VadStats]) -> str:
+    """Serve retries and resent recordings from the cache, else run `transcribe(stats)` and store its text
+    
+    The VAD totals are cached with the text and added to `vad_stats` on a
+    hit too, so callers see the recording's duration either way.
+    """
+    stats = VadStats()
+    cache_key = None
+    if settings.TRANSCRIPTION_CACHE_ENABLED:
+        options = {name: getattr(settings, name) for name in OUTPUT_SETTINGS}
+        cache_key = await transcription_cache.key_for(content, model, LANGUAGE, options)
+        cached = await transcription_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Transcription cache hit: {len(cached['text'])} characters")
+            if vad_stats is not None:
+                vad_stats.add_seconds(cached["total_seconds"], cached["speech_seconds"])
+            return cached["text"]
+    
+    transcribed_text = await transcribe(stats)
+    logger.info(f"Transcription completed: {len(transcribed_text)} characters")
+    if vad_stats is not None:
+        vad_stats.add_seconds(stats.total_seconds, stats.speech_seconds)
+    
+    if cache_key is not None:
+        await transcription_cache.set(cache_key, {
+            "text": transcribed_text,
+            "total_seconds": stats.total_seconds,
+            "speech_seconds": stats.speech_seconds
+        })
+    
+    return transcribed_text
+
+
+async def transcribe_audio(
+    audio_bytes: bytes,
+    session_id: str = "default",
+    vad_stats: Optional[VadStats] = None
+) -> str:
+    """Transcribe audio bytes (or a memoryview of a spooled buffer) to text
+    
+    Raises instead of returning an error message: RuntimeError without a
+    model, ValueError for empty or oversized audio, TranscriptionBusyError
+    when the queue is full, and decoder or backend errors as they are.
+    """
+    try:
+        return await transcribe_recording(audio_bytes, session_id, vad_stats)
+    
+    except TranscriptionBusyError:
+        raise
     except Exception as e:
         logger.error(f"Transcription error: {e}")
-        return f"Transcription failed: {str(e)}"
+        raise
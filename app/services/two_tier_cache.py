@@ -0,0 +1,133 @@
+"""
+MedAI - Two-Tier Cache
+In-process LRU bounded by bytes, backed by an optional MongoDB TTL collection
+"""
+import time
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger("MedAI.TwoTierCache")
+
+# Approximate per-entry bookkeeping overhead in the memory tier
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class TwoTierCache:
+    """Two-tier cache: in-process LRU bounded by bytes, plus optional Mongo tier
+    
+    Both tiers expire entries after `ttl` seconds. Subclasses name the
+    collection, the document field holding the value and how to size a
+    value; keys are built by the subclass.
+    """
+    
+    # Document field holding the cached value, and the name used in logs
+    value_field = "value"
+    label = "Cache"
+    
+    def __init__(self, max_bytes: int, ttl: int, persistent: bool = True):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._bytes = 0
+        
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+    
+    def _collection(self):
+        """MongoDB collection of the persistent tier, or None if unavailable"""
+        raise NotImplementedError
+    
+    def _size_of(self, value) -> int:
+        raise NotImplementedError
+    
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, size, _) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+    
+    def _remember(self, key: str, value, expires_at: float):
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        size = self._size_of(value) + len(key) + ENTRY_OVERHEAD_BYTES
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size, expires_at)
+        self._bytes += size
+        self._evict()
+    
+    async def get(self, key: str) -> Optional[Any]:
+        """Cached value for a key, or None"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, size, expires_at = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            del self._entries[key]
+            self._bytes -= size
+        
+        collection = self._collection() if self.persistent else None
+        if collection is not None:
+            try:
+                doc = await collection.find_one({
+                    "key": key,
+                    "expires_at": {"$gt": datetime.utcnow()}
+                })
+                if doc:
+                    self.persistent_hits += 1
+                    remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+                    self._remember(key, doc[self.value_field], time.time() + remaining)
+                    return doc[self.value_field]
+            except Exception as e:
+                logger.warning(f"{self.label} cache lookup failed: {e}")
+        
+        self.misses += 1
+        return None
+    
+    async def set(self, key: str, value):
+        """Store a value in both tiers"""
+        self._remember(key, value, time.time() + self.ttl)
+        
+        collection = self._collection() if self.persistent else None
+        if collection is not None:
+            try:
+                now = datetime.utcnow()
+                await collection.update_one(
+                    {"key": key},
+                    {"$set": {
+                        "key": key,
+                        self.value_field: value,
+                        "created_at": now,
+                        "expires_at": now + timedelta(seconds=self.ttl)
+                    }},
+                    upsert=True
+                )
+            except Exception as e:
+                logger.warning(f"{self.label} cache write failed: {e}")
+    
+    def clear(self):
+        """Drop the in-process tier"""
+        self._entries.clear()
+        self._bytes = 0
+    
+    def get_stats(self) -> dict:
+        """Hit/miss counters and memory tier usage"""
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        hits = self.memory_hits + self.persistent_hits
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,159 @@
+"""
+MedAI - Resumable Uploads
+Session-scoped audio spools that survive WebSocket reconnects
+"""
+import time
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.services.audio_buffer import SpooledAudioBuffer
+
+logger = logging.getLogger("MedAI.Uploads")
+
+CHUNK_ACCEPTED = "accepted"
+CHUNK_DUPLICATE = "duplicate"
+CHUNK_GAP = "gap"
+
+
+class ResumableUpload:
+    """The recording of one session, received as sequence-numbered chunks
+    
+    Chunks are appended only in order: an already received sequence number
+    is a resend and is ignored, a number past the next expected one means
+    chunks went missing and is rejected so the client resends from
+    `next_seq`.
+    
+    All connections of a session share the upload, so while one of them
+    transcribes it (holding a view of the buffer) the others must wait in
+    `idle()` before changing it.
+    """
+    
+    def __init__(self):
+        self.buffer = SpooledAudioBuffer()
+        self.next_seq = 0
+        self.generation = 0  # bumped on every reset
+        self.connections = 0
+        self.touched = time.monotonic()
+        self._idle = asyncio.Event()
+        self._idle.set()
+    
+    @property
+    def offset(self) -> int:
+        """Bytes received so far"""
+        return len(self.buffer)
+    
+    def accept(self, chunk: bytes, seq: Optional[int] = None) -> str:
+        """Append a chunk; without `seq` it is taken as the next one"""
+        self.touched = time.monotonic()
+        if seq is None:
+            seq = self.next_seq
+        if seq < self.next_seq:
+            return CHUNK_DUPLICATE
+        if seq > self.next_seq:
+            return CHUNK_GAP
+        
+        self.buffer.extend(chunk)
+        self.next_seq += 1
+        return CHUNK_ACCEPTED
+    
+    def reset(self):
+        """Start a new recording"""
+        self.buffer.clear()
+        self.next_seq = 0
+        self.generation += 1
+    
+    @property
+    def transcribing(self) -> bool:
+        return not self._idle.is_set()
+    
+    async def idle(self):
+        """Wait until no connection is transcribing the recording"""
+        await self._idle.wait()
+    
+    def begin_transcription(self) -> Tuple[int, int]:
+        """Mark the recording in flight; returns the token `end_transcription` checks"""
+        self._idle.clear()
+        return self.generation, self.offset
+    
+    def end_transcription(self, token: Tuple[int, int], transcribed: bool):
+        """Clear a transcribed recording, unless it changed since `begin_transcription`"""
+        self._idle.set()
+        if transcribed and token == (self.generation, self.offset):
+            self.reset()
+    
+    def state(self) -> dict:
+        return {"seq": self.next_seq, "offset": self.offset}
+    
+    def close(self):
+        self.buffer.close()
+
+
+class UploadSpools:
+    """Uploads by session, kept for `idle_ttl` seconds after the last connection closes
+    
+    Expired uploads are dropped lazily whenever a connection attaches or
+    detaches, so no background task is needed.
+    """
+    
+    def __init__(self, idle_ttl: float = 300.0):
+        self.idle_ttl = idle_ttl
+        self._uploads: Dict[str, ResumableUpload] = {}
+        self.resumed = 0
+        self.expired = 0
+    
+    def attach(self, session_id: str) -> ResumableUpload:
+        """Upload of a session for a new connection, resuming a kept one"""
+        self.sweep()
+        upload = self._uploads.get(session_id)
+        if upload is None:
+            upload = self._uploads[session_id] = ResumableUpload()
+        elif upload.offset:
+            self.resumed += 1
+            logger.info(f"Resuming upload for {session_id} at {upload.offset} bytes (seq {upload.next_seq})")
+        upload.connections += 1
+        upload.touched = time.monotonic()
+        return upload
+    
+    def detach(self, session_id: str, keep: bool = True):
+        """A connection closed; keep partial audio for a reconnect unless told not to"""
+        upload = self._uploads.get(session_id)
+        if upload is None:
+            return
+        upload.connections = max(0, upload.connections - 1)
+        upload.touched = time.monotonic()
+        if upload.connections == 0 and (not keep or not upload.offset):
+            self.discard(session_id)
+        self.sweep()
+    
+    def discard(self, session_id: str):
+        upload = self._uploads.pop(session_id, None)
+        if upload is not None:
+            upload.close()
+    
+    def sweep(self) -> int:
+        """Drop detached uploads idle for longer than the TTL"""
+        now = time.monotonic()
+        expired = [
+            session_id for session_id, upload in self._uploads.items()
+            if upload.connections == 0 and now - upload.touched > self.idle_ttl
+        ]
+        for session_id in expired:
+            self.discard(session_id)
+        self.expired += len(expired)
+        return len(expired)
+    
+    def get_stats(self) -> dict:
+        return {
+            "uploads": len(self._uploads),
+            "detached": sum(1 for upload in self._uploads.values() if upload.connections == 0),
+            "bytes": sum(upload.offset for upload in self._uploads.values()),
+            "memory_bytes": sum(upload.buffer.memory_bytes for upload in self._uploads.values()),
+            "resumed": self.resumed,
+            "expired": self.expired
+        }
+
+
+# Partial recordings of all sessions on this worker
+upload_spools = UploadSpools(idle_ttl=settings.UPLOAD_RESUME_TTL_SECONDS)
@@ -0,0 +1,219 @@
+"""
+MedAI - Voice Activity Detection
+Vectorized energy / spectral-flux VAD used to trim silence before Whisper
+"""
+import logging
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.config import settings
+
+logger = logging.getLogger("MedAI.VAD")
+
+SAMPLE_RATE = 16000
+
+# Silence inserted between kept speech segments so Whisper still sees a pause
+JOIN_GAP_SECONDS = 0.1
+
+Segment = Tuple[int, int]
+
+
+class VadStats:
+    """Running totals of audio seen vs. audio kept as speech"""
+    
+    def __init__(self):
+        self.total_seconds = 0.0
+        self.speech_seconds = 0.0
+    
+    @property
+    def trimmed_seconds(self) -> float:
+        return max(0.0, self.total_seconds - self.speech_seconds)
+    
+    def add(self, total_samples: int, speech_samples: int, sample_rate: int = SAMPLE_RATE):
+        self.total_seconds += total_samples / sample_rate
+        self.speech_seconds += speech_samples / sample_rate
+    
+    def add_seconds(self, total_seconds: float, speech_seconds: float):
+        self.total_seconds += total_seconds
+        self.speech_seconds += speech_seconds
+    
+    def add_part(self, other: "VadStats", fraction: float):
+        """Add a share of another run's totals, e.g. the part of an overlapping window not counted yet"""
+        self.add_seconds(other.total_seconds * fraction, other.speech_seconds * fraction)
+    
+    def as_dict(self) -> dict:
+        total = self.total_seconds
+        return {
+            "total_seconds": round(total, 2),
+            "speech_seconds": round(self.speech_seconds, 2),
+            "trimmed_seconds": round(self.trimmed_seconds, 2),
+            "trimmed_ratio": round(self.trimmed_seconds / total, 3) if total else 0.0
+        }
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end (exclusive) indices of True runs in a boolean mask"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _frame_features(samples: np.ndarray, frame: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-frame energy (dBFS) and normalized positive spectral flux"""
+    count = len(samples) // frame
+    frames = samples[:count * frame].reshape(count, frame)
+    
+    energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+    
+    spectrum = np.abs(np.fft.rfft(frames * np.hanning(frame).astype(np.float32), axis=1))
+    spectrum /= spectrum.sum(axis=1, keepdims=True) + 1e-9
+    flux = np.zeros(count, dtype=np.float32)
+    if count > 1:
+        flux[1:] = np.maximum(spectrum[1:] - spectrum[:-1], 0).sum(axis=1)
+    
+    return energy_db, flux
+
+
+def speech_mask(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Tuple[np.ndarray, int]:
+    """Smoothed per-frame speech decision and the frame length in samples"""
+    frame = max(1, int(sample_rate * settings.VAD_FRAME_MS / 1000))
+    if len(samples) < frame:
+        return np.zeros(0, dtype=bool), frame
+    
+    energy_db, flux = _frame_features(samples, frame)
+    
+    # Adaptive threshold between the noise floor and the loudest frames
+    noise_floor = np.percentile(energy_db, 10)
+    peak = np.percentile(energy_db, 99)
+    margin = settings.VAD_ENERGY_THRESHOLD_DB
+    if peak - noise_floor < margin:
+        # No dynamic range to adapt to: silence, hum or hiss, but also a short
+        # window of steady speech, so fall back to an absolute speech level
+        mask = energy_db > settings.VAD_SPEECH_FLOOR_DB
+    else:
+        threshold = max(settings.VAD_MIN_ENERGY_DB, min(noise_floor + margin, peak - margin))
+        
+        mask = energy_db > threshold
+        # Spectral flux catches quiet onsets (consonants) that energy alone misses
+        median_flux = np.median(flux) + 1e-9
+        mask |= (flux > settings.VAD_FLUX_THRESHOLD * median_flux) & (energy_db > threshold - margin / 2)
+    
+    frame_ms = 1000 * frame / sample_rate
+    
+    # Drop speech blips shorter than the minimum speech duration
+    starts, ends = _runs(mask)
+    short = (ends - starts) * frame_ms < settings.VAD_MIN_SPEECH_MS
+    for s, e in zip(starts[short], ends[short]):
+        mask[s:e] = False
+    
+    # Pad speech on both sides
+    pad = int(settings.VAD_PADDING_MS / frame_ms)
+    if pad and mask.any():
+        mask = np.convolve(mask.astype(np.int8), np.ones(2 * pad + 1, dtype=np.int8), mode="same") > 0
+    
+    # Bridge pauses shorter than the minimum silence duration
+    starts, ends = _runs(mask)
+    if len(starts) > 1:
+        gaps = (starts[1:] - ends[:-1]) * frame_ms < settings.VAD_MIN_SILENCE_MS
+        for s, e in zip(ends[:-1][gaps], starts[1:][gaps]):
+            mask[s:e] = True
+    
+    return mask, frame
+
+
+def detect_speech(samples: np.ndarray, sample_rate: int = SAMPLE_RATE) -> List[Segment]:
+    """Speech segments as (start, end) sample indices"""
+    mask, frame = speech_mask(samples, sample_rate)
+    starts, ends = _runs(mask)
+    segments = [(int(s) * frame, int(e) * frame) for s, e in zip(starts, ends)]
+    # The last partial frame belongs to a trailing speech segment
+    if segments and segments[-1][1] == len(mask) * frame:
+        segments[-1] = (segments[-1][0], len(samples))
+    return segments
+
+
+def trim_silence(
+    samples: np.ndarray,
+    stats: Optional[VadStats] = None,
+    sample_rate: int = SAMPLE_RATE
+) -> Tuple[np.ndarray, List[Segment]]:
+    """Drop silence, joining speech segments with a short gap
+    
+    Returns the trimmed audio and the speech segments it was built from.
+    """
+    if not settings.VAD_ENABLED or samples.size == 0:
+        if stats is not None:
+            stats.add(samples.size, samples.size, sample_rate)
+        return samples, [(0, samples.size)] if samples.size else []
+    
+    segments = detect_speech(samples, sample_rate)
+    speech = sum(e - s for s, e in segments)
+    if stats is not None:
+        stats.add(samples.size, speech, sample_rate)
+    
+    if not segments:
+        return np.zeros(0, dtype=np.float32), []
+    if len(segments) == 1 and segments[0] == (0, samples.size):
+        return samples, segments
+    
+    gap = np.zeros(int(JOIN_GAP_SECONDS * sample_rate), dtype=samples.dtype)
+    parts = []
+    for s, e in segments:
+        if parts:
+            parts.append(gap)
+        parts.append(samples[s:e])
+    return np.concatenate(parts), segments
+
+
+def find_silence_cut(samples: np.ndarray, earliest: int, sample_rate: int = SAMPLE_RATE) -> Optional[int]:
+    """Sample index in the middle of the latest pause at or after `earliest`
+    
+    Used by streaming transcription to end windows in silence rather than
+    mid-word. Returns None when there is no pause in the search range.
+    """
+    if not settings.VAD_ENABLED:
+        return None
+    
+    mask, frame = speech_mask(samples, sample_rate)
+    if not mask.any():
+        return None
+    
+    starts, ends = _runs(~mask)
+    centers = (starts + ends) // 2 * frame
+    candidates = centers[(centers >= earliest) & (starts > 0)]
+    return int(candidates[-1]) if len(candidates) else None
+
+
+def pack_speech(
+    samples: np.ndarray,
+    segments: List[Segment],
+    max_samples: int,
+    sample_rate: int = SAMPLE_RATE
+) -> List[np.ndarray]:
+    """Group speech segments into units of at most `max_samples`
+    
+    Units break between segments where possible, so fixed-length decoders
+    (30-second Whisper windows) do not cut words in half.
+    """
+    gap = np.zeros(int(JOIN_GAP_SECONDS * sample_rate), dtype=samples.dtype)
+    units: List[np.ndarray] = []
+    current: List[np.ndarray] = []
+    current_len = 0
+    
+    for s, e in segments:
+        # Segments longer than a unit can only be split hard
+        for start in range(s, e, max_samples):
+            piece = samples[start:min(start + max_samples, e)]
+            extra = len(piece) + (len(gap) if current else 0)
+            if current and current_len + extra > max_samples:
+                units.append(np.concatenate(current))
+                current, current_len = [], 0
+                extra = len(piece)
+            if current:
+                current.append(gap)
+            current.append(piece)
+            current_len += extra
+    
+    if current:
+        units.append(np.concatenate(current))
+    return units
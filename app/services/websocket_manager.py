@@ -2,68 +2,417 @@
 MedAI - WebSocket Connection Manager
 Real-time Transcription Session Management
 """
+import os
+import time
+import socket
+import asyncio
 import logging
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from fastapi import WebSocket
 
-from app.schemas import ConversationSession
+from app.config import settings
+from app.schemas import ConversationSession, TranscriptSegment
+from app.services.session_persistence import SessionStore
+from app.services.websocket_outbox import ConnectionOutbox, POLICY_DISCONNECT
+from app.services.session_registry import (
+    SessionRegistry,
+    InMemorySessionRegistry,
+    EVENT_MESSAGE,
+    EVENT_CLAIM,
+    EVENT_RELEASE,
+    create_session_registry
+)
 
 logger = logging.getLogger("MedAI.WebSocket")
 
+# Rough in-memory cost of a session and of each transcript segment, used
+# for the memory budget (text bytes are counted on top)
+SESSION_BASE_BYTES = 2048
+SEGMENT_OVERHEAD_BYTES = 400
+
+# Close code sent to clients that cannot keep up ("Try Again Later")
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+# Remote session locations remembered at most (oldest dropped first)
+MAX_CACHED_LOCATIONS = 10000
+
+
+def _segment_bytes(segment: TranscriptSegment) -> int:
+    return SEGMENT_OVERHEAD_BYTES + len(segment.text)
+
 
 class ConnectionManager:
-    """Manages WebSocket connections for transcription sessions"""
+    """Manages WebSocket connections for transcription sessions
+    
+    With a SessionStore, session changes are persisted write-behind and
+    sessions unknown to this process are rehydrated on connect, except
+    ones the client has just created (`new=True`), which skip the database.
+    
+    Disconnected sessions stay in memory for reconnects until they have been
+    idle for `idle_ttl` seconds, or until the estimated size of all sessions
+    exceeds `memory_budget` bytes, in which case the least recently
+    disconnected ones go first. Connected sessions are never evicted.
     
-    def __init__(self):
+    The SessionRegistry records which node (worker process) holds each
+    connection, so messages for sessions connected elsewhere and broadcasts
+    are fanned out to the other nodes. Where remote sessions live is cached
+    from the claim and release events of other nodes, for at most
+    `location_ttl` seconds; the registry is asked only on a cache miss.
+    
+    Local sends go through a bounded ConnectionOutbox per connection, so
+    `send_message` and `broadcast` only enqueue and a slow client never
+    delays the others.
+    """
+    
+    def __init__(
+        self,
+        store: Optional[SessionStore] = None,
+        idle_ttl: float = 1800.0,
+        memory_budget: int = 256 * 1024 * 1024,
+        sweep_interval: float = 30.0,
+        registry: Optional[SessionRegistry] = None,
+        node_id: Optional[str] = None,
+        outbox_size: int = 256,
+        max_send_lag: float = 10.0,
+        slow_consumer_policy: str = POLICY_DISCONNECT,
+        location_ttl: float = 60.0
+    ):
         self.active_connections: Dict[str, WebSocket] = {}
         self.session_data: Dict[str, ConversationSession] = {}
         self.connection_times: Dict[str, datetime] = {}
+        self.store = store
+        
+        self.idle_ttl = idle_ttl
+        self.memory_budget = memory_budget
+        self.sweep_interval = sweep_interval
+        # Disconnected sessions in disconnect order (LRU first), with monotonic disconnect time
+        self._idle: "OrderedDict[str, float]" = OrderedDict()
+        self._session_bytes: Dict[str, int] = {}
+        self._memory_bytes = 0
+        self._sweeper: Optional[asyncio.Task] = None
+        self.evicted_idle = 0
+        self.evicted_memory = 0
+        
+        self.registry = registry or InMemorySessionRegistry()
+        self.node_id = node_id or f"{socket.gethostname()}:{os.getpid()}"
+        self._background: set = set()
+        self.relayed_out = 0
+        self.relayed_in = 0
+        # session_id -> (node_id or None if connected nowhere, monotonic expiry)
+        self.location_ttl = location_ttl
+        self._locations: "OrderedDict[str, tuple]" = OrderedDict()
+        self.location_hits = 0
+        self.location_misses = 0
+        
+        self.outbox_size = outbox_size
+        self.max_send_lag = max_send_lag
+        self.slow_consumer_policy = slow_consumer_policy
+        self._outboxes: Dict[str, ConnectionOutbox] = {}
+        self._send_lags: deque = deque(maxlen=1024)  # seconds, recent sends
+        self.dropped_messages = 0
+        self.slow_consumer_disconnects = 0
+    
+    def _record_send_lag(self, lag: float):
+        self._send_lags.append(lag)
+    
+    def _on_outbox_failed(self, session_id: str, reason: str):
+        """The client is too slow or gone: close it and let it reconnect"""
+        outbox = self._outboxes.get(session_id)
+        if outbox is None:
+            return
+        logger.warning(f"Dropping WebSocket {session_id}: {reason}")
+        self.slow_consumer_disconnects += 1
+        self._spawn(outbox.websocket.close(code=SLOW_CONSUMER_CLOSE_CODE))
+        self.disconnect(session_id)
+    
+    def _spawn(self, coro):
+        """Run a registry or close call without blocking the caller"""
+        task = asyncio.get_running_loop().create_task(self._guard(coro))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _guard(self, coro):
+        try:
+            return await coro
+        except Exception as e:
+            logger.warning(f"Background WebSocket call failed: {e}")
+            return None
+    
+    async def _on_event(self, event: dict):
+        """Handle an event published by another node"""
+        session_id = event.get("session_id")
+        if event.get("kind") == EVENT_MESSAGE:
+            self.relayed_in += 1
+            if session_id is None:
+                await self._broadcast_local(event["message"])
+            elif session_id in self.active_connections:
+                await self.send_message(event["message"], session_id)
+        elif event.get("kind") == EVENT_CLAIM:
+            self._remember_location(session_id, event.get("origin"))
+            # The session moved to another node; our copy would go stale
+            if session_id in self.session_data and session_id not in self.active_connections:
+                self._evict(session_id)
+        elif event.get("kind") == EVENT_RELEASE:
+            cached = self._locations.get(session_id)
+            # A release from a node the session already left does not count
+            if cached is not None and cached[0] == event.get("origin"):
+                self._remember_location(session_id, None)
+    
+    def _remember_location(self, session_id: str, node_id: Optional[str]):
+        self._locations.pop(session_id, None)
+        self._locations[session_id] = (node_id, time.monotonic() + self.location_ttl)
+        while len(self._locations) > MAX_CACHED_LOCATIONS:
+            self._locations.popitem(last=False)
+    
+    async def _owner_of(self, session_id: str) -> Optional[str]:
+        """Node holding a session not connected here, cached between registry lookups"""
+        cached = self._locations.get(session_id)
+        if cached is not None and cached[1] > time.monotonic():
+            self.location_hits += 1
+            return cached[0]
+        
+        self.location_misses += 1
+        owner = await self._guard(self.registry.locate(session_id))
+        self._remember_location(session_id, owner)
+        return owner
+    
+    def _track(self, session_id: str, size: int):
+        self._memory_bytes += size - self._session_bytes.get(session_id, 0)
+        self._session_bytes[session_id] = size
+    
+    def _evict(self, session_id: str):
+        self._idle.pop(session_id, None)
+        self.session_data.pop(session_id, None)
+        self._memory_bytes -= self._session_bytes.pop(session_id, 0)
+    
+    def sweep(self) -> int:
+        """Evict sessions idle past the TTL, then LRU idle sessions over the budget"""
+        evicted = 0
+        now = time.monotonic()
+        while self._idle:
+            session_id, since = next(iter(self._idle.items()))
+            if now - since < self.idle_ttl:
+                break
+            self._evict(session_id)
+            self.evicted_idle += 1
+            evicted += 1
+        
+        while self._idle and self._memory_bytes > self.memory_budget:
+            self._evict(next(iter(self._idle)))
+            self.evicted_memory += 1
+            evicted += 1
+        
+        if evicted:
+            logger.info(f"Evicted {evicted} idle session(s), {len(self.session_data)} in memory")
+        return evicted
+    
+    async def _sweep_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
     
-    async def connect(self, websocket: WebSocket, session_id: str, doctor_id: str = "default"):
-        """Accept and register a new WebSocket connection"""
+    async def start(self):
+        """Join the session registry and start the idle-session sweeper"""
+        if self._sweeper is None:
+            await self._guard(self.registry.start(self.node_id, self._on_event))
+            self._sweeper = asyncio.create_task(self._sweep_loop())
+    
+    async def shutdown(self):
+        """Stop the sweeper and leave the session registry"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        for outbox in self._outboxes.values():
+            outbox.close()
+        await self._guard(self.registry.shutdown(self.node_id))
+    
+    async def connect(self, websocket: WebSocket, session_id: str, doctor_id: str = "default", new: bool = False):
+        """Accept and register a new WebSocket connection
+        
+        `new` tells that the client just created the session ID, so there is
+        nothing persisted to load.
+        """
         await websocket.accept()
+        previous = self._outboxes.pop(session_id, None)
+        if previous is not None:
+            previous.close()
         self.active_connections[session_id] = websocket
+        self._outboxes[session_id] = ConnectionOutbox(
+            websocket,
+            session_id,
+            on_fail=self._on_outbox_failed,
+            on_sent=self._record_send_lag,
+            max_messages=self.outbox_size,
+            max_lag=self.max_send_lag,
+            policy=self.slow_consumer_policy
+        )
         self.connection_times[session_id] = datetime.utcnow()
+        self._locations.pop(session_id, None)
         
+        self._idle.pop(session_id, None)
         if session_id not in self.session_data:
-            self.session_data[session_id] = ConversationSession(
-                session_id=session_id,
-                doctor_id=doctor_id,
-                transcript=""
-            )
+            session = None
+            if self.store:
+                # An evicted session may still have writes in flight
+                session = self.store.unflushed_session(session_id)
+                if session is None and not new:
+                    session = await self.store.load(session_id)
+            if session is None:
+                session = ConversationSession(
+                    session_id=session_id,
+                    doctor_id=doctor_id
+                )
+                if self.store:
+                    self.store.mark_dirty(session)
+            self.session_data[session_id] = session
+            self._track(session_id, SESSION_BASE_BYTES + sum(_segment_bytes(s) for s in session.segments))
+        
+        await self._guard(self.registry.register(session_id, self.node_id))
+        self._spawn(self.registry.publish({
+            "kind": EVENT_CLAIM,
+            "origin": self.node_id,
+            "session_id": session_id
+        }))
         
         logger.info(f"WebSocket connected: {session_id}")
     
-    def disconnect(self, session_id: str):
-        """Handle WebSocket disconnection"""
+    def disconnect(self, session_id: str, websocket: Optional[WebSocket] = None):
+        """Handle WebSocket disconnection
+        
+        Passing the handler's `websocket` makes this a no-op when the session
+        has already reconnected on a newer socket.
+        """
+        if websocket is not None and self.active_connections.get(session_id) is not websocket:
+            return
         connection_time = self.connection_times.get(session_id)
         duration = datetime.utcnow() - connection_time if connection_time else None
         
         self.active_connections.pop(session_id, None)
         self.connection_times.pop(session_id, None)
-        # Note: We keep session_data to allow for reconnection or summary generation
+        outbox = self._outboxes.pop(session_id, None)
+        if outbox is not None:
+            self.dropped_messages += outbox.dropped
+            outbox.close()
+        self._spawn(self.registry.unregister(session_id, self.node_id))
+        self._spawn(self.registry.publish({
+            "kind": EVENT_RELEASE,
+            "origin": self.node_id,
+            "session_id": session_id
+        }))
+        # Keep session_data for reconnection or summary generation until evicted
+        if session_id in self.session_data:
+            self._idle[session_id] = time.monotonic()
+            self._idle.move_to_end(session_id)
+            if self._memory_bytes > self.memory_budget:
+                self.sweep()
         
         logger.info(f"WebSocket disconnected: {session_id} (duration: {duration})")
     
     async def send_message(self, message: dict, session_id: str):
-        """Send a message to a specific session"""
-        if session_id in self.active_connections:
-            try:
-                await self.active_connections[session_id].send_json(message)
-            except Exception as e:
-                logger.error(f"Error sending message to {session_id}: {e}")
-                self.disconnect(session_id)
+        """Send a message to a specific session, wherever it is connected
+        
+        Local sessions only get the message queued; it is written by the
+        connection's outbox.
+        """
+        outbox = self._outboxes.get(session_id)
+        if outbox is not None:
+            outbox.put(message)
+            return
+        
+        owner = await self._owner_of(session_id)
+        if owner and owner != self.node_id:
+            self.relayed_out += 1
+            await self._guard(self.registry.publish({
+                "kind": EVENT_MESSAGE,
+                "origin": self.node_id,
+                "session_id": session_id,
+                "message": message
+            }))
+    
+    async def _broadcast_local(self, message: dict):
+        for outbox in list(self._outboxes.values()):
+            outbox.put(message)
+    
+    async def close(self, session_id: str, code: int = 1000, timeout: float = 1.0):
+        """Flush queued messages, then close and disconnect a session"""
+        outbox = self._outboxes.get(session_id)
+        if outbox is None:
+            return
+        await outbox.drain(timeout)
+        try:
+            await outbox.websocket.close(code=code)
+        except Exception as e:
+            logger.debug(f"Error closing WebSocket {session_id}: {e}")
+        self.disconnect(session_id)
     
     async def broadcast(self, message: dict):
-        """Broadcast message to all connections"""
-        for session_id in list(self.active_connections.keys()):
-            await self.send_message(message, session_id)
+        """Broadcast message to all connections on every node"""
+        await self._broadcast_local(message)
+        self.relayed_out += 1
+        await self._guard(self.registry.publish({
+            "kind": EVENT_MESSAGE,
+            "origin": self.node_id,
+            "session_id": None,
+            "message": message
+        }))
     
-    async def add_transcript(self, session_id: str, text: str):
-        """Add text to session transcript"""
-        if session_id in self.session_data:
-            self.session_data[session_id].transcript += " " + text
+    async def locate_session(self, session_id: str) -> Optional[str]:
+        """Node currently holding a session's connection, if any"""
+        if session_id in self.active_connections:
+            return self.node_id
+        return await self._owner_of(session_id)
+    
+    async def count_cluster_connections(self) -> int:
+        """Connections across all nodes sharing the registry"""
+        count = await self._guard(self.registry.count_connections())
+        return count if count is not None else len(self.active_connections)
+    
+    async def add_transcript(
+        self,
+        session_id: str,
+        text: str,
+        start: Optional[float] = None,
+        end: Optional[float] = None,
+        confidence: Optional[float] = None
+    ) -> Optional[TranscriptSegment]:
+        """Append a transcript segment to the session"""
+        session = self.get_session(session_id)
+        text = text.strip()
+        if session is None or not text:
+            return None
+        segment = session.append_segment(text, start, end, confidence)
+        self._track(session_id, self._session_bytes.get(session_id, SESSION_BASE_BYTES) + _segment_bytes(segment))
+        if self.store:
+            self.store.append_segment(session, segment)
+        return segment
+    
+    def get_segments_since(self, session_id: str, index: int) -> List[TranscriptSegment]:
+        """Transcript segments after the first `index` ones"""
+        session = self.get_session(session_id)
+        return session.segments_since(index) if session else []
+    
+    def clear_transcript(self, session_id: str) -> bool:
+        """Clear a session transcript"""
+        session = self.get_session(session_id)
+        if session is None:
+            return False
+        session.clear_segments()
+        self._track(session_id, SESSION_BASE_BYTES)
+        if self.store:
+            self.store.reset_segments(session)
+        return True
+    
+    def record_vad_stats(self, session_id: str, stats: dict):
+        """Accumulate kept vs. trimmed audio seconds for a session"""
+        session = self.get_session(session_id)
+        if session:
+            session.speech_seconds += stats["speech_seconds"]
+            session.trimmed_seconds += stats["trimmed_seconds"]
+            if self.store:
+                self.store.mark_dirty(session)
     
     def get_session(self, session_id: str) -> Optional[ConversationSession]:
         """Get session data"""
@@ -76,13 +425,31 @@ class ConnectionManager:
             session.patient_name = patient_info.get("patient_name")
             session.patient_age = patient_info.get("patient_age")
             session.patient_gender = patient_info.get("patient_gender")
+            if self.store:
+                self.store.mark_dirty(session)
             logger.info(f"Updated patient info for session {session_id}")
     
     def get_connection_stats(self) -> dict:
         """Get connection statistics"""
         return {
             "active_connections": len(self.active_connections),
-            "sessions": list(self.session_data.keys()),
+            "sessions": len(self.session_data),
+            "idle_sessions": len(self._idle),
+            "memory_bytes": self._memory_bytes,
+            "memory_budget": self.memory_budget,
+            "evicted_idle": self.evicted_idle,
+            "evicted_memory": self.evicted_memory,
+            "node_id": self.node_id,
+            "relayed_out": self.relayed_out,
+            "relayed_in": self.relayed_in,
+            "location_cache_hits": self.location_hits,
+            "location_cache_misses": self.location_misses,
+            "outbound_queued": sum(len(o) for o in self._outboxes.values()),
+            "send_lag_ms": self._send_lag_stats(),
+            "dropped_messages": self.dropped_messages + sum(o.dropped for o in self._outboxes.values()),
+            "slow_consumer_disconnects": self.slow_consumer_disconnects,
+            "speech_seconds": round(sum(s.speech_seconds for s in self.session_data.values()), 2),
+            "trimmed_seconds": round(sum(s.trimmed_seconds for s in self.session_data.values()), 2),
             "total_uptime": sum(
                 [(datetime.utcnow() - t).total_seconds() 
                  for t in self.connection_times.values()],
@@ -90,10 +457,41 @@ class ConnectionManager:
             )
         }
     
+    def _send_lag_stats(self) -> dict:
+        """Enqueue-to-sent latency of recent messages, and current worst backlog"""
+        lags = sorted(self._send_lags)
+        if not lags:
+            percentiles = {"p50": 0.0, "p95": 0.0, "max": 0.0}
+        else:
+            percentiles = {
+                "p50": round(lags[len(lags) // 2] * 1000, 1),
+                "p95": round(lags[min(len(lags) - 1, int(len(lags) * 0.95))] * 1000, 1),
+                "max": round(lags[-1] * 1000, 1)
+            }
+        percentiles["backlog"] = round(max((o.lag() for o in self._outboxes.values()), default=0.0) * 1000, 1)
+        return percentiles
+    
     def is_connected(self, session_id: str) -> bool:
         """Check if session is connected"""
         return session_id in self.active_connections
 
 
+# Write-behind persistence of sessions to conversation_sessions
+session_store = SessionStore(
+    flush_interval=settings.SESSION_FLUSH_INTERVAL_MS / 1000,
+    max_pending_segments=settings.SESSION_FLUSH_MAX_SEGMENTS
+)
+
 # Global connection manager instance
-manager = ConnectionManager()
+manager = ConnectionManager(
+    store=session_store if settings.SESSION_PERSISTENCE else None,
+    idle_ttl=settings.SESSION_IDLE_TTL_SECONDS,
+    memory_budget=settings.session_memory_budget,
+    sweep_interval=settings.SESSION_SWEEP_INTERVAL_SECONDS,
+    registry=create_session_registry(settings.SESSION_REGISTRY),
+    node_id=settings.SESSION_REGISTRY_NODE_ID or None,
+    outbox_size=settings.WS_OUTBOX_MAX_MESSAGES,
+    max_send_lag=settings.WS_MAX_SEND_LAG_SECONDS,
+    slow_consumer_policy=settings.WS_SLOW_CONSUMER_POLICY,
+    location_ttl=settings.SESSION_REGISTRY_TTL_SECONDS
+)
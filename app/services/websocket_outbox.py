@@ -0,0 +1,127 @@
+"""
+MedAI - WebSocket Outbox
+Bounded per-connection send queues drained by a writer task
+"""
+import time
+import asyncio
+from collections import deque
+from typing import Callable
+
+from fastapi import WebSocket
+
+# What to do when a client reads slower than messages are produced
+POLICY_DROP_OLDEST = "drop_oldest"
+POLICY_DISCONNECT = "disconnect"
+SLOW_CONSUMER_POLICIES = (POLICY_DROP_OLDEST, POLICY_DISCONNECT)
+
+
+class ConnectionOutbox:
+    """Outbound queue of one WebSocket
+    
+    `put` never blocks: messages are queued and sent in order by a writer
+    task, so one slow client cannot stall the others. When the queue is
+    full the oldest message is dropped (`drop_oldest`), or the connection
+    is given up (`disconnect`), which also happens once the oldest queued
+    message, or the one being sent, has waited longer than `max_lag`
+    seconds. Giving up calls `on_fail(session_id, reason)`; clients resume
+    with `since=N`.
+    """
+    
+    def __init__(
+        self,
+        websocket: WebSocket,
+        session_id: str,
+        on_fail: Callable[[str, str], None],
+        on_sent: Callable[[float], None],
+        max_messages: int = 256,
+        max_lag: float = 10.0,
+        policy: str = POLICY_DISCONNECT
+    ):
+        if policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(f"Unknown slow consumer policy: {policy}")
+        self.websocket = websocket
+        self.session_id = session_id
+        self.max_messages = max_messages
+        self.max_lag = max_lag
+        self.policy = policy
+        self._on_fail = on_fail
+        self._on_sent = on_sent
+        self._queue: deque = deque()  # (monotonic enqueue time, message)
+        self._ready = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self.closed = False
+        self.dropped = 0
+        self._writer = asyncio.get_running_loop().create_task(self._run())
+    
+    def __len__(self) -> int:
+        return len(self._queue)
+    
+    def lag(self) -> float:
+        """Seconds the oldest queued message has been waiting"""
+        return time.monotonic() - self._queue[0][0] if self._queue else 0.0
+    
+    def put(self, message: dict) -> bool:
+        """Queue a message; False if the connection was given up"""
+        if self.closed:
+            return False
+        
+        if len(self._queue) >= self.max_messages:
+            if self.policy == POLICY_DROP_OLDEST:
+                self._queue.popleft()
+                self.dropped += 1
+            else:
+                self._fail(f"outbound queue full ({self.max_messages} messages)")
+                return False
+        elif self.policy == POLICY_DISCONNECT and self.lag() > self.max_lag:
+            self._fail(f"send lag {self.lag():.1f}s over {self.max_lag}s")
+            return False
+        
+        self._queue.append((time.monotonic(), message))
+        self._idle.clear()
+        self._ready.set()
+        return True
+    
+    async def _run(self):
+        while True:
+            if not self._queue:
+                self._idle.set()
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            
+            enqueued, message = self._queue.popleft()
+            # A send that stalls counts against the lag budget too, even if nothing new is queued
+            timeout = None
+            if self.policy == POLICY_DISCONNECT:
+                timeout = max(0.0, self.max_lag - (time.monotonic() - enqueued))
+            try:
+                await asyncio.wait_for(self.websocket.send_json(message), timeout)
+            except asyncio.TimeoutError:
+                self._fail(f"send lag {time.monotonic() - enqueued:.1f}s over {self.max_lag}s")
+                return
+            except Exception as e:
+                self._fail(f"send failed: {e}")
+                return
+            self._on_sent(time.monotonic() - enqueued)
+    
+    def _fail(self, reason: str):
+        if not self.closed:
+            self.close()
+            self._on_fail(self.session_id, reason)
+    
+    async def drain(self, timeout: float = 1.0) -> bool:
+        """Wait until everything queued so far has been sent"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+    
+    def close(self):
+        """Stop the writer; queued messages are discarded"""
+        self.closed = True
+        self._queue.clear()
+        self._idle.set()
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
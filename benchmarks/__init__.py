@@ -0,0 +1,4 @@
+"""
+MedAI - Performance Benchmarks
+Run individual benchmarks with `python -m benchmarks.<name>`
+"""
@@ -0,0 +1,54 @@
+"""
+MedAI - Benchmark Audio Fixtures
+Deterministic synthetic audio clips for offline benchmarks
+"""
+import io
+import wave
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_speech(seconds: float, sample_rate: int = SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """Generate speech-like float32 audio: voiced bursts separated by pauses"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    t = np.arange(total, dtype=np.float32) / sample_rate
+    audio = np.zeros(total, dtype=np.float32)
+    
+    pos = 0
+    while pos < total:
+        burst = int(rng.uniform(0.4, 2.5) * sample_rate)
+        pause = int(rng.uniform(0.2, 1.5) * sample_rate)
+        end = min(pos + burst, total)
+        pitch = rng.uniform(90, 220)
+        segment = t[pos:end]
+        voiced = sum(
+            np.sin(2 * np.pi * pitch * k * segment) / k
+            for k in range(1, 6)
+        )
+        envelope = np.sin(np.pi * np.linspace(0, 1, end - pos, dtype=np.float32))
+        audio[pos:end] = 0.3 * voiced * envelope
+        pos = end + pause
+    
+    audio += rng.normal(0, 0.003, total).astype(np.float32)
+    return np.clip(audio, -1.0, 1.0)
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    """Encode float32 samples as little-endian signed 16-bit PCM"""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def to_wav(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, channels: int = 1) -> bytes:
+    """Encode float32 samples as a 16-bit PCM WAV file"""
+    if channels > 1:
+        samples = np.repeat(samples, channels)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(to_pcm16(samples))
+    return buffer.getvalue()
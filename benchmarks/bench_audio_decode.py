@@ -0,0 +1,85 @@
+"""
+MedAI - Audio Decode Benchmark
+Compares the legacy temp-file decode with the in-memory decode path
+
+Usage: python -m benchmarks.bench_audio_decode [--seconds 60] [--runs 10]
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+import numpy as np
+
+from app.services.transcription_service import SAMPLE_RATE, decode_audio, get_decode_stats
+from benchmarks.audio_fixtures import synthetic_speech, to_wav
+
+
+def legacy_tempfile_decode(audio_bytes: bytes) -> np.ndarray:
+    """Previous behaviour: write a temp .wav and let ffmpeg read it back"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
+        tmp.write(audio_bytes)
+        tmp_path = tmp.name
+    try:
+        cmd = [
+            "ffmpeg", "-nostdin", "-threads", "0", "-i", tmp_path,
+            "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+            "-loglevel", "error", "-"
+        ]
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+        return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+    finally:
+        os.unlink(tmp_path)
+
+
+def measure(fn, payload: bytes, runs: int) -> dict:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(payload)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "mean_ms": round(statistics.mean(timings), 2),
+        "min_ms": round(min(timings), 2),
+        "max_ms": round(max(timings), 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    
+    wav_16k = to_wav(synthetic_speech(args.seconds))
+    wav_48k = to_wav(synthetic_speech(args.seconds, sample_rate=48000), sample_rate=48000, channels=2)
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+    
+    print(f"Clip: {args.seconds:.0f}s, 16 kHz WAV = {len(wav_16k)} bytes, 48 kHz stereo WAV = {len(wav_48k)} bytes")
+    print(f"{'payload':<18}{'path':<12}{'mean ms':>10}{'min ms':>10}{'max ms':>10}{'disk bytes/req':>16}")
+    
+    for label, payload in (("wav 16k mono", wav_16k), ("wav 48k stereo", wav_48k)):
+        if payload is wav_48k and not has_ffmpeg:
+            continue
+        
+        if has_ffmpeg:
+            legacy = measure(legacy_tempfile_decode, payload, args.runs)
+            print(f"{label:<18}{'tempfile':<12}{legacy['mean_ms']:>10}{legacy['min_ms']:>10}"
+                  f"{legacy['max_ms']:>10}{len(payload):>16}")
+        
+        before = get_decode_stats()["tempfile_bytes_written"]
+        current = measure(decode_audio, payload, args.runs)
+        written = (get_decode_stats()["tempfile_bytes_written"] - before) // args.runs
+        print(f"{label:<18}{'in-memory':<12}{current['mean_ms']:>10}{current['min_ms']:>10}"
+              f"{current['max_ms']:>10}{written:>16}")
+    
+    if not has_ffmpeg:
+        print("ffmpeg not found: only the native WAV path was measured")
+    print(f"Decode paths used: {get_decode_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+MedAI - Audio Preprocessing Benchmark
+Compares the NumPy preprocessing stage with the ffmpeg subprocess path
+
+Usage: python -m benchmarks.bench_audio_preprocessing [--seconds 60] [--runs 5] [--chunk-ms 250]
+
+For each input layout the recording is converted three ways:
+- ffmpeg: one subprocess over the whole recording at audio_end (previous path)
+- numpy: the whole recording at once (decode_audio on a WAV)
+- numpy-chunked: chunk by chunk as it would arrive over the WebSocket; the
+  per-chunk cost overlaps with recording, so only finish() is left at audio_end
+"""
+import time
+import shutil
+import argparse
+import statistics
+import subprocess
+
+import numpy as np
+
+from app.services.audio_preprocessing import PCM_S16LE, PCM_F32LE, PreprocessedRecording
+from app.services.transcription_service import SAMPLE_RATE, decode_audio
+from benchmarks.audio_fixtures import synthetic_speech, to_wav
+
+LAYOUTS = [
+    ("48k stereo s16", 48000, 2, PCM_S16LE),
+    ("44.1k stereo s16", 44100, 2, PCM_S16LE),
+    ("48k mono f32", 48000, 1, PCM_F32LE),
+    ("16k mono s16", 16000, 1, PCM_S16LE),
+]
+
+
+def encode(samples: np.ndarray, channels: int, sample_format: str) -> bytes:
+    interleaved = np.repeat(samples, channels)
+    if sample_format == PCM_F32LE:
+        return interleaved.astype("<f4").tobytes()
+    return (np.clip(interleaved, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+def ffmpeg_convert(raw: bytes, rate: int, channels: int, sample_format: str) -> np.ndarray:
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-f", sample_format, "-ar", str(rate), "-ac", str(channels), "-i", "pipe:0",
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le", "-ar", str(SAMPLE_RATE),
+        "-loglevel", "error", "pipe:1"
+    ]
+    out = subprocess.run(cmd, input=raw, capture_output=True, check=True).stdout
+    return np.frombuffer(out, np.int16).astype(np.float32) / 32768.0
+
+
+def chunked(raw: bytes, rate: int, channels: int, sample_format: str, chunk_bytes: int):
+    """Feed chunks, then finish; returns (per-chunk ms list, finish ms, samples)"""
+    recording = PreprocessedRecording(rate, channels, sample_format, normalize=True)
+    per_chunk = []
+    for offset in range(0, len(raw), chunk_bytes):
+        start = time.perf_counter()
+        recording.feed(raw[offset:offset + chunk_bytes])
+        per_chunk.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    samples = recording.finish()
+    finish_ms = (time.perf_counter() - start) * 1000
+    recording.close()
+    return per_chunk, finish_ms, samples
+
+
+def timed(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=60.0)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--chunk-ms", type=int, default=250, help="WebSocket chunk length")
+    args = parser.parse_args()
+    
+    has_ffmpeg = shutil.which("ffmpeg") is not None
+    print(f"Clip: {args.seconds:.0f}s, chunks of {args.chunk_ms} ms, median of {args.runs} runs")
+    print(f"{'input':<18}{'ffmpeg ms':>11}{'numpy ms':>10}{'chunk p50':>11}{'chunk max':>11}"
+          f"{'end ms':>9}{'vs ffmpeg':>11}")
+    
+    for label, rate, channels, sample_format in LAYOUTS:
+        samples = synthetic_speech(args.seconds, sample_rate=rate)
+        raw = encode(samples, channels, sample_format)
+        chunk_bytes = int(rate * args.chunk_ms / 1000) * channels * (4 if sample_format == PCM_F32LE else 2)
+        
+        ffmpeg_ms = "-"
+        difference = "-"
+        if has_ffmpeg:
+            ffmpeg_ms = timed(lambda: ffmpeg_convert(raw, rate, channels, sample_format), args.runs)
+        
+        numpy_ms = "-"
+        if sample_format == PCM_S16LE:
+            # The WAV path covers what uploads and batch recordings go through
+            wav = to_wav(samples, sample_rate=rate, channels=channels)
+            numpy_ms = timed(lambda: decode_audio(wav), args.runs)
+        
+        runs = [chunked(raw, rate, channels, sample_format, chunk_bytes) for _ in range(args.runs)]
+        per_chunk = [ms for run in runs for ms in run[0]]
+        finish_ms = round(statistics.median(run[1] for run in runs), 2)
+        
+        if has_ffmpeg:
+            # Mean absolute difference against ffmpeg, before loudness normalization
+            ours = PreprocessedRecording(rate, channels, sample_format, normalize=False)
+            ours.feed(raw)
+            converted = ours.finish()
+            reference = ffmpeg_convert(raw, rate, channels, sample_format)
+            size = min(len(converted), len(reference))
+            difference = f"{np.mean(np.abs(converted[:size] - reference[:size])):.1e}"
+            ours.close()
+        
+        print(f"{label:<18}{ffmpeg_ms:>11}{numpy_ms:>10}{round(statistics.median(per_chunk), 3):>11}"
+              f"{round(max(per_chunk), 3):>11}{finish_ms:>9}{difference:>11}")
+    
+    if not has_ffmpeg:
+        print("ffmpeg not found: only the NumPy paths were measured")
+
+
+if __name__ == "__main__":
+    main()
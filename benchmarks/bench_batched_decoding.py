@@ -0,0 +1,66 @@
+"""
+MedAI - Batched Decoding Benchmark
+Aggregate Whisper throughput for concurrent sessions at different batch sizes
+
+Usage: python -m benchmarks.bench_batched_decoding [--sessions 8] [--seconds 30] [--batch-sizes 1 2 4 8]
+"""
+import time
+import asyncio
+import argparse
+
+from app.config import settings
+from app.services.transcription_engine import TranscriptionEngine
+from benchmarks.audio_fixtures import synthetic_speech
+
+
+async def run_engine(model, clips, batching: bool, batch_size: int, batch_window: float) -> dict:
+    engine = TranscriptionEngine(
+        lambda: model,
+        workers=1,
+        queue_size=len(clips) * 4,
+        batching=batching,
+        batch_size=batch_size,
+        batch_window=batch_window
+    )
+    await engine.start()
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            engine.transcribe(clip, session_id=f"session-{i}")
+            for i, clip in enumerate(clips)
+        ))
+        elapsed = time.perf_counter() - start
+        return {"elapsed": elapsed, "stats": engine.get_stats()}
+    finally:
+        await engine.shutdown()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--window-ms", type=int, default=50)
+    parser.add_argument("--model", default=settings.WHISPER_MODEL_SIZE)
+    args = parser.parse_args()
+    
+    import whisper
+    model = whisper.load_model(args.model, device="cpu")
+    
+    clips = [synthetic_speech(args.seconds, seed=i) for i in range(args.sessions)]
+    audio_seconds = args.sessions * args.seconds
+    print(f"{args.sessions} sessions x {args.seconds:.0f}s on whisper '{args.model}' (CPU)")
+    print(f"{'mode':<22}{'wall s':>10}{'audio s / wall s':>18}{'avg batch':>11}")
+    
+    baseline = await run_engine(model, clips, batching=False, batch_size=1, batch_window=0)
+    print(f"{'sequential transcribe':<22}{baseline['elapsed']:>10.2f}"
+          f"{audio_seconds / baseline['elapsed']:>18.2f}{'-':>11}")
+    
+    for size in args.batch_sizes:
+        result = await run_engine(model, clips, batching=True, batch_size=size, batch_window=args.window_ms / 1000)
+        print(f"{f'batched (size {size})':<22}{result['elapsed']:>10.2f}"
+              f"{audio_seconds / result['elapsed']:>18.2f}{result['stats']['avg_batch_size']:>11}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
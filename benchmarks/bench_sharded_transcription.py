@@ -0,0 +1,54 @@
+"""
+MedAI - Sharded Transcription Benchmark
+Wall-clock time for one long dictation at different transcription worker counts
+
+Usage: python -m benchmarks.bench_sharded_transcription [--minutes 30] [--workers 1 2 4]
+"""
+import time
+import asyncio
+import argparse
+
+from app.config import settings
+from app.services.sharded_transcription import ShardedTranscriber, plan_shards
+from app.services.transcription_engine import TranscriptionEngine
+from app.services.transcription_service import transcription_backend
+from benchmarks.audio_fixtures import synthetic_speech, SAMPLE_RATE
+
+
+async def run(samples, workers: int, shard_seconds: float) -> float:
+    engine = TranscriptionEngine(transcription_backend.load, workers=workers, backend=transcription_backend)
+    sharder = ShardedTranscriber(engine, min_seconds=0, shard_seconds=shard_seconds)
+    try:
+        # Starting the engine loads every worker's model before timing starts
+        await engine.start()
+        
+        start = time.perf_counter()
+        await sharder.transcribe(samples)
+        return time.perf_counter() - start
+    finally:
+        await engine.shutdown()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=30.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--shard-seconds", type=float, default=settings.SHARDED_SHARD_SECONDS)
+    args = parser.parse_args()
+    
+    samples = synthetic_speech(args.minutes * 60)
+    shards = plan_shards(samples, int(args.shard_seconds * SAMPLE_RATE), int(settings.SHARDED_OVERLAP_SECONDS * SAMPLE_RATE))
+    cut_at_pause = sum(1 for _, _, overlapped in shards[1:] if not overlapped)
+    print(f"{args.minutes:.0f} min dictation, {len(shards)} shards ({cut_at_pause} cuts at pauses), "
+          f"{transcription_backend.describe()}")
+    print(f"{'workers':<10}{'wall s':>10}{'audio s / wall s':>18}{'speedup':>10}")
+    
+    baseline = None
+    for workers in args.workers:
+        elapsed = await run(samples, workers, args.shard_seconds)
+        baseline = baseline or elapsed
+        print(f"{workers:<10}{elapsed:>10.2f}{len(samples) / SAMPLE_RATE / elapsed:>18.2f}{baseline / elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+"""
+MedAI - Startup Benchmark
+Worker boot time: app import, lifespan startup and time until ready
+
+Usage: python -m benchmarks.bench_startup [--repeat 3] [--ready-timeout 120]
+
+Each measurement runs in a fresh interpreter. "startup" is the time until
+the lifespan yields (the worker accepts requests); "ready" is the time
+until every background component has finished loading. The second table
+shows the import cost of the SDKs that are now deferred to first use.
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+BOOT_SCRIPT = """
+import time, json, asyncio
+start = time.perf_counter()
+import app.main as main
+imported = time.perf_counter() - start
+
+async def boot():
+    from app.services import readiness
+    from app.services.component_readiness import STATE_PENDING, STATE_LOADING
+    t = time.perf_counter()
+    async with main.lifespan(main.app):
+        startup = time.perf_counter() - t
+        deadline = t + {timeout}
+        while time.perf_counter() < deadline:
+            states = [c["state"] for c in readiness.snapshot().values()]
+            if not any(s in (STATE_PENDING, STATE_LOADING) for s in states):
+                break
+            await asyncio.sleep(0.05)
+        ready = time.perf_counter() - t
+        components = readiness.snapshot()
+    return startup, ready, components
+
+startup, ready, components = asyncio.run(boot())
+print(json.dumps({{"import": imported, "startup": startup, "ready": ready, "components": components}}))
+"""
+
+IMPORT_SCRIPT = """
+import time, json
+start = time.perf_counter()
+try:
+    import {module}
+    print(json.dumps({{"seconds": time.perf_counter() - start}}))
+except ImportError as e:
+    print(json.dumps({{"error": str(e)}}))
+"""
+
+DEFERRED_MODULES = ["google.generativeai", "reportlab.platypus", "PIL.Image", "torch", "whisper", "faster_whisper"]
+
+
+def run(script: str) -> dict:
+    result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True)
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "no output")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    
+    boots = [run(BOOT_SCRIPT.format(timeout=args.ready_timeout)) for _ in range(args.repeat)]
+    print(f"Worker boot, median of {args.repeat}")
+    print(f"{'phase':<22}{'seconds':>10}")
+    for phase in ("import", "startup", "ready"):
+        print(f"{phase:<22}{statistics.median(b[phase] for b in boots):>10.2f}")
+    
+    print(f"\n{'component':<22}{'state':>10}{'load s':>10}")
+    for name, component in boots[-1]["components"].items():
+        seconds = component["seconds"]
+        print(f"{name:<22}{component['state']:>10}{seconds if seconds is not None else '-':>10}")
+    
+    print(f"\n{'deferred import':<22}{'seconds':>10}")
+    for module in DEFERRED_MODULES:
+        result = run(IMPORT_SCRIPT.format(module=module))
+        value = f"{result['seconds']:.2f}" if "seconds" in result else "missing"
+        print(f"{module:<22}{value:>10}")
+
+
+if __name__ == "__main__":
+    main()
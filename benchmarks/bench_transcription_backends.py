@@ -0,0 +1,95 @@
+"""
+MedAI - Transcription Backend Benchmark
+Real-time factor and memory of each speech-to-text backend on the same audio
+
+Usage: python -m benchmarks.bench_transcription_backends [--engines whisper ctranslate2:int8] [--clips 4] [--seconds 30]
+
+Each engine runs in a fresh process so model memory is measured in isolation.
+RTF is processing time / audio time (lower is faster, < 1 is faster than real time).
+"""
+import time
+import resource
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from app.config import settings
+from app.services.transcription_backends import create_transcription_backend
+from benchmarks.audio_fixtures import synthetic_speech, SAMPLE_RATE
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process"""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_engine(spec: str, model_size: str, model_dir: str, threads: int, clips: int, seconds: float) -> dict:
+    name, _, compute_type = spec.partition(":")
+    backend = create_transcription_backend(
+        name,
+        model_size=model_size,
+        model_dir=model_dir if name != "whisper" else "",
+        compute_type=compute_type or "int8",
+        threads=threads
+    )
+    audio = [synthetic_speech(seconds, seed=i) for i in range(clips)]
+    
+    baseline = _rss_mb()
+    start = time.perf_counter()
+    model = backend.load()
+    load_seconds = time.perf_counter() - start
+    loaded = _rss_mb()
+    
+    # Warm up allocators and kernels before timing
+    backend.transcribe(model, audio[0][:SAMPLE_RATE * 5])
+    
+    start = time.perf_counter()
+    for clip in audio:
+        backend.transcribe(model, clip)
+    elapsed = time.perf_counter() - start
+    
+    return {
+        "engine": spec,
+        "load_seconds": load_seconds,
+        "rtf": elapsed / (clips * seconds),
+        "model_mb": loaded - baseline,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--engines", nargs="+", default=["whisper", "ctranslate2:int8"],
+                        help="backend[:compute_type], e.g. ctranslate2:int8 ctranslate2:float32")
+    parser.add_argument("--model", default=settings.WHISPER_MODEL_SIZE)
+    parser.add_argument("--model-dir", default=settings.WHISPER_MODEL_DIR,
+                        help="converted CTranslate2 model directory (offline)")
+    parser.add_argument("--threads", type=int, default=settings.WHISPER_CPU_THREADS)
+    parser.add_argument("--clips", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    args = parser.parse_args()
+    
+    print(f"{args.clips} clips x {args.seconds:.0f}s, model '{args.model}', "
+          f"{args.threads or 'default'} thread(s)")
+    print(f"{'engine':<24}{'load s':>8}{'RTF':>8}{'x real time':>13}{'model MB':>10}{'peak RSS MB':>13}")
+    
+    context = multiprocessing.get_context("spawn")
+    for spec in args.engines:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                r = pool.submit(
+                    run_engine, spec, args.model, args.model_dir, args.threads, args.clips, args.seconds
+                ).result()
+            except Exception as e:
+                print(f"{spec:<24}failed: {e}")
+                continue
+        print(f"{r['engine']:<24}{r['load_seconds']:>8.2f}{r['rtf']:>8.3f}{1 / r['rtf']:>13.1f}"
+              f"{r['model_mb']:>10.0f}{r['peak_rss_mb']:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
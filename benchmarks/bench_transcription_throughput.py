@@ -0,0 +1,317 @@
+"""
+MedAI - Transcription Throughput Benchmark
+N concurrent sessions through transcribe_audio or the /ws/transcribe protocol
+
+Usage: python -m benchmarks.bench_transcription_throughput [--mode api|ws] [--sessions 8]
+           [--clips 3] [--seconds 20] [--output bench.json]
+
+Runs offline on CPU: clips are deterministic synthetic speech (or WAV files
+from --audio-dir) and the backend is the configured one, which must be
+available locally (WHISPER_MODEL_DIR for ctranslate2, the whisper cache for
+openai-whisper). `--backend simulated` replaces inference with a sleep of
+`--simulated-rtf` x audio length to check the harness and the queueing
+without a model.
+
+The JSON report holds the commit, configuration and results so runs can be
+compared across commits.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import resource
+import threading
+import subprocess
+from datetime import datetime
+from typing import List
+
+import numpy as np
+
+from app.services.transcription_backends import TranscriptionBackend
+
+REPORT_VERSION = 1
+
+
+class SimulatedBackend(TranscriptionBackend):
+    """Sleeps `rtf` x audio length instead of running a model"""
+    
+    name = "simulated"
+    
+    def __init__(self, rtf: float = 0.05):
+        super().__init__()
+        self.rtf = rtf
+    
+    def load(self):
+        return object()
+    
+    def transcribe(self, model, samples: np.ndarray) -> str:
+        time.sleep(len(samples) / 16000 * self.rtf)
+        return f"{len(samples)} samples"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mode", choices=["api", "ws"], default="api",
+                        help="call transcribe_audio directly, or speak the WebSocket protocol")
+    parser.add_argument("--ws-mode", choices=["batch", "streaming"], default="batch")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--clips", type=int, default=3, help="recordings per session, sent one after another")
+    parser.add_argument("--seconds", type=float, default=20.0, help="synthetic clip length")
+    parser.add_argument("--audio-dir", default="", help="use 16-bit WAV files from this directory instead")
+    parser.add_argument("--chunk-ms", type=int, default=500, help="WebSocket audio frame size")
+    parser.add_argument("--realtime", action="store_true", help="pace WebSocket audio at real time")
+    parser.add_argument("--backend", default=None, help="whisper | ctranslate2 | simulated (default: settings)")
+    parser.add_argument("--simulated-rtf", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batching", choices=["true", "false"], default=None)
+    parser.add_argument("--output", default="", help="write the JSON report here")
+    return parser.parse_args()
+
+
+def configure_environment(args):
+    """Settings are read at import, so overrides go in before importing the app"""
+    if args.backend and args.backend != "simulated":
+        os.environ["WHISPER_BACKEND"] = args.backend
+    if args.workers is not None:
+        os.environ["WHISPER_WORKERS"] = str(args.workers)
+    if args.batching is not None:
+        os.environ["WHISPER_BATCHING"] = args.batching
+    # Measure the engine, not the cache or the background startup
+    os.environ["TRANSCRIPTION_CACHE_ENABLED"] = "false"
+    os.environ["PRELOAD_MODELS"] = "false"
+    os.environ["SESSION_PERSISTENCE"] = "false"
+
+
+def load_clips(args) -> List[np.ndarray]:
+    from benchmarks.audio_fixtures import synthetic_speech
+    
+    if not args.audio_dir:
+        return [synthetic_speech(args.seconds, seed=i) for i in range(args.sessions * args.clips)]
+    
+    # Other sample rates go through ffmpeg
+    from app.services.transcription_service import decode_audio
+    paths = sorted(
+        os.path.join(args.audio_dir, name)
+        for name in os.listdir(args.audio_dir) if name.lower().endswith(".wav")
+    )
+    if not paths:
+        sys.exit(f"No .wav files in {args.audio_dir}")
+    decoded = []
+    for path in paths:
+        with open(path, "rb") as f:
+            decoded.append(decode_audio(f.read()))
+    return [decoded[i % len(decoded)] for i in range(args.sessions * args.clips)]
+
+
+def install_simulated_backend(rtf: float) -> dict:
+    """Replace inference with a sleep proportional to the audio length"""
+    from app.services import transcription_service
+    
+    backend = SimulatedBackend(rtf)
+    transcription_service.transcription_engine.backend = backend
+    transcription_service._whisper_model = backend.load()
+    return {"backend": "simulated", "rtf": rtf}
+
+
+def percentile(values: List[float], q: float) -> float:
+    return round(float(np.percentile(values, q)), 3) if values else 0.0
+
+
+class Recorder:
+    """Per-recording latency and busy retries, shared by session threads"""
+    
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.audio_seconds = 0.0
+        self.busy = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+    
+    def done(self, latency: float, audio_seconds: float):
+        with self._lock:
+            self.latencies.append(latency)
+            self.audio_seconds += audio_seconds
+    
+    def retry(self):
+        with self._lock:
+            self.busy += 1
+    
+    def error(self):
+        with self._lock:
+            self.errors += 1
+
+
+async def run_api(clips: List[np.ndarray], args, recorder: Recorder):
+    from app.core import TranscriptionBusyError
+    from app.services import transcribe_audio
+    from app.services.vad_service import VadStats
+    from benchmarks.audio_fixtures import to_wav
+    
+    async def session(index: int):
+        for clip in clips[index * args.clips:(index + 1) * args.clips]:
+            audio = to_wav(clip)
+            start = time.perf_counter()
+            try:
+                while True:
+                    try:
+                        await transcribe_audio(audio, f"bench-{index}", VadStats())
+                        break
+                    except TranscriptionBusyError as e:
+                        recorder.retry()
+                        await asyncio.sleep(min(e.retry_after, 1))
+            except Exception:
+                recorder.error()
+                continue
+            recorder.done(time.perf_counter() - start, len(clip) / 16000)
+    
+    await asyncio.gather(*(session(i) for i in range(args.sessions)))
+
+
+def run_ws(clips: List[np.ndarray], args, recorder: Recorder):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from benchmarks.audio_fixtures import to_wav, to_pcm16
+    
+    streaming = args.ws_mode == "streaming"
+    done_type = "final" if streaming else "transcript"
+    query = f"protocol=2&mode={args.ws_mode}" + ("&format=pcm_s16le" if streaming else "")
+    
+    def session(client, index: int):
+        with client.websocket_connect(f"/ws/transcribe/bench-{index}?{query}") as ws:
+            ws.receive_json()  # session_config
+            for clip in clips[index * args.clips:(index + 1) * args.clips]:
+                audio = to_pcm16(clip) if streaming else to_wav(clip)
+                chunk = int(16000 * 2 * args.chunk_ms / 1000)
+                for offset in range(0, len(audio), chunk):
+                    ws.send_bytes(audio[offset:offset + chunk])
+                    if args.realtime:
+                        time.sleep(args.chunk_ms / 1000)
+                
+                start = time.perf_counter()
+                ws.send_json({"type": "audio_end"})
+                while True:
+                    message = ws.receive_json()
+                    if message["type"] == done_type and message["text"].startswith(FAILED_PREFIXES):
+                        recorder.error()
+                        break
+                    if message["type"] == done_type:
+                        recorder.done(time.perf_counter() - start, len(clip) / 16000)
+                        break
+                    if message["type"] == "busy":
+                        recorder.retry()
+                        time.sleep(min(message.get("retry_after", 1), 1))
+                        ws.send_json({"type": "audio_end"})
+                    elif message["type"] == "error":
+                        recorder.error()
+                        break
+    
+    with TestClient(app) as client:
+        threads = [threading.Thread(target=session, args=(client, i)) for i in range(args.sessions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    args = parse_args()
+    configure_environment(args)
+    
+    from app.config import settings
+    from app.services import transcription_service
+    
+    commit = git_commit()
+    clips = load_clips(args)
+    if args.backend == "simulated":
+        backend = install_simulated_backend(args.simulated_rtf)
+    else:
+        backend = transcription_service.transcription_backend.describe()
+        load_start = time.perf_counter()
+        if transcription_service.load_whisper_model() is None:
+            sys.exit("Transcription model could not be loaded (see log); try --backend simulated")
+        backend["load_seconds"] = round(time.perf_counter() - load_start, 2)
+    
+    recorder = Recorder()
+    start = time.perf_counter()
+    if args.mode == "api":
+        asyncio.run(run_api(clips, args, recorder))
+    else:
+        run_ws(clips, args, recorder)
+    wall = time.perf_counter() - start
+    
+    engine = transcription_service.transcription_engine.get_stats()
+    latencies = recorder.latencies
+    report = {
+        "version": REPORT_VERSION,
+        "commit": commit,
+        "timestamp": datetime.utcnow().isoformat(),
+        "host": {
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count()
+        },
+        "config": {
+            "mode": args.mode if args.mode == "api" else f"ws-{args.ws_mode}",
+            "sessions": args.sessions,
+            "clips_per_session": args.clips,
+            "clip_seconds": args.seconds if not args.audio_dir else None,
+            "audio_dir": args.audio_dir or None,
+            "realtime": args.realtime,
+            "backend": backend,
+            "workers": settings.WHISPER_WORKERS,
+            "executor": settings.WHISPER_EXECUTOR,
+            "batching": settings.WHISPER_BATCHING,
+            "batch_size": settings.WHISPER_BATCH_SIZE
+        },
+        "results": {
+            "recordings": len(latencies),
+            "errors": recorder.errors,
+            "busy_retries": recorder.busy,
+            "audio_seconds": round(recorder.audio_seconds, 1),
+            "wall_seconds": round(wall, 2),
+            # Aggregate real-time factor: wall time per second of audio, all sessions together
+            "rtf": round(wall / recorder.audio_seconds, 4) if recorder.audio_seconds else None,
+            "latency_seconds": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": round(max(latencies), 3) if latencies else 0.0
+            },
+            "queue_wait_seconds": {
+                "avg": engine["avg_wait_seconds"],
+                "p50": engine["p50_wait_seconds"],
+                "p95": engine["p95_wait_seconds"],
+                "p99": engine["p99_wait_seconds"]
+            },
+            "avg_service_seconds": engine["avg_service_seconds"],
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+        }
+    }
+    if settings.WHISPER_EXECUTOR == "process":
+        # Largest worker process (the pool is shut down by then)
+        report["results"]["peak_rss_worker_mb"] = round(
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024, 1
+        )
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Report written to {args.output}")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+MedAI - Model Router Tests
+"""
+from app.services.model_router import ModelRouter, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN
+
+
+def trip(router: ModelRouter, name: str):
+    for _ in range(router.failure_threshold):
+        router.record_failure(name, 0.1)
+
+
+def test_late_success_does_not_close_open_breaker():
+    router = ModelRouter(failure_threshold=2, open_seconds=30)
+    trip(router, "a")
+    
+    # A call started before the breaker opened returns afterwards
+    router.record_success("a", 5.0)
+    
+    stats = router.get_stats()["a"]
+    assert stats["state"] == STATE_OPEN
+    assert stats["trips"] == 1
+    assert not router.acquire("a")
+
+
+def test_probe_success_closes_breaker():
+    router = ModelRouter(failure_threshold=2, open_seconds=0)
+    trip(router, "a")
+    probe, other = object(), object()
+    
+    assert router.acquire("a", probe)
+    assert not router.acquire("a", other)
+    router.record_success("a", 0.1, other)
+    assert router.get_stats()["a"]["state"] == STATE_HALF_OPEN
+    
+    router.record_success("a", 0.1, probe)
+    assert router.get_stats()["a"]["state"] == STATE_CLOSED
+
+
+def test_released_probe_can_be_claimed_again():
+    router = ModelRouter(failure_threshold=2, open_seconds=0)
+    trip(router, "a")
+    first, second = object(), object()
+    
+    assert router.acquire("a", first)
+    router.release("a", second)
+    assert router.get_stats()["a"]["state"] == STATE_HALF_OPEN
+    
+    router.release("a", first)
+    assert router.get_stats()["a"]["state"] == STATE_OPEN
+    assert router.acquire("a", second)
@@ -0,0 +1,86 @@
+"""
+MedAI - Session Store Tests
+"""
+import pytest
+from pymongo.errors import BulkWriteError
+
+import app.services.session_persistence as session_persistence
+from app.schemas import ConversationSession
+from app.services.session_persistence import SessionStore
+
+
+def evaluate(expression, doc):
+    """The aggregation expressions SessionStore updates use"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return doc.get(expression[1:])
+    if isinstance(expression, dict) and len(expression) == 1:
+        (operator, args), = expression.items()
+        if operator == "$literal":
+            return args
+        if operator == "$ifNull":
+            value = evaluate(args[0], doc)
+            return value if value is not None else evaluate(args[1], doc)
+        if operator == "$slice":
+            return evaluate(args[0], doc)[:evaluate(args[1], doc)]
+        if operator == "$concatArrays":
+            return [item for arg in args for item in evaluate(arg, doc)]
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    return expression
+
+
+class FlakySessions:
+    """Applies updates in memory; the first bulk_write applies one op and fails another"""
+    
+    def __init__(self):
+        self.docs = {}
+        self.calls = 0
+    
+    def apply(self, op):
+        session_id = op._filter["session_id"]
+        doc = self.docs.setdefault(session_id, {"session_id": session_id})
+        if isinstance(op._doc, dict):
+            # Plain update operators
+            doc.update(op._doc.get("$setOnInsert", {}))
+            doc.update(op._doc.get("$set", {}))
+            for field, push in op._doc.get("$push", {}).items():
+                doc.setdefault(field, []).extend(push["$each"])
+            return
+        for stage in op._doc:
+            fields = {name: evaluate(value, doc) for name, value in stage["$set"].items()}
+            doc.update(fields)
+    
+    async def bulk_write(self, ops, ordered=True):
+        self.calls += 1
+        if self.calls == 1:
+            # The first op reached the server, the second did not
+            self.apply(ops[0])
+            raise BulkWriteError({"writeErrors": [{"index": 1, "code": 11000, "errmsg": "fail"}], "nInserted": 0})
+        for op in ops:
+            self.apply(op)
+
+
+def make_session(session_id: str) -> ConversationSession:
+    return ConversationSession(session_id=session_id, doctor_id="doctor")
+
+
+@pytest.mark.asyncio
+async def test_retried_flush_does_not_duplicate_segments(monkeypatch):
+    sessions = FlakySessions()
+    monkeypatch.setattr(session_persistence, "get_sessions_collection", lambda: sessions)
+    store = SessionStore()
+    a, b = make_session("a"), make_session("b")
+    
+    for session in (a, b):
+        for i in range(3):
+            store.append_segment(session, session.append_segment(f"{session.session_id}{i}"))
+    await store.flush()
+    assert store.get_stats()["failures"] == 1
+    
+    # More segments arrive before the retry
+    store.append_segment(a, a.append_segment("a3"))
+    await store.flush()
+    
+    assert [s["text"] for s in sessions.docs["a"]["segments"]] == ["a0", "a1", "a2", "a3"]
+    assert [s["text"] for s in sessions.docs["b"]["segments"]] == ["b0", "b1", "b2"]
+    assert [s["index"] for s in sessions.docs["a"]["segments"]] == [0, 1, 2, 3]
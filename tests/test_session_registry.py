@@ -0,0 +1,236 @@
+"""
+MedAI - Session Registry Tests
+"""
+import asyncio
+
+import pytest
+from bson import ObjectId
+from pymongo.errors import CollectionInvalid
+
+from app.database import Database
+from app.services.session_registry import MongoSessionRegistry, EVENT_MESSAGE
+from app.services.websocket_manager import ConnectionManager
+from tests.test_websocket_manager import FakeWebSocket
+
+
+class FakeTailableCursor:
+    """Tailable cursor over a capped collection: iteration stops at the end but the cursor stays alive"""
+    
+    def __init__(self, events: "FakeEvents", after: ObjectId):
+        self.events = events
+        self.after = after
+        self.alive = True
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        for doc in self.events.docs:
+            if doc["_id"] > self.after:
+                self.after = doc["_id"]
+                return doc
+        raise StopAsyncIteration
+
+
+class FakeEvents:
+    def __init__(self):
+        self.docs = []
+        self.cursors = []
+    
+    async def insert_one(self, doc):
+        self.docs.append({"_id": ObjectId(), **doc})
+    
+    def find(self, query, cursor_type=None):
+        cursor = FakeTailableCursor(self, query["_id"]["$gt"])
+        self.cursors.append(cursor)
+        return cursor
+
+
+class FakeRegistry:
+    def __init__(self):
+        self.docs = {}
+        self.lookups = 0
+    
+    async def create_index(self, *args, **kwargs):
+        pass
+    
+    async def update_one(self, query, update, upsert=False):
+        self.docs.setdefault(query["session_id"], {"session_id": query["session_id"]}).update(update["$set"])
+    
+    async def update_many(self, query, update):
+        pass
+    
+    async def delete_one(self, query):
+        doc = self.docs.get(query["session_id"])
+        if doc is not None and doc["node_id"] == query["node_id"]:
+            del self.docs[query["session_id"]]
+    
+    async def delete_many(self, query):
+        for session_id in [s for s, doc in self.docs.items() if doc["node_id"] == query["node_id"]]:
+            del self.docs[session_id]
+    
+    async def find_one(self, query):
+        self.lookups += 1
+        return self.docs.get(query["session_id"])
+    
+    async def count_documents(self, query):
+        return len(self.docs)
+
+
+class FakeDb:
+    def __init__(self):
+        self.session_events = FakeEvents()
+        self.session_registry = FakeRegistry()
+        self.collections = set()
+    
+    async def create_collection(self, name, capped=False, size=None):
+        if name in self.collections:
+            raise CollectionInvalid(f"collection {name} already exists")
+        self.collections.add(name)
+
+
+async def settle():
+    """Let the tailing tasks pick up everything published so far"""
+    for _ in range(5):
+        await asyncio.sleep(0.02)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeDb()
+    monkeypatch.setattr(Database, "db", db)
+    return db
+
+
+async def start_nodes(*node_ids, **kwargs):
+    registry = MongoSessionRegistry(poll_interval=0.01)
+    managers = [ConnectionManager(registry=registry, node_id=node_id, **kwargs) for node_id in node_ids]
+    for manager in managers:
+        await manager.start()
+    return managers
+
+
+async def stop_nodes(*managers):
+    for manager in managers:
+        await manager.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_claims_fill_the_location_cache(db):
+    a, b = await start_nodes("a", "b")
+    try:
+        websocket = FakeWebSocket()
+        await a.connect(websocket, "s", new=True)
+        await settle()
+        
+        await b.send_message({"type": "note"}, "s")
+        await b.send_message({"type": "note"}, "s")
+        await settle()
+        
+        assert (b.location_hits, b.location_misses) == (2, 0)
+        assert db.session_registry.lookups == 0
+        assert websocket.sent == [{"type": "note"}, {"type": "note"}]
+    finally:
+        await stop_nodes(a, b)
+
+
+@pytest.mark.asyncio
+async def test_unknown_sessions_are_looked_up_once(db):
+    a, b = await start_nodes("a", "b")
+    try:
+        for _ in range(3):
+            await b.send_message({"type": "note"}, "elsewhere")
+        assert (b.location_hits, b.location_misses) == (2, 1)
+        assert db.session_registry.lookups == 1
+        # Nobody holds the session, so nothing was relayed
+        assert b.relayed_out == 0
+    finally:
+        await stop_nodes(a, b)
+
+
+@pytest.mark.asyncio
+async def test_expired_locations_are_looked_up_again(db):
+    a, b = await start_nodes("a", "b", location_ttl=0)
+    try:
+        await a.connect(FakeWebSocket(), "s", new=True)
+        await settle()
+        
+        await b.send_message({"type": "note"}, "s")
+        assert b.location_misses == 1
+        assert db.session_registry.lookups == 1
+        assert b.relayed_out == 1
+    finally:
+        await stop_nodes(a, b)
+
+
+@pytest.mark.asyncio
+async def test_moved_session_invalidates_the_cached_location(db):
+    a, b, c = await start_nodes("a", "b", "c")
+    try:
+        old, new = FakeWebSocket(), FakeWebSocket()
+        await a.connect(old, "s", new=True)
+        await settle()
+        assert b._locations["s"][0] == "a"
+        
+        # The client reconnects on c before a notices the old socket closed
+        await c.connect(new, "s")
+        await settle()
+        a.disconnect("s", old)
+        await settle()
+        
+        # The late release from a does not clear the move to c
+        assert b._locations["s"][0] == "c"
+        await b.send_message({"type": "note"}, "s")
+        await settle()
+        assert new.sent == [{"type": "note"}]
+        assert old.sent == []
+        
+        c.disconnect("s", new)
+        await settle()
+        assert b._locations["s"][0] is None
+        await b.send_message({"type": "note"}, "s")
+        assert b.relayed_out == 1
+        assert db.session_registry.lookups == 0
+    finally:
+        await stop_nodes(a, b, c)
+
+
+@pytest.mark.asyncio
+async def test_dead_cursor_is_restarted_without_replaying_events(db):
+    registry = MongoSessionRegistry(poll_interval=0.01)
+    received = []
+    
+    async def handler(event):
+        received.append(event["message"])
+    
+    await registry.start("b", handler)
+    try:
+        await registry.publish({"kind": EVENT_MESSAGE, "origin": "a", "session_id": None, "message": 1})
+        await settle()
+        
+        # The capped collection wrapped past the cursor's position
+        db.session_events.cursors[-1].alive = False
+        await registry.publish({"kind": EVENT_MESSAGE, "origin": "a", "session_id": None, "message": 2})
+        await settle()
+        
+        assert len(db.session_events.cursors) == 2
+        assert received == [1, 2]
+    finally:
+        await registry.shutdown("b")
+
+
+@pytest.mark.asyncio
+async def test_events_collection_is_created_once(db):
+    registry = MongoSessionRegistry(poll_interval=0.01)
+    
+    async def handler(event):
+        pass
+    
+    await registry.start("a", handler)
+    await registry.start("b", handler)
+    try:
+        # One marker document, so tailable cursors have something to start from
+        assert [doc["kind"] for doc in db.session_events.docs] == ["init"]
+    finally:
+        await registry.shutdown("a")
+        await registry.shutdown("b")
@@ -0,0 +1,48 @@
+"""
+MedAI - Sharded Transcription Tests
+"""
+import asyncio
+
+import pytest
+
+from app.core.exceptions import TranscriptionBusyError
+from app.services.sharded_transcription import ShardedTranscriber, plan_shards
+from app.services.transcription_engine import TranscriptionEngine
+from benchmarks.audio_fixtures import synthetic_speech
+from tests.test_transcription_engine import FakeBackend
+
+
+@pytest.mark.asyncio
+async def test_shards_run_on_the_engine_workers():
+    backend = FakeBackend()
+    engine = TranscriptionEngine(backend.load, workers=2, backend=backend)
+    sharder = ShardedTranscriber(engine, min_seconds=0, shard_seconds=10, overlap_seconds=1)
+    try:
+        text = await sharder.transcribe(synthetic_speech(35), session_id="long")
+    finally:
+        await engine.shutdown()
+    
+    shards = plan_shards(synthetic_speech(35), sharder.shard_samples, sharder.overlap_samples)
+    assert len(shards) >= 4
+    assert len(text.split()) == len(shards)
+    assert engine.get_stats()["completed"] == len(shards)
+
+
+@pytest.mark.asyncio
+async def test_shards_respect_engine_admission():
+    backend = FakeBackend()
+    engine = TranscriptionEngine(backend.load, queue_size=3, backend=backend)
+    sharder = ShardedTranscriber(engine, min_seconds=0, shard_seconds=10, overlap_seconds=1)
+    await engine.start()
+    # Hold the only worker so the live session's jobs stay queued
+    model = engine._models.get()
+    try:
+        live = [asyncio.create_task(engine.transcribe(synthetic_speech(1), "live")) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(TranscriptionBusyError):
+            await sharder.transcribe(synthetic_speech(35), session_id="long")
+        assert engine.get_stats()["queue_depth"] == 1
+    finally:
+        engine._models.put(model)
+        await asyncio.gather(*live)
+        await engine.shutdown()
@@ -0,0 +1,106 @@
+"""
+MedAI - Streaming Transcription Tests
+"""
+import numpy as np
+import pytest
+
+import app.services.streaming_service as streaming_service
+from app.services.streaming_service import StreamingTranscriber, FORMAT_CONTAINER
+
+
+class PassthroughDecoder(streaming_service.ContainerStreamDecoder):
+    """`cat` stands in for ffmpeg: the "container" is already 16 kHz s16le"""
+    
+    instances = []
+    
+    def __init__(self):
+        super().__init__()
+        self.cmd = ["cat"]
+        self.writes = []
+        PassthroughDecoder.instances.append(self)
+    
+    def write(self, data):
+        self.writes.append(len(data))
+        super().write(data)
+
+
+@pytest.fixture
+def streamer(monkeypatch):
+    windows = []
+    
+    async def fake_transcribe(samples, session_id, vad_stats):
+        windows.append(len(samples))
+        return f"word{len(windows)}"
+    
+    PassthroughDecoder.instances = []
+    monkeypatch.setattr(streaming_service, "ContainerStreamDecoder", PassthroughDecoder)
+    monkeypatch.setattr(streaming_service, "transcribe_samples", fake_transcribe)
+    monkeypatch.setattr(streaming_service, "find_silence_cut", lambda window, minimum: None)
+    
+    streamer = StreamingTranscriber(FORMAT_CONTAINER, "s", window_seconds=1.0, overlap_seconds=0.25)
+    streamer.windows = windows
+    yield streamer
+    streamer.close()
+
+
+async def feed_seconds(streamer, seconds: float):
+    chunk = np.zeros(int(seconds * 16000), dtype="<i2").tobytes()
+    streamer.feed(chunk)
+    while not await streamer.ready():
+        # The reader thread delivers the decoder's output asynchronously
+        if streamer.total_samples * 2 >= PassthroughDecoder.instances[0].bytes_in:
+            return
+    while await streamer.ready():
+        await streamer.transcribe_next()
+
+
+@pytest.mark.asyncio
+async def test_container_stream_is_decoded_once_and_trimmed(streamer):
+    for _ in range(20):
+        await feed_seconds(streamer, 0.5)
+    await streamer.finish()
+    
+    decoder = PassthroughDecoder.instances[0]
+    # Every byte went to the one decoder exactly once
+    assert len(PassthroughDecoder.instances) == 1
+    assert sum(decoder.writes) == 20 * 16000
+    assert streamer.total_samples == 10 * 16000
+    # Only audio a future window can reach is kept
+    assert len(streamer._samples) < 2 * 16000
+    assert streamer.windows[0] == 16000
+
+
+def test_overlap_merge_uses_only_the_transcript_tail(monkeypatch):
+    seen = []
+    
+    def fake_merge(previous, new):
+        seen.append(previous)
+        return new
+    
+    monkeypatch.setattr(streaming_service, "merge_overlapping_text", fake_merge)
+    streamer = StreamingTranscriber("pcm_s16le", "s", window_seconds=1.0, overlap_seconds=0.25)
+    streamer.segments = [" ".join(f"w{i}-{j}" for j in range(10)) for i in range(100)]
+    streamer._overlapped = True
+    expected = streamer.text.split()[-streaming_service.MAX_OVERLAP_WORDS:]
+    streamer._advance("next words", 0, 16000)
+    
+    assert seen == [" ".join(expected)]
+
+
+@pytest.mark.asyncio
+async def test_overlap_is_counted_once_in_vad_stats(monkeypatch):
+    async def fake_transcribe(samples, session_id, vad_stats):
+        vad_stats.add(len(samples), len(samples))
+        return "words"
+    
+    monkeypatch.setattr(streaming_service, "transcribe_samples", fake_transcribe)
+    monkeypatch.setattr(streaming_service, "find_silence_cut", lambda window, minimum: None)
+    streamer = StreamingTranscriber("pcm_s16le", "s", window_seconds=1.0, overlap_seconds=0.25)
+    streamer.feed(np.zeros(5 * 16000, dtype="<i2").tobytes())
+    while await streamer.ready():
+        await streamer.transcribe_next()
+    await streamer.finish()
+    streamer.close()
+    
+    assert streamer.windows_transcribed > 5
+    assert streamer.vad_stats.total_seconds == pytest.approx(5.0)
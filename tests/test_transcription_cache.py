@@ -0,0 +1,52 @@
+"""
+MedAI - Transcription Cache Tests
+"""
+import pytest
+
+import app.services.transcription_service as transcription_service
+from app.config import settings
+from app.services.transcription_cache import TranscriptionCache
+from app.services.vad_service import VadStats
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = TranscriptionCache(max_bytes=1024 * 1024, ttl=60, persistent=False)
+    monkeypatch.setattr(transcription_service, "transcription_cache", cache)
+    monkeypatch.setattr(settings, "TRANSCRIPTION_CACHE_ENABLED", True)
+    return cache
+
+
+class FakeTranscriber:
+    def __init__(self):
+        self.calls = 0
+    
+    async def __call__(self, stats: VadStats) -> str:
+        self.calls += 1
+        stats.add(16000 * 5, 16000 * 4)
+        return f"transcript {self.calls}"
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_restores_vad_totals(cache):
+    transcribe = FakeTranscriber()
+    first, second = VadStats(), VadStats()
+    
+    text = await transcription_service._cached_transcription(b"audio", "model", transcribe, first)
+    cached = await transcription_service._cached_transcription(b"audio", "model", transcribe, second)
+    
+    assert cached == text == "transcript 1"
+    assert transcribe.calls == 1
+    assert second.as_dict() == first.as_dict()
+    assert second.total_seconds == 5.0
+
+
+@pytest.mark.asyncio
+async def test_changed_vad_settings_miss_the_cache(cache, monkeypatch):
+    transcribe = FakeTranscriber()
+    await transcription_service._cached_transcription(b"audio", "model", transcribe, None)
+    
+    monkeypatch.setattr(settings, "VAD_PADDING_MS", settings.VAD_PADDING_MS + 100)
+    text = await transcription_service._cached_transcription(b"audio", "model", transcribe, None)
+    
+    assert text == "transcript 2"
@@ -0,0 +1,64 @@
+"""
+MedAI - Transcription Engine Tests
+"""
+import time
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.transcription_backends import TranscriptionBackend, SEGMENT_SAMPLES
+from app.services.transcription_engine import TranscriptionEngine
+
+
+class FakeBackend(TranscriptionBackend):
+    name = "fake"
+    
+    def __init__(self, load_seconds: float = 0.0):
+        super().__init__()
+        self.load_seconds = load_seconds
+    
+    def load(self):
+        time.sleep(self.load_seconds)
+        return object()
+    
+    def transcribe(self, model, samples):
+        return f"{len(samples)}"
+    
+    def decode_batch(self, model, segments):
+        return ["x" for _ in segments]
+
+
+@pytest.mark.asyncio
+async def test_recording_longer_than_queue_is_transcribed():
+    backend = FakeBackend()
+    engine = TranscriptionEngine(backend.load, queue_size=32, backend=backend, batching=True, batch_size=8)
+    samples = np.zeros(40 * SEGMENT_SAMPLES, dtype=np.float32)
+    try:
+        text = await engine.transcribe(samples, "long")
+    finally:
+        await engine.shutdown()
+    assert text == " ".join(["x"] * 40)
+    assert engine.get_stats()["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_loading_worker_models_does_not_block_event_loop():
+    backend = FakeBackend(load_seconds=0.3)
+    engine = TranscriptionEngine(backend.load, workers=3, backend=backend)
+    ticks = 0
+    
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+    
+    ticker = asyncio.create_task(tick())
+    try:
+        await engine.transcribe(np.zeros(16000, dtype=np.float32), "s")
+    finally:
+        ticker.cancel()
+        await engine.shutdown()
+    # Two extra models load for 0.6 s; a blocked loop would not tick at all meanwhile
+    assert ticks >= 20
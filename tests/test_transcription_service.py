@@ -0,0 +1,23 @@
+"""
+MedAI - Transcription Service Tests
+"""
+import pytest
+
+import app.services.transcription_service as transcription_service
+
+
+@pytest.mark.asyncio
+async def test_transcribe_audio_raises_instead_of_returning_errors(monkeypatch):
+    async def no_model():
+        return None
+    
+    monkeypatch.setattr(transcription_service, "ensure_whisper_model", no_model)
+    with pytest.raises(RuntimeError, match="Whisper model not loaded"):
+        await transcription_service.transcribe_audio(b"audio")
+    
+    async def model():
+        return object()
+    
+    monkeypatch.setattr(transcription_service, "ensure_whisper_model", model)
+    with pytest.raises(ValueError, match="Empty audio data"):
+        await transcription_service.transcribe_audio(b"")
@@ -0,0 +1,45 @@
+"""
+MedAI - Resumable Upload Tests
+"""
+import asyncio
+
+import pytest
+
+from app.services.upload_spool import ResumableUpload, CHUNK_ACCEPTED
+
+
+@pytest.mark.asyncio
+async def test_reconnect_waits_for_in_flight_transcription():
+    upload = ResumableUpload()
+    upload.accept(b"old recording", 0)
+    
+    token = upload.begin_transcription()
+    with upload.buffer.view():
+        async def new_connection():
+            await upload.idle()
+            return upload.accept(b"new", 0)
+        
+        accepted = asyncio.create_task(new_connection())
+        await asyncio.sleep(0.01)
+        # Extending the buffer now would raise BufferError
+        assert not accepted.done()
+    upload.end_transcription(token, transcribed=True)
+    
+    assert await accepted == CHUNK_ACCEPTED
+    assert upload.state() == {"seq": 1, "offset": 3}
+    upload.close()
+
+
+@pytest.mark.asyncio
+async def test_changed_recording_is_not_reset():
+    upload = ResumableUpload()
+    upload.accept(b"first", 0)
+    token = upload.begin_transcription()
+    
+    upload.reset()
+    upload.accept(b"second", 0)
+    upload.end_transcription(token, transcribed=True)
+    
+    assert not upload.transcribing
+    assert upload.offset == len(b"second")
+    upload.close()
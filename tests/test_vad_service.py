@@ -0,0 +1,26 @@
+"""
+MedAI - Voice Activity Detection Tests
+"""
+import numpy as np
+
+from app.services.vad_service import speech_mask, trim_silence
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds: float, rms_db: float) -> np.ndarray:
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    return (np.sqrt(2) * 10 ** (rms_db / 20) * np.sin(2 * np.pi * 180 * t)).astype(np.float32)
+
+
+def test_steady_speech_level_window_is_kept():
+    # No dynamic range for the adaptive threshold, as in a short window of continuous speech
+    mask, _ = speech_mask(tone(3, -20))
+    assert mask.all()
+
+
+def test_steady_hiss_is_still_trimmed():
+    rng = np.random.default_rng(0)
+    hiss = rng.normal(0, 10 ** (-60 / 20), 3 * SAMPLE_RATE).astype(np.float32)
+    trimmed, segments = trim_silence(hiss)
+    assert trimmed.size == 0 and segments == []
@@ -0,0 +1,56 @@
+"""
+MedAI - WebSocket Connection Manager Tests
+"""
+import pytest
+
+from app.schemas import ConversationSession
+from app.services.websocket_manager import ConnectionManager
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+    
+    async def accept(self):
+        pass
+    
+    async def send_json(self, message):
+        self.sent.append(message)
+    
+    async def close(self, code: int = 1000):
+        pass
+
+
+class FakeStore:
+    """SessionStore with one persisted session and nothing unflushed"""
+    
+    def __init__(self):
+        self.loads = []
+        self.dirty = []
+    
+    def unflushed_session(self, session_id):
+        return None
+    
+    async def load(self, session_id):
+        self.loads.append(session_id)
+        session = ConversationSession(session_id=session_id, doctor_id="doctor")
+        session.append_segment("stored")
+        return session
+    
+    def mark_dirty(self, session):
+        self.dirty.append(session.session_id)
+
+
+@pytest.mark.asyncio
+async def test_new_session_connects_without_loading():
+    store = FakeStore()
+    manager = ConnectionManager(store=store)
+    
+    await manager.connect(FakeWebSocket(), "fresh", new=True)
+    await manager.connect(FakeWebSocket(), "known")
+    
+    assert store.loads == ["known"]
+    assert store.dirty == ["fresh"]
+    assert manager.get_session("fresh").segments == []
+    assert [s.text for s in manager.get_session("known").segments] == ["stored"]
+    await manager.shutdown()
@@ -0,0 +1,32 @@
+"""
+MedAI - WebSocket Outbox Tests
+"""
+import asyncio
+
+import pytest
+
+from app.services.websocket_outbox import ConnectionOutbox
+
+
+class StalledWebSocket:
+    """A client that stopped reading: sends never complete"""
+    
+    async def send_json(self, message):
+        await asyncio.Event().wait()
+
+
+@pytest.mark.asyncio
+async def test_stalled_send_is_given_up_without_new_messages():
+    failures = []
+    outbox = ConnectionOutbox(
+        StalledWebSocket(),
+        "s",
+        on_fail=lambda session_id, reason: failures.append(reason),
+        on_sent=lambda seconds: None,
+        max_lag=0.1
+    )
+    outbox.put({"type": "partial"})
+    await asyncio.sleep(0.3)
+    
+    assert outbox.closed
+    assert failures and failures[0].startswith("send lag")